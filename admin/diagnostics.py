@@ -0,0 +1,67 @@
+# admin/diagnostics.py
+from __future__ import annotations
+
+import os
+import html
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.types import Message
+
+import lang
+
+router = Router(name="admin_diagnostics")
+
+def _load_admin_ids() -> set[int]:
+    raw = os.getenv("ADMIN_IDS") or os.getenv("ADMIN_ID", "")
+    ids: set[int] = set()
+    for part in str(raw).split(","):
+        part = part.strip()
+        if part.isdigit():
+            ids.add(int(part))
+    if not ids:
+        ids = {7360982123}
+    return ids
+
+ADMIN_IDS = _load_admin_ids()
+
+def _is_admin(msg: Message) -> bool:
+    return bool(msg.from_user and msg.from_user.id in ADMIN_IDS)
+
+def _pre(text: str) -> str:
+    return f"<pre>{html.escape(text)[:3900]}</pre>"
+
+# /i18n_report [N] — أكثر مفاتيح الترجمة المفقودة طلبًا وأخطاء التنسيق
+@router.message(Command("i18n_report"))
+async def i18n_report_cmd(msg: Message):
+    if not _is_admin(msg):
+        return
+    parts = (msg.text or "").split()
+    top = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 20
+    await msg.answer("🌐 <b>i18n</b>\n" + _pre(lang.i18n_report(top)))
+
+# /loop_stalls [N] [reset] — أكثر المواضع التي حجبت حلقة الأحداث (utils.loop_watchdog)
+@router.message(Command("loop_stalls"))
+async def loop_stalls_cmd(msg: Message):
+    if not _is_admin(msg):
+        return
+    from utils import loop_watchdog
+    parts = (msg.text or "").split()[1:]
+    top = next((int(p) for p in parts if p.isdigit()), 10)
+    text = loop_watchdog.report(top)
+    if "reset" in parts:
+        loop_watchdog.reset()
+        text += "\n(reset)"
+    await msg.answer("🧭 <b>Event loop stalls</b>\n" + _pre(text))
+
+# /load_status — مستوى الضغط الحالي وعدد الرفض لكل فئة (middlewares.vip_rate_limit)
+@router.message(Command("load_status"))
+async def load_status_cmd(msg: Message):
+    if not _is_admin(msg):
+        return
+    from middlewares.vip_rate_limit import shed_stats
+    st = shed_stats()
+    lines = [f"level={st['level']} lag={st['lag_ms']}ms inflight={st['inflight']}"]
+    for tier, c in st["tiers"].items():
+        lines.append(f"{tier:<8} rate={c['rate']} overload={c['overload']} expensive={c['expensive']}")
+    await msg.answer("📉 <b>Load shedding</b>\n" + _pre("\n".join(lines)))
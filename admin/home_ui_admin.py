@@ -13,6 +13,7 @@ from aiogram.enums import ParseMode
 from aiogram.exceptions import TelegramBadRequest
 
 from lang import t, get_user_lang
+from utils import kb_cache
 
 router = Router(name="home_ui_admin")
 
@@ -45,6 +46,7 @@ def _save_cfg(d: dict) -> None:
     tmp = CFG_FILE.with_suffix(".json.tmp")
     tmp.write_text(json.dumps(d, ensure_ascii=False, indent=2), "utf-8")
     tmp.replace(CFG_FILE)
+    kb_cache.invalidate("home_ui_cfg")   # لوحات الواجهة الرئيسية تُبنى من جديد
 
 # ============ صلاحيات ============
 def _admin_ids() -> set[int]:
@@ -1,6 +1,6 @@
 # admin/report_inbox.py
 from __future__ import annotations
-import os, json, logging, time, datetime
+import os, json, logging, time, datetime, html
 from pathlib import Path
 from datetime import datetime as dt, timezone
 from aiogram import Router, F
@@ -10,6 +10,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from lang import t, get_user_lang
+from utils import report_log                           # آخر بلاغ مختصر + صفحات السجل
 
 router = Router(name="report_inbox")
 
@@ -18,11 +19,12 @@ THREADS_FILE   = DATA_DIR / "support_threads.json"    # موحّد مع report.p
 BLOCKLIST_FILE = DATA_DIR / "report_blocklist.json"   # نفس بلوك ليست التقرير
 SETTINGS_FILE  = DATA_DIR / "report_settings.json"    # لمعرفة cooldown_days
 STATE_FILE     = DATA_DIR / "report_users.json"       # {"last": {uid: iso}}
-LOG_FILE       = DATA_DIR / "reports_log.json"        # لاستخراج آخر بلاغ مختصر
 
 _admin_env = os.getenv("ADMIN_IDS") or os.getenv("ADMIN_ID", "")
 ADMIN_IDS = [int(x) for x in str(_admin_env).split(",") if str(x).strip().isdigit()] or [7360982123]
 
+LOG_PAGE = max(1, int(os.getenv("RIN_LOG_PAGE", "10")))   # بلاغات لكل صفحة في سجل البلاغات
+
 def is_admin(uid: int) -> bool: return uid in ADMIN_IDS
 def L(uid: int) -> str: return get_user_lang(uid) or "ar"
 def _now_iso(): return dt.now(tz=timezone.utc).replace(microsecond=0).isoformat()
@@ -129,6 +131,7 @@ def _kb_list(lang: str) -> InlineKeyboardMarkup:
             mark = "🟢" if status == "open" else "⚪️"
             kb.button(text=f"{mark} {name}", callback_data=f"rin:chat:{uid}")
     kb.adjust(1)
+    kb.button(text="🗂 " + (t(lang, "rin.log") or "سجل البلاغات"), callback_data="rin:log:0")
     kb.button(text="🔄 " + (t(lang, "rin.refresh") or "تحديث"), callback_data="rin:open")
     kb.button(text="⬅️ " + (t(lang, "rin.back") or "رجوع"), callback_data="ah:menu")
     kb.adjust(1)
@@ -199,6 +202,47 @@ def _kb_chat(lang: str, th: dict) -> InlineKeyboardMarkup:
     return kb.as_markup()
 
 
+def _log_view(lang: str, offset: int) -> tuple[str, InlineKeyboardMarkup]:
+    """صفحة من سجل البلاغات (الأحدث أولًا) — تقرأ سجلات الصفحة فقط عبر report_log.page()."""
+    total = report_log.count()
+    offset = max(0, min(offset, (max(total, 1) - 1) // LOG_PAGE * LOG_PAGE))
+    items = report_log.page(offset, LOG_PAGE)
+
+    kb = InlineKeyboardBuilder()
+    if not items:
+        body = t(lang, "rin.log_empty") or "لا توجد بلاغات في السجل"
+    else:
+        lines = []
+        for i, it in enumerate(items, start=offset + 1):
+            uid = it.get("user_id")
+            name = it.get("first_name") or it.get("username") or f"#{uid}"
+            txt = (it.get("text") or "(media)")[:120]
+            lines.append(f"{i}. <code>{(it.get('date') or '-')[:16]}</code> · <b>{html.escape(str(name))}</b> "
+                         f"(<code>{uid}</code>)\n<i>{html.escape(txt)}</i>")
+        body = "\n\n".join(lines)
+        seen = []
+        for it in items:
+            uid = it.get("user_id")
+            if uid and uid not in seen:
+                seen.append(uid)
+                kb.button(text=f"💬 {it.get('first_name') or uid}", callback_data=f"rin:chat:{uid}")
+        kb.adjust(2)
+
+    nav = []
+    if offset > 0:
+        nav.append(InlineKeyboardButton(text="◀️", callback_data=f"rin:log:{max(0, offset - LOG_PAGE)}"))
+    nav.append(InlineKeyboardButton(text=f"{offset // LOG_PAGE + 1}/{max(1, -(-total // LOG_PAGE))}",
+                                    callback_data="rin:nop"))
+    if offset + LOG_PAGE < total:
+        nav.append(InlineKeyboardButton(text="▶️", callback_data=f"rin:log:{offset + LOG_PAGE}"))
+    kb.row(*nav)
+    kb.row(InlineKeyboardButton(text="⬅️ " + (t(lang, "rin.back_list") or "عودة للقائمة"),
+                                callback_data="rin:open"))
+
+    head = "🗂 <b>" + (t(lang, "rin.log") or "سجل البلاغات") + f"</b> ({total})"
+    return f"{head}\n\n{body}", kb.as_markup()
+
+
 class RinStates(StatesGroup):
     waiting_reply = State()
 
@@ -210,6 +254,19 @@ async def rin_open(cb: CallbackQuery):
         return await cb.answer(t(lang, "admins_only") or "هذه الأداة للأدمن فقط.", show_alert=True)
     await _safe_edit(cb.message, _title(lang), _kb_list(lang)); await cb.answer()
 
+# ===== سجل البلاغات (صفحات) =====
+@router.callback_query(F.data.startswith("rin:log:"))
+async def rin_log(cb: CallbackQuery):
+    lang = L(cb.from_user.id)
+    if not is_admin(cb.from_user.id):
+        return await cb.answer(t(lang, "admins_only") or "هذه الأداة للأدمن فقط.", show_alert=True)
+    try:
+        offset = int(cb.data.split(":")[-1])
+    except ValueError:
+        offset = 0
+    text, kb = _log_view(lang, offset)
+    await _safe_edit(cb.message, text, kb); await cb.answer()
+
 # ===== فتح محادثة =====
 @router.callback_query(F.data.startswith("rin:chat:"))
 async def rin_chat(cb: CallbackQuery):
@@ -371,8 +428,7 @@ async def rin_info(cb: CallbackQuery):
     sess_line = f"open={bool(th.get('status','open')=='open')}, admin_id={th.get('admin_id')}"
 
     # Last report (from log)
-    logs = _load_json(LOG_FILE, [])
-    last = next((it for it in reversed(logs) if int(it.get("user_id", 0)) == uid), None)
+    last = report_log.last_one(uid)
     last_line = "-" if not last else f"{last.get('date','-')} · {(last.get('text') or '(media)')[:180]}"
 
     txt = (f"👤 <b>User</b> <code>{uid}</code>\n"
@@ -0,0 +1,2 @@
+# bench/__init__.py
+# سكربتات قياس أداء قابلة للتشغيل يدويًا: python -m bench.<name>
@@ -0,0 +1,94 @@
+# bench/bench_fsm_storage.py
+"""
+مقارنة SQLiteStorage (utils/fsm_storage) مع MemoryStorage في aiogram.
+
+    python -m bench.bench_fsm_storage [--users 20000] [--ops 5]
+
+يقيس set_state / get_state / update_data (عمليات/ثانية) ثم زمن الإقلاع البارد
+(قراءة الحالات من القاعدة بعد إعادة فتحها). يعمل داخل مجلد مؤقت.
+"""
+from __future__ import annotations
+
+import argparse, asyncio, os, tempfile, time
+
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+
+class _Form(StatesGroup):
+    name = State()
+    phone = State()
+
+
+def _keys(n: int):
+    return [StorageKey(bot_id=1, chat_id=uid, user_id=uid) for uid in range(1, n + 1)]
+
+
+async def _measure(storage, keys, ops: int) -> dict:
+    out = {}
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        for k in keys:
+            await storage.set_state(k, _Form.name)
+    out["set_state"] = len(keys) * ops / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        for k in keys:
+            await storage.get_state(k)
+    out["get_state"] = len(keys) * ops / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for i in range(ops):
+        for k in keys:
+            await storage.update_data(k, {"step": i, "name": "x" * 16})
+    out["update_data"] = len(keys) * ops / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    if hasattr(storage, "flush"):
+        await storage.flush()
+    out["flush_ms"] = (time.perf_counter() - t0) * 1000
+    return out
+
+
+async def _run(n: int, ops: int) -> None:
+    from utils.fsm_storage import SQLiteStorage
+
+    keys = _keys(n)
+    mem = await _measure(MemoryStorage(), keys, ops)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fsm.sqlite3")
+        sq = SQLiteStorage(path)
+        res = await _measure(sq, keys, ops)
+        await sq.close()
+
+        # إقلاع بارد: كل مفتاح يُقرأ من القاعدة مرة واحدة
+        sq2 = SQLiteStorage(path)
+        t0 = time.perf_counter()
+        for k in keys:
+            assert await sq2.get_state(k) == _Form.name.state
+        cold = n / (time.perf_counter() - t0)
+        await sq2.close()
+        size = os.path.getsize(path)
+
+    print(f"users x ops        : {n:,} x {ops}")
+    print(f"{'op':<18} {'memory':>14} {'sqlite':>14}")
+    for op in ("set_state", "get_state", "update_data"):
+        print(f"{op:<18} {mem[op]:>12,.0f}/s {res[op]:>12,.0f}/s")
+    print(f"final flush        : {res['flush_ms']:.1f} ms")
+    print(f"cold get_state     : {cold:,.0f}/s")
+    print(f"db size            : {size / 1024:.1f} KiB")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=20_000)
+    ap.add_argument("--ops", type=int, default=5)
+    args = ap.parse_args()
+    asyncio.run(_run(args.users, args.ops))
+
+
+if __name__ == "__main__":
+    main()
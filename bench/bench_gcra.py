@@ -0,0 +1,85 @@
+# bench/bench_gcra.py
+"""
+قياس utils.gcra مقابل نافذة deque المنزلقة السابقة (VipRateLimitMiddleware) عند 1M مفتاح.
+
+    python -m bench.bench_gcra [--keys 1000000] [--hits 3]
+
+لكل تنفيذ: الذاكرة (tracemalloc) بعد hits طلب لكل مفتاح، وزمن الفحص ns/op،
+ثم (GCRA فقط) زمن compact() بعد انقضاء النافذة وعدد المفاتيح المطرودة.
+الساعة وهمية كي تكون النتائج مستقلة عن سرعة الجهاز.
+"""
+from __future__ import annotations
+
+import argparse, gc, time, tracemalloc
+from collections import defaultdict, deque
+
+
+# ---------- التنفيذ السابق (نسخة للمقارنة فقط) ----------
+class _LegacyWindow:
+    def __init__(self, cap: int, window: float):
+        self.cap, self.window = cap, window
+        self.hits = defaultdict(deque)
+
+    def allow(self, key, now: float) -> bool:
+        dq = self.hits[key]
+        while dq and now - dq[0] > self.window:
+            dq.popleft()
+        if len(dq) >= self.cap:
+            return False
+        dq.append(now)
+        return True
+
+
+def _fill(lim, check, keys: int, hits: int) -> float:
+    now = 1000.0
+    for _ in range(hits):
+        for k in range(keys):
+            check(lim, k, now)
+        now += 0.5
+    return now
+
+def _measure(name: str, make, check, keys: int, hits: int):
+    # الزمن بلا tracemalloc (يضخّم كلفة كل تخصيص)، ثم الذاكرة في تمريرة ثانية
+    gc.collect()
+    t0 = time.perf_counter()
+    _fill(make(), check, keys, hits)
+    dt = time.perf_counter() - t0
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    lim = make()
+    now = _fill(lim, check, keys, hits)
+    mem = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    print(f"{name:<14} {mem / 2**20:8.1f} MiB  {mem / keys:6.0f} B/key  "
+          f"{dt / (keys * hits) * 1e9:6.0f} ns/check")
+    return lim, now
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--keys", type=int, default=1_000_000)
+    ap.add_argument("--hits", type=int, default=3)
+    args = ap.parse_args()
+
+    from utils import gcra
+    cap, window = 5, 10.0
+
+    print(f"{args.keys:,} keys × {args.hits} hits, {cap}/{window:.0f}s")
+    _measure("deque window", lambda: _LegacyWindow(cap, window),
+             lambda lim, k, now: lim.allow(k, now), args.keys, args.hits)
+
+    # compaction التلقائي مُعطّل أثناء القياس كي يُقاس منفصلًا أدناه
+    gcra._MIN_COMPACT = 1 << 62
+    lim, now = _measure("gcra", lambda: gcra.Limiter("bench", cap, window),
+                        lambda lim, k, now: lim.hit(k, now=now), args.keys, args.hits)
+
+    t0 = time.perf_counter()
+    evicted = lim.compact(now + window)
+    print(f"compact        {(time.perf_counter() - t0) * 1000:8.1f} ms  "
+          f"evicted {evicted:,} idle keys, {len(lim):,} left")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# bench/bench_keyboards.py
+"""
+قياس بناء لوحة الشاشة الرئيسية (home_hero) مع/بدون utils.kb_cache.
+
+    python -m bench.bench_keyboards [--renders 50000]
+
+يدور على تركيبات (اللغة × VIP × مروّج × مورّد) كما تصل من مستخدمين مختلفين،
+ويطبع عدد اللوحات/ثانية لكل حالة + نسبة الإصابة في الذاكرة.
+"""
+from __future__ import annotations
+
+import argparse, itertools, time
+
+
+def _run(build, combos, n: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(n):
+        lang, vip, prom, sup = combos[i % len(combos)]
+        build(lang, is_vip=vip, is_promoter=prom, is_supplier=sup)
+    return n / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--renders", type=int, default=50_000)
+    args = ap.parse_args()
+
+    import lang
+    lang.t = lang.t_compat   # كما يثبّته bot.py قبل استيراد المعالجات
+    from utils import kb_cache
+    from handlers import home_hero
+
+    combos = list(itertools.product(("ar", "en"), (False, True), (False, True), (False, True)))
+
+    kb_cache.ENABLED = False
+    cold = _run(home_hero._build_main_kb, combos, args.renders)
+    kb_cache.ENABLED = True
+    kb_cache.invalidate()
+    warm = _run(home_hero._build_main_kb, combos, args.renders)
+
+    st = kb_cache.stats().get("home.main", {})
+    print(f"without cache: {cold:10.0f} renders/s")
+    print(f"with cache   : {warm:10.0f} renders/s  (x{warm / cold:.1f}, "
+          f"hits={st.get('hits', 0)} misses={st.get('misses', 0)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# bench/bench_lang.py
+"""
+قياس t() عبر غلاف التوافق (نفس ما تستدعيه المعالجات بعد تثبيت bot.py):
+قبل (قفل + تطبيع + خريطتان مع isinstance) مقابل بعد (كتالوج مُجمّع بلا قفل).
+
+    python -m bench.bench_lang [--calls 500000]
+
+مزيج المفاتيح: موجود بالعربية، فولباك إنجليزي، مفقود، وصيغة (lang, key, fallback).
+"""
+from __future__ import annotations
+
+import argparse, time
+
+import lang
+
+
+# ---------- التنفيذ السابق (نسخة للمقارنة فقط) ----------
+def _legacy_t(lang_code, key):
+    if not key:
+        return ""
+    lang_code = lang._normalize_lang(lang_code)
+    with lang._LOCK:
+        user_map = lang._translations.get(lang_code) or {}
+        if key in user_map and isinstance(user_map[key], str):
+            return user_map[key]
+        en_map = lang._translations.get("en") or {}
+        if key in en_map and isinstance(en_map[key], str):
+            return en_map[key]
+        return key
+
+def _legacy_compat(*args, **kwargs):
+    if len(args) >= 3:
+        lang_code, key, fallback = args[0], args[1], args[2]
+        try:
+            val = _legacy_t(lang_code, key)
+        except Exception:
+            val = None
+        if isinstance(val, str) and val.strip() and val != key:
+            return val
+        return fallback or key or ""
+    try:
+        val = _legacy_t(*args, **kwargs)
+    except Exception:
+        return ""
+    key = args[1] if len(args) >= 2 else None
+    if isinstance(val, str) and val.strip() and (key is None or val != key):
+        return val
+    return ""
+
+
+def _workload(n: int):
+    ar = [k for k, v in lang._translations.get("ar", {}).items() if isinstance(v, str)]
+    en_only = [k for k in lang._translations.get("en", {}) if k not in lang._translations.get("ar", {})]
+    keys = []
+    for i in range(n):
+        r = i % 10
+        if r < 6 and ar:
+            keys.append(("ar", ar[i % len(ar)], None))
+        elif r < 8 and en_only:
+            keys.append(("ar", en_only[i % len(en_only)], None))
+        elif r < 9:
+            keys.append(("en", f"missing.key.{i % 50}", None))
+        else:
+            keys.append(("ar", ar[i % len(ar)] if ar else "x", "fallback"))
+    return keys
+
+
+def _run(fn, work) -> float:
+    t0 = time.perf_counter()
+    for code, key, fb in work:
+        if fb is None:
+            fn(code, key)
+        else:
+            fn(code, key, fb)
+    return len(work) / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=500_000)
+    args = ap.parse_args()
+
+    work = _workload(args.calls)
+    # تحقق من تطابق النتائج قبل القياس
+    bad = sum(1 for c, k, fb in work[:20000]
+              if (_legacy_compat(c, k) if fb is None else _legacy_compat(c, k, fb))
+              != (lang.t_compat(c, k) if fb is None else lang.t_compat(c, k, fb)))
+    print(f"mismatches (first 20k): {bad}")
+
+    for name, fn in (("before", _legacy_compat), ("after ", lang.t_compat),
+                     ("before", _legacy_compat), ("after ", lang.t_compat)):
+        print(f"{name}: {_run(fn, work) / 1e6:6.2f} M calls/s")
+
+
+if __name__ == "__main__":
+    main()
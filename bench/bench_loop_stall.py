@@ -0,0 +1,63 @@
+# bench/bench_loop_stall.py
+"""
+اختبار اصطناعي لكاشف توقّف الحلقة (utils/loop_watchdog).
+
+    python -m bench.bench_loop_stall
+
+يشغّل ثلاث دوال حاجبة معروفة داخل coroutines (sleep متزامن، json.dumps ضخم،
+حلقة CPU) بأزمنة مختلفة، ثم يتحقق أن التقرير ينسب الحجب لكل دالة في موضعها
+الصحيح وبترتيب الزمن. يخرج برمز 1 إن فشلت النسبة.
+"""
+from __future__ import annotations
+
+import asyncio, json, os, sys, time
+
+os.environ.setdefault("LOOP_STALL_MS", "50")
+os.environ.setdefault("LOOP_SAMPLE_MS", "10")
+
+
+def _blocking_sleep(sec: float) -> None:
+    time.sleep(sec)
+
+def _blocking_json(sec: float) -> None:
+    blob = {str(i): ["x" * 40] * 50 for i in range(2000)}
+    end = time.perf_counter() + sec
+    while time.perf_counter() < end:
+        json.dumps(blob, ensure_ascii=False, indent=2)
+
+def _blocking_cpu(sec: float) -> None:
+    end = time.perf_counter() + sec
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+
+
+async def _handler(fn, sec: float) -> None:
+    await asyncio.sleep(0.2)
+    fn(sec)        # حجب متعمّد داخل coroutine
+
+
+async def _run() -> int:
+    from utils import loop_watchdog as wd
+    await wd.start()
+    await asyncio.sleep(0.2)
+    plan = [(_blocking_sleep, 0.9), (_blocking_json, 0.6), (_blocking_cpu, 0.3)]
+    for fn, sec in plan:
+        await _handler(fn, sec)
+    await asyncio.sleep(0.2)
+    await wd.stop()
+
+    print(wd.report(10))
+    rows = wd.top_sites(10)
+    got = [r["site"].rsplit(" ", 1)[-1] for r in rows]
+    expected = [fn.__name__ for fn, _ in plan]
+    ok = got[:3] == expected
+    leaves = next((r["leaves"] for r in rows if r["site"].endswith("_blocking_json")), [])
+    ok = ok and bool(leaves) and leaves[0][0].startswith("json/")
+    ok = ok and int(wd.stats()["stalls"]) >= 3
+    print("\nattribution:", "OK" if ok else f"FAIL (got {got[:3]}, expected {expected})")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_run()))
@@ -0,0 +1,94 @@
+# bench/bench_timers.py
+"""
+قياس خدمة المؤقّتات (utils/timers) عند 100k مؤقّت معلّق.
+
+    python -m bench.bench_timers [--timers 100000] [--spread 5]
+
+يقيس الذاكرة (tracemalloc) وزمن الجدولة واستعادة الدفتر وتأخّر التنفيذ p50/p99.
+يعمل داخل مجلد مؤقت ولا يلمس data/ الحقيقي.
+"""
+from __future__ import annotations
+
+import argparse, asyncio, os, tempfile, time, tracemalloc
+from pathlib import Path
+
+
+def _pct(vals, p: float) -> float:
+    if not vals:
+        return 0.0
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(len(vals) * p))]
+
+
+async def _run(n: int, spread: float) -> None:
+    from utils import timers
+
+    lateness: list[float] = []
+    done = asyncio.Event()
+
+    async def _action(bot, payload):
+        lateness.append(time.time() - payload["due"])
+        if len(lateness) >= n:
+            done.set()
+
+    timers.register_action("bench.noop", _action)
+
+    # 1) الجدولة (بلا tracemalloc) ثم الذاكرة على دفعة مماثلة
+    base = time.time() + 3600
+    t0 = time.perf_counter()
+    for i in range(n):
+        timers.schedule_at("bench.noop", base + i, {"due": base + i}, key=f"b:{i}")
+    t_sched = time.perf_counter() - t0
+    for i in range(n):
+        timers.cancel(f"b:{i}")
+    tracemalloc.start()
+    for i in range(n):
+        timers.schedule_at("bench.noop", base + i, {"due": base + i}, key=f"b:{i}")
+    cur, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # 2) الاستعادة من الدفتر (محاكاة إعادة تشغيل)
+    timers._timers.clear(); timers._heap.clear(); timers._loaded = False
+    t0 = time.perf_counter()
+    timers._ensure_loaded()
+    t_restore = time.perf_counter() - t0
+    assert timers.pending_count() == n
+
+    # 3) التنفيذ: جدولة جديدة بمهلة بدء كافية كي لا يُحتسب زمن الجدولة تأخّرًا
+    for i in range(n):
+        timers.cancel(f"b:{i}")
+    base = time.time() + max(2.0, 1.5 * t_sched)
+    for i in range(n):
+        due = base + spread * i / n
+        timers.schedule_at("bench.noop", due, {"due": due}, key=f"b:{i}")
+    await timers.init_timers(bot=None)
+    await asyncio.wait_for(done.wait(), timeout=spread + 120)
+    timers._loop_task.cancel()
+
+    st = timers.stats()
+    print(f"timers            : {n:,}")
+    print(f"schedule          : {t_sched * 1000:8.1f} ms  ({n / t_sched:,.0f}/s)")
+    print(f"memory (pending)  : {cur / 1024 / 1024:8.1f} MiB  ({cur / n:,.0f} B/timer, incl. payload)")
+    print(f"journal restore   : {t_restore * 1000:8.1f} ms")
+    print(f"lateness p50/p99  : {_pct(lateness, .50) * 1000:.1f} / {_pct(lateness, .99) * 1000:.1f} ms"
+          f"  (max {st['max_lateness'] * 1000:.1f} ms)")
+    print(f"fired/failed      : {st['fired']:,} / {st['failed']:,}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--timers", type=int, default=100_000)
+    ap.add_argument("--spread", type=float, default=5.0, help="seconds over which timers are due")
+    args = ap.parse_args()
+
+    from utils import timers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timers.JOURNAL_FILE = Path(tmp) / "timers.jsonl"
+        timers.COMPACT_MIN_LINES = max(timers.COMPACT_MIN_LINES, args.timers)
+        asyncio.run(_run(args.timers, args.spread))
+        print(f"journal size      : {os.path.getsize(timers.JOURNAL_FILE) / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# bench/bench_updates.py
+"""
+قياس تتبّع إشعارات التحديث (utils/updates) عند 200k مستخدم مُبلَّغ.
+
+    python -m bench.bench_updates [--users 200000]
+
+يعمل داخل مجلد مؤقت ولا يلمس data/ الحقيقي.
+"""
+from __future__ import annotations
+
+import argparse, json, os, tempfile, time
+
+
+def _timeit(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    fn(n)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=200_000)
+    args = ap.parse_args()
+    n = args.users
+
+    from utils import updates
+
+    with tempfile.TemporaryDirectory() as tmp:
+        updates.UPDATE_FILE = os.path.join(tmp, "update.json")
+        updates.NOTIFIED_FILE_TPL = os.path.join(tmp, "update_notified_v{version}.log")
+
+        # حالة قديمة: قائمة notified_users داخل update.json (تُرحَّل مرة واحدة)
+        legacy = {"active": True, "message": {"en": "x", "ar": "x"},
+                  "notified_users": list(range(n)), "active_until": None, "duration_days": None}
+        with open(updates.UPDATE_FILE, "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        t_migrate = _timeit(lambda _: updates.load_update_info(), 1)
+        t_first = _timeit(lambda _: updates.was_user_notified(0), 1)
+
+        probes = 20_000
+        t_check = _timeit(lambda k: [updates.was_user_notified(i) for i in range(k)], probes)
+        t_mark = _timeit(lambda k: [updates.mark_user_notified(n + i) for i in range(k)], probes)
+        updates.flush_notified()
+
+        t_reset = _timeit(lambda _: updates.clear_notified(), 1)
+        assert not updates.was_user_notified(0)
+
+        size = os.path.getsize(updates.UPDATE_FILE)
+
+    print(json.dumps({
+        "notified_users": n,
+        "legacy_migrate_s": round(t_migrate, 4),
+        "first_lookup_s": round(t_first, 4),
+        "was_user_notified_ops_per_s": round(probes / t_check),
+        "mark_user_notified_ops_per_s": round(probes / t_mark),
+        "reset_s": round(t_reset, 5),
+        "update_json_bytes_after_reset": size,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+# bench/load_harness.py
+"""
+اختبار حمل شامل بلا اتصال: Bot API وهمي (aiohttp) + Dispatcher الحقيقي بكل
+الـ middlewares والـ routers التي يسجّلها bot.register_routers.
+
+    python -m bench.load_harness --synthetic 5000 --users 500 --rate 200
+    python -m bench.load_harness updates.jsonl --rate 0 --concurrency 256
+    python -m bench.load_harness --synthetic 2000 --api-latency-ms 40 --api-jitter-ms 20 \\
+        --error-rate 0.02 --errors 429,400,403 --out load.json
+
+- ينسخ المشروع (مع data/) إلى مجلد مؤقت ويعمل داخله، فلا يلمس البيانات الحقيقية
+  حتى للمخازن المبنية على مسار الملف (__file__).
+- Bot API وهمي يجيب sendMessage/editMessageText/copyMessage/sendPhoto/getChatMember...
+  بزمن قابل للضبط وحقن أخطاء (429 مع retry_after، 400، 403)، والجلسة توجَّه إليه
+  عبر TelegramAPIServer.from_base.
+- الإعادة: ملف JSONL/JSON لتحديثات مسجّلة، أو مزيج اصطناعي (أوامر، نص، أزرار).
+  --rate تحديث/ث (0 = بأقصى سرعة ضمن --concurrency).
+- التقرير: الإنتاجية، زمن التحديث p50/p95/p99 (من لحظة الجدولة)، استدعاءات API،
+  ولكل معالج: العدد، p50/p95/p99، وعدد فتح الملفات للقراءة/الكتابة.
+"""
+from __future__ import annotations
+
+import argparse, asyncio, builtins, contextvars, io, json, os, random, shutil, sys, tempfile, time
+from collections import Counter, defaultdict
+from itertools import count
+from typing import Any, Dict, List, Optional
+
+from bench.post_updates import _load, _pct
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TOKEN = "123456789:LOADTEST-offline-harness-token"
+_BOT_USER = {"id": 123456789, "is_bot": True, "first_name": "LoadBot", "username": "load_bot"}
+_NEVER_FAIL = {"getMe", "getMyCommands", "setMyCommands", "deleteWebhook", "setChatMenuButton"}
+
+
+# ---------- Bot API وهمي ----------
+class FakeBotApi:
+    def __init__(self, latency_ms: float, jitter_ms: float, error_rate: float, errors: List[str], seed: int):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.errors = errors or ["429"]
+        self.rng = random.Random(seed)
+        self.calls: Counter = Counter()
+        self.injected: Counter = Counter()
+        self._ids = count(10_000)
+
+    def _chat(self, form) -> Dict[str, Any]:
+        raw = str(form.get("chat_id") or "0")
+        cid = int(raw) if raw.lstrip("-").isdigit() else 0
+        return {"id": cid, "type": "private" if cid >= 0 else "supergroup", "first_name": "Load"}
+
+    def _message(self, form, message_id: Optional[int] = None) -> Dict[str, Any]:
+        return {"message_id": message_id or next(self._ids), "date": int(time.time()),
+                "chat": self._chat(form), "from": _BOT_USER,
+                "text": str(form.get("text") or form.get("caption") or "·")}
+
+    def _result(self, method: str, form) -> Any:
+        m = method.lower()
+        if m == "getme":
+            return _BOT_USER
+        if m == "getchatmember":
+            uid = int(str(form.get("user_id") or "0") or 0)
+            return {"status": "member", "user": {"id": uid, "is_bot": False, "first_name": "Load"}}
+        if m == "getchat":
+            return self._chat(form)
+        if m == "getmycommands":
+            return []
+        if m == "copymessage":
+            return {"message_id": next(self._ids)}
+        if m == "sendmediagroup":
+            return [self._message(form)]
+        if m.startswith("send"):
+            return self._message(form)
+        if m.startswith("edit"):
+            if form.get("inline_message_id"):
+                return True
+            mid = str(form.get("message_id") or "")
+            return self._message(form, int(mid) if mid.isdigit() else None)
+        if m == "getfile":
+            fid = str(form.get("file_id") or "f")
+            return {"file_id": fid, "file_unique_id": fid, "file_path": f"files/{fid}"}
+        return True      # answerCallbackQuery, deleteMessage, setMyCommands, sendChatAction...
+
+    def _error(self, code: str) -> Dict[str, Any]:
+        if code == "429":
+            return {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                    "parameters": {"retry_after": 1}}
+        if code == "403":
+            return {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+        return {"ok": False, "error_code": 400, "description": "Bad Request: message to edit not found"}
+
+    async def handle(self, request):
+        from aiohttp import web
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        form = await request.post()
+        delay = self.latency + (self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and method not in _NEVER_FAIL and self.rng.random() < self.error_rate:
+            code = self.rng.choice(self.errors)
+            self.injected[f"{method}:{code}"] += 1
+            body = self._error(code)
+            return web.json_response(body, status=body["error_code"])
+        return web.json_response({"ok": True, "result": self._result(method, form)})
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        from aiohttp import web
+        app = web.Application(client_max_size=50 * 2**20)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]   # type: ignore[union-attr]
+        return runner, f"http://{host}:{port}"
+
+
+# ---------- عدّ فتح الملفات لكل معالج ----------
+_current: contextvars.ContextVar[str] = contextvars.ContextVar("harness_handler", default="-")
+_io: Dict[str, Counter] = defaultdict(Counter)
+_handler_lat: Dict[str, List[float]] = defaultdict(list)
+
+def _install_io_probe() -> None:
+    real_open = io.open
+
+    def _counting_open(file, mode="r", *args, **kwargs):
+        kind = "write" if any(c in mode for c in "wax+") else "read"
+        _io[_current.get()][kind] += 1
+        return real_open(file, mode, *args, **kwargs)
+
+    builtins.open = _counting_open   # type: ignore[assignment]
+    io.open = _counting_open         # type: ignore[assignment]   pathlib و os.fdopen يمرّان من هنا
+
+
+def _probe_middleware():
+    from aiogram import BaseMiddleware
+    from middlewares.metrics import _handler_name
+
+    class _HandlerProbe(BaseMiddleware):
+        async def __call__(self, handler, event, data):
+            name = _handler_name(data.get("handler"))
+            token = _current.set(name)
+            t0 = time.perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                _handler_lat[name].append(time.perf_counter() - t0)
+                _current.reset(token)
+
+    return _HandlerProbe()
+
+
+# ---------- التحديثات الاصطناعية ----------
+_MIX = [  # (الوزن، النوع، المحتوى)
+    (35, "msg", "/start"),
+    (8,  "msg", "/help"),
+    (6,  "msg", "/rewards"),
+    (5,  "msg", "/language"),
+    (6,  "msg", "hello"),
+    (20, "cb",  "back_to_menu"),
+    (8,  "cb",  "rwd:hub:wallet"),
+    (7,  "cb",  "sec:refresh:main"),
+    (5,  "cb",  "noop"),
+]
+
+def _synthetic(n: int, users: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    weights = [w for w, _, _ in _MIX]
+    now = int(time.time())
+    out = []
+    for i in range(n):
+        uid = 20_000_000 + rng.randrange(max(1, users))
+        user = {"id": uid, "is_bot": False, "first_name": "Load", "language_code": rng.choice(("en", "ar"))}
+        chat = {"id": uid, "type": "private", "first_name": "Load"}
+        _, kind, payload = rng.choices(_MIX, weights)[0]
+        upd: Dict[str, Any] = {"update_id": 5_000_000 + i}
+        if kind == "msg":
+            msg = {"message_id": i + 1, "date": now, "chat": chat, "from": user, "text": payload}
+            if payload.startswith("/"):
+                msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(payload)}]
+            upd["message"] = msg
+        else:
+            upd["callback_query"] = {
+                "id": f"cb{i}", "from": user, "chat_instance": str(uid), "data": payload,
+                "message": {"message_id": 1 + i % 50, "date": now, "chat": chat, "from": _BOT_USER,
+                            "text": "menu"},
+            }
+        out.append(upd)
+    return out
+
+
+# ---------- بيئة معزولة ----------
+def _sandbox(keep: bool) -> str:
+    tmp = tempfile.mkdtemp(prefix="load_harness_")
+    dst = os.path.join(tmp, "app")
+    shutil.copytree(_ROOT, dst, ignore=shutil.ignore_patterns(".git", "__pycache__", "*.pyc", ".venv", "venv"))
+    os.chdir(dst)
+    sys.path.insert(0, dst)
+    if not keep:
+        import atexit
+        atexit.register(shutil.rmtree, tmp, True)
+    return dst
+
+
+# ---------- التشغيل ----------
+async def _run(args, raws: List[Dict[str, Any]]) -> Dict[str, Any]:
+    import logging
+    api = FakeBotApi(args.api_latency_ms, args.api_jitter_ms, args.error_rate,
+                     [e.strip() for e in args.errors.split(",") if e.strip()], args.seed)
+    runner, base = await api.start()
+
+    os.environ["BOT_TOKEN"] = _TOKEN
+    import bot as botmod                                          # يستورد كل المعالجات كما في الإنتاج
+    logging.getLogger().setLevel(getattr(logging, args.log_level.upper(), logging.WARNING))
+    from aiogram import Dispatcher
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.dispatcher.event.bases import UNHANDLED
+    from aiogram.types import Update
+
+    bot = botmod._make_bot()
+    bot.session.api = TelegramAPIServer.from_base(base)
+    dp = Dispatcher(storage=botmod._make_storage())
+    botmod.register_routers(dp)
+    probe = _probe_middleware()
+    dp.message.middleware(probe); dp.callback_query.middleware(probe)
+    workflow = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow)
+    _install_io_probe()
+    api.calls.clear()
+
+    lat: List[float] = []
+    outcome: Counter = Counter()
+    sem = asyncio.Semaphore(max(1, args.concurrency))
+
+    async def _one(raw: Dict[str, Any], t0: float) -> None:
+        async with sem:
+            try:
+                upd = Update.model_validate(raw, context={"bot": bot})
+                res = await dp.feed_update(bot, upd)
+                outcome["unhandled" if res is UNHANDLED else "handled"] += 1
+            except Exception as e:
+                outcome[f"error:{type(e).__name__}"] += 1
+            finally:
+                lat.append(time.perf_counter() - t0)
+
+    tasks = []
+    start = time.perf_counter()
+    for i, raw in enumerate(raws):
+        if args.rate > 0:
+            delay = start + i / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_one(raw, time.perf_counter())))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    await dp.emit_shutdown(bot=bot, **workflow)
+    await bot.session.close()
+    await runner.cleanup()
+
+    handlers = {}
+    for name in sorted(set(_handler_lat) | set(_io), key=lambda n: -len(_handler_lat.get(n, ()))):
+        vals = _handler_lat.get(name, [])
+        handlers[name] = {
+            "count": len(vals),
+            "p50_ms": round(_pct(vals, .50) * 1000, 2), "p95_ms": round(_pct(vals, .95) * 1000, 2),
+            "p99_ms": round(_pct(vals, .99) * 1000, 2),
+            "file_reads": _io[name]["read"], "file_writes": _io[name]["write"],
+            "reads_per_update": round(_io[name]["read"] / len(vals), 2) if vals else None,
+            "writes_per_update": round(_io[name]["write"] / len(vals), 2) if vals else None,
+        }
+    return {
+        "updates": len(raws), "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(raws) / elapsed, 1) if elapsed else None,
+        "target_rate": args.rate, "concurrency": args.concurrency,
+        "latency_ms": {"p50": round(_pct(lat, .50) * 1000, 2), "p95": round(_pct(lat, .95) * 1000, 2),
+                       "p99": round(_pct(lat, .99) * 1000, 2), "max": round(max(lat, default=0) * 1000, 2)},
+        "outcome": dict(outcome),
+        "api": {"latency_ms": args.api_latency_ms, "error_rate": args.error_rate,
+                "calls": dict(api.calls.most_common()), "injected_errors": dict(api.injected)},
+        "handlers": handlers,
+    }
+
+
+def _print(res: Dict[str, Any]) -> None:
+    lat = res["latency_ms"]
+    print(f"updates    : {res['updates']:,} in {res['elapsed_s']}s → {res['throughput_per_s']}/s "
+          f"(target {res['target_rate'] or 'max'}, concurrency {res['concurrency']})")
+    print(f"latency ms : p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    print(f"outcome    : {res['outcome']}")
+    print(f"api calls  : {sum(res['api']['calls'].values()):,} {res['api']['calls']}")
+    if res["api"]["injected_errors"]:
+        print(f"injected   : {res['api']['injected_errors']}")
+    print(f"\n{'handler':<48} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'rd/upd':>7} {'wr/upd':>7}")
+    for name, h in res["handlers"].items():
+        print(f"{name[:48]:<48} {h['count']:>6} {h['p50_ms']:>8} {h['p95_ms']:>8} {h['p99_ms']:>8} "
+              f"{h['reads_per_update'] if h['count'] else h['file_reads']:>7} "
+              f"{h['writes_per_update'] if h['count'] else h['file_writes']:>7}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("file", nargs="?", help="recorded updates (JSONL or JSON array)")
+    ap.add_argument("--synthetic", type=int, default=0)
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--rate", type=float, default=0.0, help="updates/s, 0 = as fast as possible")
+    ap.add_argument("--concurrency", type=int, default=256)
+    ap.add_argument("--api-latency-ms", type=float, default=30.0)
+    ap.add_argument("--api-jitter-ms", type=float, default=10.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--errors", default="429,400,403")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--keep-sandbox", action="store_true")
+    ap.add_argument("--log-level", default="WARNING")
+    args = ap.parse_args()
+
+    if args.file:
+        raws = _load(os.path.abspath(args.file))
+    elif args.synthetic:
+        raws = _synthetic(args.synthetic, args.users, args.seed)
+    else:
+        ap.error("give a recorded updates file or --synthetic N")
+    out = os.path.abspath(args.out) if args.out else None
+
+    where = _sandbox(args.keep_sandbox)
+    res = asyncio.run(_run(args, raws))
+    res["sandbox"] = where if args.keep_sandbox else None
+    _print(res)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+        print(f"\nresults → {out}")
+
+
+if __name__ == "__main__":
+    main()
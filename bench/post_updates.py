@@ -0,0 +1,96 @@
+# bench/post_updates.py
+"""
+يرسل Update JSON مسجّلة إلى خادم webhook المحلي (BOT_MODE=webhook بدون WEBHOOK_URL).
+
+    python -m bench.post_updates updates.jsonl [--url http://127.0.0.1:8080/tg/webhook]
+    python -m bench.post_updates --synthetic 5000 --concurrency 200
+
+الملف: JSONL (تحديث في كل سطر) أو مصفوفة JSON. --synthetic يولّد رسائل /start.
+يطبع توزيع رموز الاستجابة (200 مقبول، 503 ضغط عكسي) وزمن الإرسال p50/p99.
+"""
+from __future__ import annotations
+
+import argparse, asyncio, json, os, time
+from collections import Counter
+
+import aiohttp
+
+
+def _load(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        txt = f.read().strip()
+    if txt.startswith("["):
+        return json.loads(txt)
+    return [json.loads(line) for line in txt.splitlines() if line.strip()]
+
+
+def _synthetic(n: int, users: int) -> list:
+    now = int(time.time())
+    out = []
+    for i in range(n):
+        uid = 10_000_000 + (i % users)
+        out.append({
+            "update_id": 1_000_000 + i,
+            "message": {
+                "message_id": i + 1, "date": now,
+                "chat": {"id": uid, "type": "private", "first_name": "Load"},
+                "from": {"id": uid, "is_bot": False, "first_name": "Load", "language_code": "en"},
+                "text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        })
+    return out
+
+
+def _pct(vals, p: float) -> float:
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(len(vals) * p))] if vals else 0.0
+
+
+async def _run(url: str, updates: list, concurrency: int, secret: str) -> None:
+    codes: Counter = Counter()
+    lat: list[float] = []
+    sem = asyncio.Semaphore(max(1, concurrency))
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+
+    async with aiohttp.ClientSession(headers=headers) as s:
+        async def _one(u):
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    async with s.post(url, json=u) as r:
+                        codes[r.status] += 1
+                except Exception as e:
+                    codes[type(e).__name__] += 1
+                lat.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(_one(u) for u in updates))
+        total = time.perf_counter() - t0
+
+    print(f"updates      : {len(updates):,} in {total:.2f}s ({len(updates) / total:,.0f}/s)")
+    print(f"responses    : {dict(codes)}")
+    print(f"post p50/p99 : {_pct(lat, .5) * 1000:.1f} / {_pct(lat, .99) * 1000:.1f} ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("file", nargs="?")
+    ap.add_argument("--url", default=f"http://127.0.0.1:{os.getenv('WEBHOOK_PORT', '8080')}"
+                                     f"{os.getenv('WEBHOOK_PATH', '/tg/webhook')}")
+    ap.add_argument("--synthetic", type=int, default=0)
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=100)
+    ap.add_argument("--secret", default=os.getenv("WEBHOOK_SECRET", ""))
+    args = ap.parse_args()
+
+    if args.file:
+        updates = _load(args.file)
+    elif args.synthetic:
+        updates = _synthetic(args.synthetic, args.users)
+    else:
+        ap.error("give a recorded updates file or --synthetic N")
+    asyncio.run(_run(args.url, updates, args.concurrency, args.secret))
+
+
+if __name__ == "__main__":
+    main()
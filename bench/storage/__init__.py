@@ -0,0 +1,216 @@
+# bench/storage/__init__.py
+"""
+حزمة قياس دقيق لمخازن JSON (utils/* و middlewares/*) على بيانات اصطناعية.
+
+    python -m bench.storage                                  # 1k,10k,100k → جدول
+    python -m bench.storage --sizes 1k,10k --out storage.json
+    python -m bench.storage --stores vip_store,lang --sizes 10k
+    python -m bench.storage --compare storage.json           # تشغيل جديد مقابل خط أساس
+    python -m bench.storage --compare base.json new.json     # مقارنة ملفين بلا تشغيل
+
+- كل حجم يعمل في عملية مستقلة داخل نسخة مؤقتة من المشروع (data/ فارغة)، فالمسارات
+  المبنية على __file__ أو على المجلد الحالي وذاكرات الوحدات تبدأ نظيفة، ولا تُلمس
+  البيانات الحقيقية.
+- لكل مخزن دالة seed تكتب ملفاته بصيغته الفعلية لـ n مستخدم قبل تشغيل عملياته.
+- لكل عملية: ops/sec (تمريرة توقيت حتى --min-time)، ثم تمريرة I/O منفصلة تعدّ
+  فتح الملفات للقراءة/الكتابة والبايتات المقروءة/المكتوبة لكل عملية.
+- المخزن الذي يفشل استيراده (مثل اعتماده على aiogram) يُسجَّل skipped مع السبب.
+
+تعريف المخازن والعمليات في bench/storage/cases.py.
+"""
+from __future__ import annotations
+
+import asyncio, builtins, gc, importlib, io, os, random, time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+OpFn = Callable[[Any, "Ctx", int], Any]
+
+
+# ---------- السجل ----------
+class Store:
+    """مخزن واحد: الوحدة، دالة توليد البيانات، والعمليات المقيسة."""
+
+    def __init__(self, name: str, module: str, seed: Callable[[Any, "Ctx"], List[str]]):
+        self.name = name
+        self.module = module
+        self.seed = seed
+        self.ops: List[Tuple[str, str, OpFn]] = []   # (الاسم، النوع read/write/scan، الدالة)
+
+    def op(self, name: str, kind: str = "read"):
+        def deco(fn: OpFn) -> OpFn:
+            self.ops.append((name, kind, fn))
+            return fn
+        return deco
+
+
+_STORES: Dict[str, Store] = {}
+
+def store(name: str, module: str, seed: Callable[[Any, "Ctx"], List[str]]) -> Store:
+    st = _STORES[name] = Store(name, module, seed)
+    return st
+
+def stores() -> List[Store]:
+    from bench.storage import cases  # noqa: F401  (يسجّل المخازن)
+    return list(_STORES.values())
+
+
+class Ctx:
+    """سياق حجم واحد: n، مولّد عشوائي ثابت، ومعرّفات المستخدمين."""
+
+    BASE_UID = 10_000_000
+
+    def __init__(self, n: int, seed: int):
+        self.n = n
+        self.rng = random.Random(seed)
+        self.now = int(time.time())
+        self.extra: Dict[str, Any] = {}
+        # ترتيب وصول مبعثر كي لا تستفيد العمليات من تجاور المفاتيح
+        self._order = list(range(n))
+        self.rng.shuffle(self._order)
+
+    def uid(self, i: int) -> int:
+        """مستخدم موجود في البيانات."""
+        return self.BASE_UID + self._order[i % self.n]
+
+    def new_uid(self, i: int) -> int:
+        """مستخدم غير موجود (إدراج)."""
+        return self.BASE_UID + self.n + i
+
+    def uids(self):
+        return range(self.BASE_UID, self.BASE_UID + self.n)
+
+
+# ---------- عدّ I/O ----------
+_io: Counter = Counter()
+
+class _Tracked:
+    """غلاف ملف يسجّل حجم ما كُتب عند الإغلاق (تمريرة I/O فقط، لا يدخل في التوقيت)."""
+    __slots__ = ("_f", "_start")
+
+    def __init__(self, f, start: int):
+        self._f = f
+        self._start = start
+
+    def __getattr__(self, k):
+        return getattr(self._f, k)
+
+    def __iter__(self):
+        return iter(self._f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if not self._f.closed:
+            try:
+                self._f.flush()
+                _io["bytes_written"] += os.fstat(self._f.fileno()).st_size - self._start
+            except Exception:
+                pass
+        self._f.close()
+
+
+def _fsize(file) -> int:
+    try:
+        return os.fstat(file).st_size if isinstance(file, int) else os.stat(file).st_size
+    except Exception:
+        return 0
+
+class _Probe:
+    def __enter__(self):
+        self._real = io.open
+        real = self._real
+
+        def _open(file, mode="r", *args, **kwargs):
+            if any(c in mode for c in "wax+"):
+                _io["writes"] += 1
+                start = _fsize(file) if ("a" in mode or "+" in mode) else 0
+                return _Tracked(real(file, mode, *args, **kwargs), start)
+            _io["reads"] += 1
+            _io["bytes_read"] += _fsize(file)
+            return real(file, mode, *args, **kwargs)
+
+        builtins.open = _open   # type: ignore[assignment]
+        io.open = _open         # type: ignore[assignment]   pathlib و os.fdopen يمرّان من هنا
+        _io.clear()
+        return _io
+
+    def __exit__(self, *exc):
+        builtins.open = self._real   # type: ignore[assignment]
+        io.open = self._real         # type: ignore[assignment]
+
+
+# ---------- القياس ----------
+def _call(loop, fn: OpFn, mod, ctx: Ctx, i: int) -> None:
+    r = fn(mod, ctx, i)
+    if asyncio.iscoroutine(r):
+        loop.run_until_complete(r)
+
+def measure(loop, fn: OpFn, mod, ctx: Ctx, min_time: float, max_ops: int, io_ops: int) -> Dict[str, float]:
+    _call(loop, fn, mod, ctx, 0)   # إحماء (استيراد كسول، ذاكرات، إنشاء ملفات)
+    gc.collect()
+    i, t0 = 1, time.perf_counter()
+    while True:
+        _call(loop, fn, mod, ctx, i)
+        i += 1
+        dt = time.perf_counter() - t0
+        if dt >= min_time or i > max_ops:
+            break
+    done = i - 1
+
+    k = max(1, min(io_ops, done))
+    with _Probe() as c:
+        for j in range(k):
+            _call(loop, fn, mod, ctx, i + j)
+    return {
+        "ops": done,
+        "ops_per_sec": round(done / dt, 2),
+        "us_per_op": round(dt / done * 1e6, 2),
+        "reads_per_op": round(c["reads"] / k, 2),
+        "writes_per_op": round(c["writes"] / k, 2),
+        "bytes_read_per_op": round(c["bytes_read"] / k),
+        "bytes_written_per_op": round(c["bytes_written"] / k),
+    }
+
+
+def run_size(n: int, *, only: Optional[List[str]] = None, min_time: float = 0.3,
+             max_ops: int = 100_000, io_ops: int = 3, seed: int = 1,
+             log: Callable[[str], None] = print) -> Dict[str, Any]:
+    """يشغّل كل المخازن لحجم واحد داخل المجلد الحالي (نسخة المشروع المؤقتة)."""
+    out: Dict[str, Any] = {}
+    loop = asyncio.new_event_loop()
+    try:
+        for st in stores():
+            if only and st.name not in only:
+                continue
+            try:
+                mod = importlib.import_module(st.module)
+            except Exception as e:
+                out[st.name] = {"skipped": f"{type(e).__name__}: {e}"}
+                log(f"[{n}] {st.name}: skipped ({type(e).__name__}: {e})")
+                continue
+            ctx = Ctx(n, seed)
+            t0 = time.perf_counter()
+            files = st.seed(mod, ctx) or []
+            res: Dict[str, Any] = {
+                "dataset_bytes": sum(_fsize(p) for p in files),
+                "seed_sec": round(time.perf_counter() - t0, 3),
+                "ops": {},
+            }
+            for name, kind, fn in st.ops:
+                try:
+                    r = measure(loop, fn, mod, ctx, min_time, max_ops, io_ops)
+                except Exception as e:
+                    r = {"error": f"{type(e).__name__}: {e}"}
+                r["kind"] = kind
+                res["ops"][name] = r
+                log(f"[{n}] {st.name}.{name}: " + (r.get("error") or
+                    f"{r['ops_per_sec']:,.0f} ops/s, {r['bytes_written_per_op']:,} B written/op"))
+            out[st.name] = res
+    finally:
+        loop.close()
+    return out
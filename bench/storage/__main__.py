@@ -0,0 +1,199 @@
+# bench/storage/__main__.py
+from __future__ import annotations
+
+import argparse, json, os, platform, shutil, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# بيانات التشغيل الحقيقية لا تُنسخ إلى النسخة المؤقتة (كل مخزن يكتب بياناته الاصطناعية)
+_ROOT_SKIP = {".git", "data", "user_langs.json", "user_stats.json", "maintenance_state.json", "run.log"}
+
+
+def _size(s: str) -> int:
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+def _label(n: int) -> str:
+    return f"{n // 1000}k" if n >= 1000 and n % 1000 == 0 else str(n)
+
+
+# ---------- النسخة المؤقتة ----------
+def _sandbox() -> Tuple[str, str]:
+    tmp = tempfile.mkdtemp(prefix="bench_storage_")
+    dst = os.path.join(tmp, "app")
+
+    def _ignore(path: str, names: List[str]) -> List[str]:
+        skip = [n for n in names if n in ("__pycache__", ".venv", "venv") or n.endswith(".pyc")]
+        if os.path.abspath(path) == _ROOT:
+            skip += [n for n in names if n in _ROOT_SKIP]
+        return skip
+
+    shutil.copytree(_ROOT, dst, ignore=_ignore)
+    os.makedirs(os.path.join(dst, "data"), exist_ok=True)
+    return tmp, dst
+
+def _run_size(n: int, args) -> Dict[str, Any]:
+    tmp, app = _sandbox()
+    dump = os.path.join(tmp, "result.json")
+    cmd = [sys.executable, "-m", "bench.storage", "--worker", str(n), "--dump", dump,
+           "--min-time", str(args.min_time), "--max-ops", str(args.max_ops),
+           "--io-ops", str(args.io_ops), "--seed", str(args.seed)]
+    if args.stores:
+        cmd += ["--stores", args.stores]
+    try:
+        rc = subprocess.call(cmd, cwd=app, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"))
+        if rc != 0 or not os.path.exists(dump):
+            return {"error": f"worker exited with {rc}"}
+        with open(dump, "r", encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        if args.keep_sandbox:
+            print(f"sandbox kept → {app}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+# ---------- العرض والمقارنة ----------
+def _rows(res: Dict[str, Any]):
+    """(size, store, op) → نتيجة العملية، لكل العمليات الناجحة."""
+    for size, by_store in (res.get("results") or {}).items():
+        for st, r in (by_store or {}).items():
+            if not isinstance(r, dict):
+                continue
+            for op, m in (r.get("ops") or {}).items():
+                if "ops_per_sec" in m:
+                    yield (size, st, op), m
+
+def _print(res: Dict[str, Any]) -> None:
+    for size, by_store in (res.get("results") or {}).items():
+        print(f"\n== {size} users ==")
+        if isinstance(by_store.get("error"), str):
+            print(f"  {by_store['error']}")
+            continue
+        print(f"{'store.op':<44}{'kind':>6}{'ops/s':>12}{'µs/op':>12}{'B read/op':>13}{'B written/op':>14}{'w/op':>6}")
+        for st, r in by_store.items():
+            if "skipped" in r or "error" in r:
+                print(f"{st:<44}  {r.get('skipped') or r.get('error')}")
+                continue
+            for op, m in r["ops"].items():
+                name = f"{st}.{op}"
+                if "error" in m:
+                    print(f"{name:<44}{m['kind']:>6}  error: {m['error']}")
+                    continue
+                print(f"{name:<44}{m['kind']:>6}{m['ops_per_sec']:>12,.0f}{m['us_per_op']:>12,.1f}"
+                      f"{m['bytes_read_per_op']:>13,}{m['bytes_written_per_op']:>14,}{m['writes_per_op']:>6g}")
+
+def _pct(old: float, new: float) -> Optional[float]:
+    return (new - old) / old * 100.0 if old else None
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> int:
+    """يطبع الفروق لكل عملية مشتركة؛ يرجع عدد التراجعات فوق threshold%."""
+    old = dict(_rows(base))
+    ran = {k[:2] for k, _ in _rows(new)}
+    regressions = 0
+    print(f"\n{'size/store.op':<50}{'ops/s':>22}{'Δ':>9}{'B written/op':>26}{'Δ':>9}")
+    for key, m in _rows(new):
+        b = old.pop(key, None)
+        name = f"{key[0]}/{key[1]}.{key[2]}"
+        if b is None:
+            print(f"{name:<50}{'(new)':>22}")
+            continue
+        d_ops = _pct(b["ops_per_sec"], m["ops_per_sec"])
+        d_bw = _pct(b["bytes_written_per_op"], m["bytes_written_per_op"])
+        bad = (d_ops is not None and d_ops < -threshold) or \
+              (m["bytes_written_per_op"] > b["bytes_written_per_op"] and (d_bw is None or d_bw > threshold))
+        regressions += bad
+        fmt = lambda d: "" if d is None else f"{d:+.1f}%"
+        print(f"{name:<50}{b['ops_per_sec']:>10,.0f} → {m['ops_per_sec']:>8,.0f}{fmt(d_ops):>9}"
+              f"{b['bytes_written_per_op']:>12,} → {m['bytes_written_per_op']:>10,}{fmt(d_bw):>9}"
+              f"{'  !' if bad else ''}")
+    for key in old:
+        if key[:2] in ran:   # مخازن/أحجام لم تُشغَّل هذه المرة لا تُعدّ مفقودة
+            print(f"{key[0] + '/' + key[1] + '.' + key[2]:<50}{'(missing)':>22}")
+    print(f"\n{regressions} regression(s) beyond {threshold:g}%")
+    return regressions
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def main() -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.storage",
+                                 description="Micro-benchmarks for the JSON-backed stores.")
+    ap.add_argument("--sizes", default="1k,10k,100k", help="users per dataset, e.g. 1k,10k,100k")
+    ap.add_argument("--stores", default="", help="comma-separated store names (default: all)")
+    ap.add_argument("--list", action="store_true", help="list stores and ops, then exit")
+    ap.add_argument("--min-time", type=float, default=0.3, help="seconds of timing per op")
+    ap.add_argument("--max-ops", type=int, default=100_000)
+    ap.add_argument("--io-ops", type=int, default=3, help="calls per op in the I/O counting pass")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", nargs="+", metavar="JSON",
+                    help="BASE [NEW]: compare NEW (or a fresh run) against BASE")
+    ap.add_argument("--threshold", type=float, default=10.0, help="regression threshold in %%")
+    ap.add_argument("--fail", action="store_true", help="exit 1 if --compare finds regressions")
+    ap.add_argument("--keep-sandbox", action="store_true")
+    ap.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    ap.add_argument("--dump", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    only = [s.strip() for s in args.stores.split(",") if s.strip()] or None
+
+    if args.worker:   # داخل النسخة المؤقتة: حجم واحد → ملف dump
+        from bench.storage import run_size
+        res = run_size(args.worker, only=only, min_time=args.min_time, max_ops=args.max_ops,
+                       io_ops=args.io_ops, seed=args.seed, log=lambda s: print(s, flush=True))
+        with open(args.dump, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False)
+        return 0
+
+    if args.list:
+        from bench.storage import stores
+        for st in stores():
+            print(f"{st.name:<22} {st.module:<30} " + ", ".join(f"{n}({k})" for n, k, _ in st.ops))
+        return 0
+
+    if args.compare and len(args.compare) > 2:
+        ap.error("--compare takes BASE [NEW]")
+    if args.compare and len(args.compare) == 2:
+        n = compare(_load(args.compare[0]), _load(args.compare[1]), args.threshold)
+        return 1 if (n and args.fail) else 0
+
+    res: Dict[str, Any] = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "min_time": args.min_time, "io_ops": args.io_ops, "seed": args.seed,
+        },
+        "results": {},
+    }
+    t0 = time.perf_counter()
+    for n in [_size(s) for s in args.sizes.split(",") if s.strip()]:
+        res["results"][_label(n)] = _run_size(n, args)
+    res["meta"]["wall_sec"] = round(time.perf_counter() - t0, 1)
+
+    _print(res)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+        print(f"\nresults → {args.out}")
+    if args.compare:
+        n = compare(_load(args.compare[0]), res, args.threshold)
+        return 1 if (n and args.fail) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+# bench/storage/cases.py
+"""
+المخازن المقيسة: لكل مخزن seed يكتب ملفاته بصيغته الفعلية لـ ctx.n مستخدم،
+ثم عملياته العامة (read / write / scan). المستخدم المختار في كل نداء مبعثر
+(ctx.uid)، والإدراج يستخدم مستخدمين جددًا (ctx.new_uid).
+"""
+from __future__ import annotations
+
+import json, os
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from bench.storage import Ctx, store
+
+
+def _write(path: str, obj: Any) -> str:
+    # نفس تنسيق المخازن (indent=2) كي يطابق حجم الملف الإنتاج
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+    return path
+
+def _iso(ts: float, naive: bool = False) -> str:
+    dt = datetime.fromtimestamp(ts, timezone.utc)
+    return (dt.replace(tzinfo=None) if naive else dt).isoformat()
+
+def _fraction(ctx: Ctx, frac: float, floor: int = 10) -> List[int]:
+    return [ctx.uid(i) for i in range(min(ctx.n, max(floor, int(ctx.n * frac))))]
+
+
+# ====================== utils/vip_store ======================
+def _seed_vip(mod, ctx: Ctx) -> List[str]:
+    users: Dict[str, Any] = {}
+    for i, uid in enumerate(ctx.uids()):
+        meta: Dict[str, Any] = {"app_id": f"app{i:07d}", "added_by": 1, "ts": ctx.now - 86400 * 30}
+        if i % 5:   # 80% بمدة، 5% منها منتهية
+            meta["expiry_ts"] = ctx.now + ctx.rng.randint(1, 60) * 86400 * (-1 if i % 20 == 1 else 1)
+            meta["notified"] = {"d1": False, "h12": False, "h6": False, "h1": False}
+        users[str(uid)] = meta
+    pending = {str(u): {"app_id": f"app-p{u}", "ts": ctx.now} for u in _fraction(ctx, 0.1)}
+    blocked = {str(u): {"reason": "spam", "ts": ctx.now} for u in _fraction(ctx, 0.05)}
+    return [_write(mod.VIP_FILE, {"users": users}),
+            _write(mod.PENDING_FILE, {"items": pending}),
+            _write(mod.BLOCK_FILE, {"blocked": blocked})]
+
+vip = store("vip_store", "utils.vip_store", _seed_vip)
+
+@vip.op("is_vip")
+def _(mod, ctx, i): mod.is_vip(ctx.uid(i))
+
+@vip.op("get_vip_meta")
+def _(mod, ctx, i): mod.get_vip_meta(ctx.uid(i))
+
+@vip.op("is_blocked")
+def _(mod, ctx, i): mod.is_blocked(ctx.uid(i))
+
+@vip.op("get_pending")
+def _(mod, ctx, i): mod.get_pending(ctx.uid(i))
+
+@vip.op("add_vip", "write")
+def _(mod, ctx, i): mod.add_vip(ctx.uid(i), f"app-x{i}", added_by=1, days=30)
+
+@vip.op("extend_vip_days", "write")
+def _(mod, ctx, i): mod.extend_vip_days(ctx.uid(i), 7)
+
+@vip.op("set_notify_flag", "write")
+def _(mod, ctx, i): mod.set_notify_flag(ctx.uid(i), "d1")
+
+@vip.op("add_pending", "write")
+def _(mod, ctx, i): mod.add_pending(ctx.new_uid(i), f"app-n{i}", ticket_id=f"t{i}")
+
+@vip.op("find_uid_by_app", "scan")
+def _(mod, ctx, i): mod.find_uid_by_app(f"app{ctx.rng.randrange(ctx.n):07d}")
+
+@vip.op("search_vips_by_app_prefix", "scan")
+def _(mod, ctx, i): mod.search_vips_by_app_prefix(f"app{ctx.rng.randrange(10)}")
+
+@vip.op("purge_expired", "scan")
+def _(mod, ctx, i): mod.purge_expired()
+
+
+# ====================== utils/rewards_store ======================
+def _seed_rewards(mod, ctx: Ctx) -> List[str]:
+    users: Dict[str, Any] = {}
+    for i, uid in enumerate(ctx.uids()):
+        hist = [{"t": ctx.now - k * 3600, "type": "daily", "amount": 10, "note": "daily"} for k in range(3)]
+        users[str(uid)] = {
+            "points": 1000, "blocked": i % 50 == 0, "created_at": ctx.now - 86400,
+            "updated_at": ctx.now - i, "last_actions": {}, "daily_date": "",
+            "warns": 0, "earned": 30, "spent": 0, "streak": 1, "last_claim": None,
+            "history": hist,
+        }
+    return [_write(str(mod.USERS_FILE), users)]
+
+rewards = store("rewards_store", "utils.rewards_store", _seed_rewards)
+
+@rewards.op("get_points")
+def _(mod, ctx, i): mod.get_points(ctx.uid(i))
+
+@rewards.op("get_history")
+def _(mod, ctx, i): mod.get_history(ctx.uid(i), 0, 10)
+
+@rewards.op("add_points", "write")
+def _(mod, ctx, i): mod.add_points(ctx.uid(i), 5, "bench", typ="admin")
+
+@rewards.op("spend_points", "write")
+def _(mod, ctx, i): mod.spend_points(ctx.uid(i), 1, "bench")
+
+@rewards.op("log_history", "write")
+def _(mod, ctx, i): mod.log_history(ctx.uid(i), "bonus", 1, "bench")
+
+@rewards.op("daily_claim", "write")
+def _(mod, ctx, i): mod.daily_claim(ctx.uid(i), 10)
+
+@rewards.op("list_blocked_users", "scan")
+def _(mod, ctx, i): mod.list_blocked_users(0, 20)
+
+
+# ====================== utils/user_stats ======================
+def _seed_user_stats(mod, ctx: Ctx) -> List[str]:
+    stats = {str(uid): {"last_seen": _iso(ctx.now - (i % 3) * 86400), "visits": i % 40 + 1,
+                        "username": f"user{i}"}
+             for i, uid in enumerate(ctx.uids())}
+    return [_write(mod.USERS_LIST, list(ctx.uids())), _write(mod.USER_STATS, stats)]
+
+user_stats = store("user_stats", "utils.user_stats", _seed_user_stats)
+
+@user_stats.op("get_user_stats")
+def _(mod, ctx, i): mod.get_user_stats(ctx.uid(i))
+
+@user_stats.op("log_user", "write")
+def _(mod, ctx, i): mod.log_user(ctx.uid(i), username=f"user{i}")
+
+@user_stats.op("get_total_users", "scan")
+def _(mod, ctx, i): mod.get_total_users()
+
+@user_stats.op("get_active_users_today", "scan")
+def _(mod, ctx, i): mod.get_active_users_today()
+
+
+# ====================== utils/alerts_inbox ======================
+def _seed_alerts(mod, ctx: Ctx) -> List[str]:
+    # الإشعارات عامة (ليست لكل مستخدم): 1% من المستخدمين كعدد تقريبي
+    alerts = [{"id": f"a{k}", "en": "Maintenance tonight", "ar": "صيانة الليلة", "kind": "info",
+               "exp": ctx.now + 86400 if k % 4 else 0} for k in range(max(10, ctx.n // 100))]
+    inbox = {str(uid): {"mid": 1000 + i} for i, uid in enumerate(ctx.uids())}
+    ctx.extra["alerts"] = len(alerts)
+    return [_write(str(mod.BOX_FILE), {"alerts": alerts}), _write(str(mod.INBOX_FILE), inbox)]
+
+alerts = store("alerts_inbox", "utils.alerts_inbox", _seed_alerts)
+
+@alerts.op("get_alert_by_id")
+def _(mod, ctx, i): mod.get_alert_by_id(f"a{ctx.rng.randrange(ctx.extra['alerts'])}")
+
+@alerts.op("add_alert_to_box", "write")
+def _(mod, ctx, i): mod.add_alert_to_box(f"b{i}", "New drop", "إصدار جديد", "info", exp=ctx.now + 3600)
+
+
+# ====================== utils/receipt_gate ======================
+def _seed_receipts(mod, ctx: Ctx) -> List[str]:
+    d = {str(uid): {"types": ["photo", "document", "text"],
+                    "exp": ctx.now + (-60 if i % 10 == 0 else 3600)}
+         for i, uid in enumerate(ctx.uids())}
+    return [_write(str(mod._FILE), d)]
+
+receipts = store("receipt_gate", "utils.receipt_gate", _seed_receipts)
+
+@receipts.op("is_allowed")
+def _(mod, ctx, i): mod.is_allowed(ctx.uid(i), "photo")
+
+@receipts.op("remaining_seconds")
+def _(mod, ctx, i): mod.remaining_seconds(ctx.uid(i))
+
+@receipts.op("open_window", "write")
+def _(mod, ctx, i): mod.open_window(ctx.uid(i))
+
+@receipts.op("extend_window", "write")
+def _(mod, ctx, i): mod.extend_window(ctx.uid(i), 60)
+
+@receipts.op("close_window", "write")
+def _(mod, ctx, i): mod.close_window(ctx.uid(i))
+
+@receipts.op("purge_expired", "scan")
+def _(mod, ctx, i): mod.purge_expired()
+
+
+# ====================== utils/escalation_guard ======================
+class _NullBot:
+    async def send_message(self, *a, **kw):
+        return None
+
+def _seed_escalation(mod, ctx: Ctx) -> List[str]:
+    bans = {str(u): {"until": _iso(ctx.now + 3600, naive=True)} for u in _fraction(ctx, 0.1)}
+    state = {str(u): {"strike": 1, "decay_at": _iso(ctx.now + 86400 * 7, naive=True),
+                      "last_ban_at": _iso(ctx.now - 3600, naive=True)} for u in _fraction(ctx, 0.5)}
+    ctx.extra["bot"] = _NullBot()
+    return [_write(mod.BANS_FILE, bans), _write(mod.STATE_FILE, state)]
+
+escalation = store("escalation_guard", "utils.escalation_guard", _seed_escalation)
+
+@escalation.op("is_banned_now")
+def _(mod, ctx, i): mod.is_banned_now(ctx.uid(i))
+
+@escalation.op("process_attempt", "write")
+def _(mod, ctx, i): return mod.process_attempt(ctx.extra["bot"], ctx.uid(i), lang="en")
+
+@escalation.op("on_manual_unban", "write")
+def _(mod, ctx, i): mod.on_manual_unban(ctx.uid(i))
+
+
+# ====================== utils/promoter_live_store ======================
+def _seed_lives(mod, ctx: Ctx) -> List[str]:
+    active, user_map = {}, {}
+    for i, uid in enumerate(ctx.uids()):
+        lid = f"{ctx.now}-{uid}-{i + 1}"
+        active[lid] = {"id": lid, "user_id": uid, "platform": ("tiktok", "youtube", "twitch")[i % 3],
+                       "handle": f"@user{i}", "title": "live", "display_name": f"User {uid}",
+                       "ttl_h": 24.0, "started_at": ctx.now - i % 3600, "expires_at": ctx.now + 86400}
+        user_map[str(uid)] = lid
+    ctx.extra["live_ids"] = list(active)
+    return [_write(str(mod.STORE_FILE), {"active": active, "user_map": user_map, "seq": ctx.n})]
+
+lives = store("promoter_live_store", "utils.promoter_live_store", _seed_lives)
+
+@lives.op("get_user_active")
+def _(mod, ctx, i): mod.get_user_active(ctx.uid(i))
+
+@lives.op("start_live", "write")
+def _(mod, ctx, i): mod.start_live(ctx.uid(i), platform="tiktok", handle=f"@b{i}", ttl_hours=24)
+
+@lives.op("end_live", "write")
+def _(mod, ctx, i): mod.end_live(ctx.extra["live_ids"][i % len(ctx.extra["live_ids"])])
+
+@lives.op("list_active", "scan")
+def _(mod, ctx, i): mod.list_active("tiktok", page=1)
+
+@lives.op("count_active_lives", "scan")
+def _(mod, ctx, i): mod.count_active_lives()
+
+
+# ====================== lang (user_langs.json) ======================
+def _seed_lang(mod, ctx: Ctx) -> List[str]:
+    path = _write(mod.USER_LANG_FILE, {str(u): ("en", "ar")[u % 2] for u in ctx.uids()})
+    mod._USER_LANGS = (None, {})   # تُقرأ البيانات الجديدة لا نسخة ما قبل seed
+    return [path]
+
+lang = store("lang", "lang", _seed_lang)
+
+@lang.op("get_user_lang")
+def _(mod, ctx, i): mod.get_user_lang(ctx.uid(i))
+
+@lang.op("set_user_lang", "write")
+def _(mod, ctx, i): mod.set_user_lang(ctx.uid(i), ("ar", "en")[i % 2])
+
+@lang.op("switch_lang", "write")
+def _(mod, ctx, i): mod.switch_lang(ctx.uid(i), ("ar", "en")[i % 2])
+
+
+# ====================== middlewares (stores داخل الـ middleware) ======================
+def _private_message(uid: int, username: str = ""):
+    # بلا تحقق pydantic: يكفي لمسار isinstance/from_user/chat في الـ middlewares
+    from aiogram.types import Chat, Message, User
+    return Message.model_construct(
+        message_id=1, date=datetime.now(timezone.utc), text="hi",
+        chat=Chat.model_construct(id=uid, type="private"),
+        from_user=User.model_construct(id=uid, is_bot=False, first_name="U", last_name=None,
+                                       username=username or None),
+    )
+
+async def _through(mw, event) -> None:
+    async def _handler(event, data):
+        return None
+    await mw(_handler, event, {})
+
+
+def _seed_tracker(mod, ctx: Ctx) -> List[str]:
+    users = {str(uid): {"id": uid, "first_seen": _iso(ctx.now - 86400), "first_name": "U",
+                        "last_name": "", "username": f"user{i}", "last_seen": _iso(ctx.now)}
+             for i, uid in enumerate(ctx.uids())}
+    ctx.extra["mw"] = mod.UserTrackerMiddleware()
+    return [_write(str(mod.USERS_FILE), {"users": users})]
+
+tracker = store("mw.user_tracker", "middlewares.user_tracker", _seed_tracker)
+
+@tracker.op("track", "write")
+def _(mod, ctx, i): return _through(ctx.extra["mw"], _private_message(ctx.uid(i), f"user{i}"))
+
+@tracker.op("get_users_count", "scan")
+def _(mod, ctx, i): mod.get_users_count()
+
+
+def _seed_started(mod, ctx: Ctx) -> List[str]:
+    return [_write(str(mod.STARTED_FILE), {str(u): True for u in ctx.uids()})]
+
+started = store("mw.force_start", "middlewares.force_start", _seed_started)
+
+@started.op("has_started")
+def _(mod, ctx, i): mod._has_started(ctx.uid(i))
+
+@started.op("mark_started", "write")
+def _(mod, ctx, i): mod._mark_started(ctx.new_uid(i))
+
+
+def _seed_subs(mod, ctx: Ctx) -> List[str]:
+    ctx.extra["mw"] = mod.AutoSubscribeMiddleware()
+    return [_write(str(mod.SUBS_FILE), {str(u): u % 10 != 0 for u in ctx.uids()})]
+
+subs = store("mw.auto_subscribe", "middlewares.auto_subscribe", _seed_subs)
+
+@subs.op("known_user")
+def _(mod, ctx, i): return _through(ctx.extra["mw"], _private_message(ctx.uid(i)))
+
+@subs.op("new_user", "write")
+def _(mod, ctx, i): return _through(ctx.extra["mw"], _private_message(ctx.new_uid(i)))
+
+
+def _seed_gate(mod, ctx: Ctx) -> List[str]:
+    ctx.extra["gate"] = mod.UnknownGateMiddleware(enforce_known_users=True)
+    return [_write("data/users.json", {"users": {str(u): {"id": u} for u in ctx.uids()}}),
+            _write("user_langs.json", {str(u): "en" for u in ctx.uids()})]
+
+gate = store("mw.unknown_gate", "middlewares.unknown_gate", _seed_gate)
+
+@gate.op("load_known_users", "scan")
+def _(mod, ctx, i): ctx.extra["gate"]._load_known_users()
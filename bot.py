@@ -7,6 +7,10 @@ from dotenv import load_dotenv
 # ⬅️ حمّل متغيرات البيئة أولاً
 load_dotenv()
 
+# ⏱️ (اختياري) STARTUP_PROFILE=1: زمن استيراد كل وحدة + زمن خطوات الإقلاع
+from utils import startup_profiler as _sp
+_sp.install_import_profiler()
+
 # --- FORCE LOCAL PROJECT ON SYS.PATH (fix for "handlers" name collision) ---
 import sys, pathlib
 ROOT = pathlib.Path(__file__).parent.resolve()
@@ -22,48 +26,9 @@ except Exception:
 # ---------------------------------------------------------------------------
 
 # ✅ تطبيع (توافق) لدالة الترجمة t() لتقبل (lang,key) أو (lang,key,fallback)
+#    التنفيذ في lang.t_compat (قراءة واحدة من كتالوج مُجمّع بلا قفل)
 import lang as _lang_mod
-try:
-    _orig_t = _lang_mod.t
-except Exception:
-    _orig_t = None
-
-def _t_compat(*args, **kwargs):
-    """
-    يدعم:
-      - t(lang, key)
-      - t(lang, key, fallback)
-    ويمنع الأخطاء ويرجع fallback/نصًا فارغًا عند عدم توفر الترجمة.
-    """
-    if _orig_t is None:
-        if len(args) >= 3:
-            return args[2]
-        if len(args) >= 2:
-            return args[1]
-        return ""
-
-    # ✅ صيغة بثلاثة وسائط: (lang, key, fallback)
-    if len(args) >= 3:
-        lang_code, key, fallback = args[0], args[1], args[2]
-        try:
-            val = _orig_t(lang_code, key)
-        except Exception:
-            val = None
-        if isinstance(val, str) and val.strip() and val != key:
-            return val
-        return fallback or key or ""
-
-    # ✅ صيغة بوسيطين: (lang, key)
-    try:
-        val = _orig_t(*args, **kwargs)
-    except Exception:
-        return ""
-    key = args[1] if len(args) >= 2 else None
-    if isinstance(val, str) and val.strip() and (key is None or val != key):
-        return val
-    return ""
-
-_lang_mod.t = _t_compat
+_lang_mod.t = _lang_mod.t_compat
 t = _lang_mod.t  # لاستخدامه محليًا
 
 from utils.ensure_files import ensure_required_files
@@ -117,6 +82,11 @@ from middlewares.maintenance import MaintenanceMiddleware
 from middlewares.vip_rate_limit import VipRateLimitMiddleware
 from middlewares.unknown_gate import UnknownGateMiddleware
 from middlewares.auto_subscribe import AutoSubscribeMiddleware
+from middlewares.user_lanes import UserLaneMiddleware
+from middlewares.callback_ack import CallbackAckMiddleware, CallbackAckRequestMiddleware
+from middlewares.metrics import (
+    UpdateMetricsMiddleware, HandlerMetricsMiddleware, ApiMetricsMiddleware, timed, register_gauges,
+)
 from handlers.home_hero import router as home_hero_router
 
 # (اختياري) Tracer
@@ -127,6 +97,7 @@ except Exception:
 
 # utils
 from utils.vip_cron import run_vip_cron
+from utils.timers import init_timers
 
 # ================= [ALERTS] Imports =================
 try:
@@ -146,6 +117,8 @@ except Exception:
 TOKEN = os.getenv("BOT_TOKEN")
 FORCE_START_ON_MSG = int(os.getenv("FORCE_START_ON_MSG", "0"))
 UGATE_ON_MSG = int(os.getenv("UGATE_ON_MSG", "0"))
+BOT_MODE = (os.getenv("BOT_MODE") or "polling").strip().lower()   # polling | webhook
+DROP_PENDING_UPDATES = os.getenv("DROP_PENDING_UPDATES", "1").strip() not in ("0", "false", "False", "")
 
 _admin_ids_env = os.getenv("ADMIN_IDS") or os.getenv("ADMIN_ID", "")
 ADMIN_IDS: list[int] = []
@@ -186,22 +159,54 @@ def _admin_cmds(lang: str = "en") -> list[BotCommand]:
         BotCommand(command="admin", description=t(lang, "cmd_admin") or "Admin panel"),
     ]
 
+def _cmd_pairs(cmds) -> list[tuple[str, str]]:
+    return [(c.command, c.description) for c in (cmds or [])]
+
+async def _set_commands_if_changed(bot: Bot, cmds: list[BotCommand], scope, language_code: str) -> bool:
+    """يقارن مع get_my_commands ولا يعيد الكتابة إلا عند الاختلاف."""
+    try:
+        current = await bot.get_my_commands(scope=scope, language_code=language_code)
+        if _cmd_pairs(current) == _cmd_pairs(cmds):
+            return False
+    except Exception as e:
+        logging.debug(f"get_my_commands failed ({language_code}), rewriting: {e}")
+    await bot.set_my_commands(cmds, scope=scope, language_code=language_code)
+    return True
+
+# ================= تخزين FSM =================
+FSM_STORAGE = (os.getenv("FSM_STORAGE") or "sqlite").strip().lower()
+
+def _make_storage():
+    """sqlite (افتراضي): حالات FSM تبقى بعد إعادة التشغيل. memory: السلوك القديم."""
+    if FSM_STORAGE == "memory":
+        return MemoryStorage()
+    try:
+        from utils.fsm_storage import SQLiteStorage
+        storage = SQLiteStorage()
+        logging.info(f"FSM storage: SQLite ({storage.path})")
+        return storage
+    except Exception as e:
+        logging.warning(f"SQLite FSM storage unavailable, falling back to memory: {e}")
+        return MemoryStorage()
+
 async def set_bot_commands(bot: Bot):
-    await bot.set_my_commands(_public_cmds("en"), scope=BotCommandScopeDefault(), language_code="en")
+    changed = 0
+    changed += await _set_commands_if_changed(bot, _public_cmds("en"), BotCommandScopeDefault(), "en")
     try:
-        await bot.set_my_commands(_public_cmds("ar"), scope=BotCommandScopeDefault(), language_code="ar")
+        changed += await _set_commands_if_changed(bot, _public_cmds("ar"), BotCommandScopeDefault(), "ar")
     except Exception as e:
         logging.warning(f"Failed set default AR commands: {e}")
 
     for admin_id in ADMIN_IDS:
         try:
-            await bot.set_my_commands(_admin_cmds("en"), scope=BotCommandScopeChat(chat_id=admin_id), language_code="en")
+            changed += await _set_commands_if_changed(bot, _admin_cmds("en"), BotCommandScopeChat(chat_id=admin_id), "en")
         except Exception as e:
             logging.warning(f"Failed set commands (EN) for admin {admin_id}: {e}")
         try:
-            await bot.set_my_commands(_admin_cmds("ar"), scope=BotCommandScopeChat(chat_id=admin_id), language_code="ar")
+            changed += await _set_commands_if_changed(bot, _admin_cmds("ar"), BotCommandScopeChat(chat_id=admin_id), "ar")
         except Exception as e:
             logging.warning(f"Failed set commands (AR) for admin {admin_id}: {e}")
+    logging.info(f"Bot commands checked ({changed} scope(s) updated).")
 
 # ================= أدوات استيراد مرنة =================
 def _try_import_router(mod_path: str):
@@ -249,6 +254,7 @@ def _import_admin_routers():
         "admin.live_support_admin",
         "admin.home_ui_admin",
         "admin.quest_admin",
+        "admin.diagnostics",
     ):
         r = _try_import_router(path)
         if r:
@@ -351,20 +357,28 @@ async def _shim_rwdadm(cb):
 
 # ================= تسجيل الـ Routers & Middlewares =================
 def register_routers(dp: Dispatcher):
+    # مقاييس: الزمن الكلي لكل تحديث (شاملًا انتظار المسار) — الأول دائمًا
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    # 0) رد مبكر على أزرار callback (يبدأ العدّ من وصول التحديث، قبل انتظار المسار)
+    dp.update.outer_middleware(CallbackAckMiddleware())
+    # 0.1) مسار مرتّب لكل مستخدم + سقف تزامن عام
+    dp.update.outer_middleware(UserLaneMiddleware())
+
     if TracerMiddleware:
         dp.update.middleware(TracerMiddleware())
 
-    mmw = MaintenanceMiddleware()
-    utm = UserTrackerMiddleware()
-    fs  = ForceStartMiddleware()
-    vrl = VipRateLimitMiddleware()
+    # كل مرحلة مغلّفة بـ timed(): زمنها الذاتي في bot_middleware_seconds{stage}
+    mmw = timed("maintenance", MaintenanceMiddleware())
+    utm = timed("user_tracker", UserTrackerMiddleware())
+    fs  = timed("force_start", ForceStartMiddleware())
+    vrl = timed("vip_rate_limit", VipRateLimitMiddleware())
 
     # 1) الصيانة + تتبع المستخدمين
     dp.message.middleware(mmw); dp.callback_query.middleware(mmw)
     dp.message.middleware(utm); dp.callback_query.middleware(utm)
 
     # اجعل الاشتراك تلقائيًا لكل من يتفاعل
-    autosub = AutoSubscribeMiddleware()
+    autosub = timed("auto_subscribe", AutoSubscribeMiddleware())
     dp.message.middleware(autosub); dp.callback_query.middleware(autosub)
 
     # العمل في الخاص فقط
@@ -377,7 +391,7 @@ def register_routers(dp: Dispatcher):
     dp.callback_query.middleware(fs)
 
     # 3) بوابة المنع
-    ugm = UnknownGateMiddleware(
+    ugm = timed("unknown_gate", UnknownGateMiddleware(
         block_unknown_messages=False,
         allow_commands=(
             "menu", "home", "sections",
@@ -410,7 +424,7 @@ def register_routers(dp: Dispatcher):
             "AlStates:wait_maxw","AlStates:wait_actd",
             "VipCustom:wait_days",
         ),
-    )
+    ))
     if UGATE_ON_MSG:
         dp.message.middleware(ugm)
     dp.callback_query.middleware(ugm)
@@ -418,6 +432,11 @@ def register_routers(dp: Dispatcher):
     # 4) قيود VIP
     dp.message.middleware(vrl); dp.callback_query.middleware(vrl)
 
+    # 5) زمن المعالج لكل router/handler (الأقرب إلى المعالج)
+    hmw = HandlerMetricsMiddleware()
+    dp.message.middleware(hmw); dp.callback_query.middleware(hmw)
+    register_gauges()
+
     # ✅ /start الأساسي
     dp.include_router(h_start.router)
     logging.info("Loaded handlers.start (forced include)")
@@ -530,6 +549,17 @@ async def _alerts_startup(bot: Bot):
 def _make_bot() -> Bot:
     total = float(os.getenv("BOT_HTTP_TOTAL_TIMEOUT", "15"))
     session = AiohttpSession(timeout=total)
+    # أول مسجَّل هو الأبعد: ما يُرد محليًا يسبق المجدول فلا يستهلك رموز الإرسال
+    # تعديلات بلا تغيير تُرفض محليًا بدل رحلة كاملة إلى Telegram
+    from utils.smart_edit import EditDedupeMiddleware
+    session.middleware(EditDedupeMiddleware())
+    # أول رد على callback يُسجَّل، وردود المعالج بعد الرد التلقائي تُبتلع محليًا
+    session.middleware(CallbackAckRequestMiddleware())
+    # حدود الإرسال العامة/لكل دردشة + أولويات + احترام retry_after مركزيًا
+    from utils.api_scheduler import install as _install_api_scheduler
+    _install_api_scheduler(session)
+    # زمن استدعاءات Bot API الفعلية ورموز الأخطاء (بعد المجدول وما يُرد محليًا)
+    session.middleware(ApiMetricsMiddleware())
     bot = Bot(
         token=TOKEN,
         session=session,
@@ -538,45 +568,102 @@ def _make_bot() -> Bot:
     return bot
 
 # ================= نقطة التشغيل =================
-ensure_required_files()
+with _sp.step("ensure_required_files"):
+    ensure_required_files()
 
 async def main():
     if not TOKEN:
         raise RuntimeError("❌ BOT_TOKEN غير موجود في ملف .env")
 
     bot = _make_bot()
-    dp = Dispatcher(storage=MemoryStorage())
+    storage = _make_storage()
+    dp = Dispatcher(storage=storage)
+    dp.shutdown.register(storage.close)   # يكتب التغييرات المعلّقة قبل الخروج
+    from utils import admin_notify
+    dp.shutdown.register(admin_notify.drain)  # يرسل إشعارات الأدمن والملخّصات المعلّقة
 
     # تشخيص: اسم البوت
     try:
-        me = await bot.get_me()
+        with _sp.step("get_me"):
+            me = await bot.get_me()
         logging.info(f"🤖 Logged in as @{me.username} (id={me.id})")
     except Exception:
         logging.exception("Failed to connect to Telegram (get_me). Check BOT_TOKEN / network.")
         raise
 
-    try:
-        await bot.delete_webhook(drop_pending_updates=True)
-        logging.info("Webhook deleted (switching to polling).")
-    except Exception as e:
-        logging.warning(f"delete_webhook failed (continue polling): {e}")
+    if BOT_MODE != "webhook":
+        try:
+            with _sp.step("delete_webhook"):
+                await bot.delete_webhook(drop_pending_updates=DROP_PENDING_UPDATES)
+            logging.info("Webhook deleted (switching to polling).")
+        except Exception as e:
+            logging.warning(f"delete_webhook failed (continue polling): {e}")
 
-    await set_bot_commands(bot)
-    register_routers(dp)
+    with _sp.step("set_bot_commands"):
+        await set_bot_commands(bot)
+    with _sp.step("register_routers"):
+        register_routers(dp)
     dp.startup.register(_alerts_startup)
+    dp.startup.register(_rewards_gate.warmup_channels)
+    dp.startup.register(init_timers)   # مؤقّتات دائمة (تذكيرات/حذف تلقائي/مهلة السماح)
+    from utils import loop_watchdog
+    dp.startup.register(loop_watchdog.start)   # كاشف توقّف الحلقة (/loop_stalls)
+    dp.shutdown.register(loop_watchdog.stop)
+
+    with _sp.step("cron tasks"):
+        try:
+            asyncio.create_task(run_vip_cron(bot))
+            logging.info("⏰ VIP reminder task started.")
+        except Exception as e:
+            logging.warning(f"VIP reminder task failed to start: {e}")
+
+        try:
+            from utils.home_snapshot import run_home_snapshot_loop
+            asyncio.create_task(run_home_snapshot_loop())
+            logging.info("🏠 Home snapshot refresher started.")
+        except Exception as e:
+            logging.warning(f"Home snapshot refresher failed to start: {e}")
 
+        try:
+            from utils.gcra import run_compaction_loop
+            asyncio.create_task(run_compaction_loop())
+        except Exception as e:
+            logging.warning(f"GCRA compaction task failed to start: {e}")
+
+        try:
+            from utils.supplier_index import run_reconcile_loop
+            asyncio.create_task(run_reconcile_loop())
+            logging.info("📇 Supplier index consistency check started.")
+        except Exception as e:
+            logging.warning(f"Supplier index check failed to start: {e}")
+
+    _sp.log_report()
+
+    # ✅ تأكد من تضمين chat_member ضمن allowed_updates
+    updates = dp.resolve_used_update_types()
+    if "chat_member" not in updates:
+        updates.append("chat_member")
+
+    # /metrics على خادم محلي منفصل (METRICS_HOST، افتراضيًا 127.0.0.1) في الوضعين
     try:
-        asyncio.create_task(run_vip_cron(bot))
-        logging.info("⏰ VIP reminder task started.")
+        from utils.metrics import start_metrics_server, stop_metrics_server
+        await start_metrics_server()
+        dp.shutdown.register(stop_metrics_server)
     except Exception as e:
-        logging.warning(f"VIP reminder task failed to start: {e}")
+        logging.warning(f"Metrics server failed to start: {e}")
+
+    if BOT_MODE == "webhook":
+        from utils.webhook_runner import run_webhook
+        logging.info("🚀 Bot is starting in webhook mode...")
+        try:
+            await run_webhook(dp, bot, allowed_updates=updates)
+        except Exception:
+            logging.exception("Webhook server crashed with an exception.")
+            raise
+        return
 
     logging.info("🚀 Bot is starting polling...")
     try:
-        # ✅ تأكد من تضمين chat_member ضمن allowed_updates
-        updates = dp.resolve_used_update_types()
-        if "chat_member" not in updates:
-            updates.append("chat_member")
         await dp.start_polling(bot, allowed_updates=updates)
     except Exception:
         logging.exception("Polling crashed with an exception.")
@@ -1,5 +1,5 @@
 from __future__ import annotations
-import json, asyncio, time, datetime
+import json, time, datetime
 from pathlib import Path
 from typing import Dict, Any, List
 from aiogram import Router, F
@@ -9,6 +9,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from lang import t, get_user_lang
 from utils.alerts_broadcast import get_active_alerts
+from utils import timers
 
 router = Router(name="alerts_user")
 
@@ -66,29 +67,35 @@ def _reminder_menu_kb(alert_id: str, lang: str) -> InlineKeyboardBuilder:
     kb.adjust(1,1,1,1)
     return kb
 
+async def _remind_action(bot, payload: Dict[str, Any]):
+    """ينفّذ التذكير؛ يتأكد أن الإشعار ما زال صالحًا ولم يُفتح/يُتجاهل/يُحذف."""
+    uid = int(payload["uid"]); alert_id = str(payload["alert_id"]); lang = payload.get("lang") or "ar"
+    st = _state(uid)
+    if (alert_id in st.get("seen", [])
+        or alert_id in st.get("ignored", [])
+        or alert_id in st.get("deleted", [])):
+        return
+    items = get_active_alerts(lang)
+    it = next((x for x in items if x["id"] == alert_id), None)
+    if not it:
+        return
+    # أرسل التذكير
+    kb = InlineKeyboardBuilder()
+    label = (t(lang, "alerts.user.open_kind") or "Open {kind}").replace("{kind}", _kind_display(it["kind"], lang))
+    kb.button(text=label, callback_data=f"inb:open:{alert_id}")
+    kb.button(text=t(lang, "alerts.user.ignore") or "Ignore", callback_data=f"inb:ignore:{alert_id}")
+    kb.adjust(1,1)
+    await bot.send_message(uid, (t(lang, "alerts.user.remind_due") or "You have a pending alert"), reply_markup=kb.as_markup())
+
+timers.register_action("alerts.remind", _remind_action)
+
 async def _schedule_reminder(cb_or_msg, uid: int, alert_id: str, delay: int, lang: str):
-    """ينشئ تذكيرًا بعد مدة؛ يتأكد أن الإشعار ما زال صالحًا ولم يُفتح/يُتجاهل/يُحذف."""
-    bot = cb_or_msg.bot
-    async def _task():
-        await asyncio.sleep(max(1, delay))
-        # تحقق من الحالة الحالية
-        st = _state(uid)
-        if (alert_id in st.get("seen", [])
-            or alert_id in st.get("ignored", [])
-            or alert_id in st.get("deleted", [])):
-            return
-        items = get_active_alerts(lang)
-        it = next((x for x in items if x["id"] == alert_id), None)
-        if not it:
-            return
-        # أرسل التذكير
-        kb = InlineKeyboardBuilder()
-        label = (t(lang, "alerts.user.open_kind") or "Open {kind}").replace("{kind}", _kind_display(it["kind"], lang))
-        kb.button(text=label, callback_data=f"inb:open:{alert_id}")
-        kb.button(text=t(lang, "alerts.user.ignore") or "Ignore", callback_data=f"inb:ignore:{alert_id}")
-        kb.adjust(1,1)
-        await bot.send_message(uid, (t(lang, "alerts.user.remind_due") or "You have a pending alert"), reply_markup=kb.as_markup())
-    asyncio.create_task(_task())
+    """ينشئ تذكيرًا بعد مدة (مؤقّت دائم؛ إعادة الطلب لنفس الإشعار تستبدل السابق)."""
+    timers.schedule(
+        "alerts.remind", max(1, delay),
+        {"uid": uid, "alert_id": alert_id, "lang": lang},
+        key=f"alert_remind:{uid}:{alert_id}",
+    )
 
 # ---------- commands ----------
 @router.message(Command("alerts", "inbox"))
@@ -6,6 +6,8 @@ from aiogram import Router
 from aiogram.types import ChatMemberUpdated
 from aiogram.enums import ChatType, ChatMemberStatus
 
+from utils.admin_notify import notify as notify_admins_bus
+
 router = Router(name="anti_groups")
 
 # قناة وحيدة مسموح بوجود البوت فيها (اختياري)
@@ -30,11 +32,7 @@ ADMIN_IDS = _load_admin_ids()
 async def _notify_admins(bot, text: str):
     if not _ADMIN_NOTIFY:
         return
-    for uid in ADMIN_IDS:
-        try:
-            await bot.send_message(uid, text, disable_web_page_preview=True)
-        except Exception as e:
-            logging.warning(f"[GUARD] notify admin {uid} failed: {e}")
+    notify_admins_bus(bot, text, kind="group_guard", admins=ADMIN_IDS, parse_mode=None)
 
 def _chat_kind_label(chat_type: ChatType) -> str:
     m = {
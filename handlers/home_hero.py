@@ -1,7 +1,7 @@
 # handlers/home_hero.py
 from __future__ import annotations
 
-import os, time, json
+import os, time
 from typing import Optional
 from pathlib import Path
 
@@ -11,36 +11,17 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from lang import t, get_user_lang
 from utils.home_card_cfg import get_cfg
+from utils.kb_cache import cached_markup
+from utils import home_snapshot
 
 router = Router(name="home_hero")
 
-# --------- أدوار واقعية (مع fallbacks آمنة) ---------
-try:
-    from utils.suppliers import is_supplier as _is_supplier
-except Exception:
-    _is_supplier = None
-
-try:
-    from utils.vip_store import is_vip as _is_vip
-except Exception:
-    _is_vip = None
-
-try:
-    from handlers.promoter import is_promoter as _is_promoter
-except Exception:
-    def _is_promoter(_uid: int) -> bool: return False
-
 # عدّاد البثوث النشطة لعرضه للجميع (زر عام)
 try:
     from utils.promoter_live_store import count_active_lives as _count_live
 except Exception:
     def _count_live() -> int: return 0
 
-# --------- مصادر بيانات واجهة الإشعارات/المستخدمين ---------
-DATA_DIR = Path("data"); DATA_DIR.mkdir(parents=True, exist_ok=True)
-USERBOX_FILE = DATA_DIR / "alerts_userbox.json"
-KNOWN_USERS_FILE = DATA_DIR / "known_users.json"
-
 def _k(lang: str, key: str, default: str) -> str:
     try:
         v = t(lang, key)
@@ -50,38 +31,6 @@ def _k(lang: str, key: str, default: str) -> str:
         pass
     return default
 
-def _count_known_users() -> Optional[int]:
-    try:
-        data = json.loads(KNOWN_USERS_FILE.read_text("utf-8"))
-        if isinstance(data, dict):
-            return len([k for k in data.keys() if str(k).isdigit()])
-        if isinstance(data, list):
-            return len(data)
-    except Exception:
-        pass
-    return None
-
-def _load_alert_counts(user_id: int, lang: str) -> tuple[int, int]:
-    seen = ignored = deleted = set()
-    try:
-        box = (json.loads(USERBOX_FILE.read_text("utf-8"))).get(str(user_id)) or {}
-        seen    = set(box.get("seen", []))
-        ignored = set(box.get("ignored", []))
-        deleted = set(box.get("deleted", []))
-    except Exception:
-        pass
-
-    try:
-        from utils.alerts_broadcast import get_active_alerts
-        items = get_active_alerts(lang) or []
-    except Exception:
-        items = []
-
-    kept_ids = [it["id"] for it in items if it["id"] not in ignored and it["id"] not in deleted]
-    total  = len(kept_ids)
-    unseen = len([i for i in kept_ids if i not in seen])
-    return total, unseen
-
 def _get_app_version() -> Optional[str]:
     try:
         from utils.version_info import get_version  # type: ignore
@@ -140,10 +89,19 @@ CB = {
 }
 
 # --------- أزرار القائمة الرئيسية (2×2 دائماً) ---------
-def _build_main_kb(lang: str, *, is_vip: bool, is_promoter: bool, is_supplier: bool):
+def _build_main_kb(lang: str, *, is_vip: bool, is_promoter: bool, is_supplier: bool,
+                   live_n: Optional[int] = None):
     """
     ترتيب 2×2 بالكامل، مع رفع VIP والمورّد للأعلى، وإظهار زر البث لجميع المستخدمين.
+    اللوحة نفسها مخزّنة حسب (اللغة، الأدوار، عدد البثوث).
     """
+    if live_n is None:
+        live_n = _count_live()
+    return _main_markup(lang, is_vip=bool(is_vip), is_promoter=bool(is_promoter),
+                        is_supplier=bool(is_supplier), live_n=int(live_n))
+
+@cached_markup("home.main")
+def _main_markup(lang: str, *, is_vip: bool, is_promoter: bool, is_supplier: bool, live_n: int):
     kb = InlineKeyboardBuilder(); row = kb.row
 
     row(
@@ -234,7 +192,6 @@ def _build_main_kb(lang: str, *, is_vip: bool, is_promoter: bool, is_supplier: b
     )
 
     # الصف 7 — زر البث للجميع + أزرار خاصة حسب الدور
-    live_n = _count_live()
     live_label = _k(lang, "btn_promoter_live", "بث مباشر للمروّجين" if lang == "ar" else "Promoters Live")
     if live_n > 0:
         live_label = f"{live_label} ({live_n})"
@@ -295,7 +252,7 @@ def _apply_runtime_cfg() -> dict:
     global THEME, DENSITY, SEPARATOR, ICON_SET
     global SHOW_BULLETS, SHOW_TIP, SHOW_VERSION, SHOW_USERS, SHOW_ALERTS
 
-    d = get_cfg()
+    d = home_snapshot.card_cfg()
     THEME     = str(d.get("theme", THEME))
     DENSITY   = str(d.get("density", DENSITY))
     SEPARATOR = str(d.get("sep", SEPARATOR))
@@ -329,13 +286,18 @@ def _pad() -> str:
 def _chip(label: str, value: str, icon: str="") -> str:
     return (icon + (" " if icon else "")) + f"<code>{label}: {value}</code>"
 
-def _fmt_vip_badge(lang: str, user_id: int, is_vip: bool) -> str:
+def _fmt_vip_badge(lang: str, user_id: int, is_vip: bool, expiry_ts: Optional[int] = None,
+                   *, lookup: bool = True) -> str:
     if not user_id:
         user_id = _LAST_UID or 0
     yes = "نعم" if lang=="ar" else "Yes"
     no  = "لا"  if lang=="ar" else "No"
     if not is_vip:
         return f"{_icon('vip')} <code>VIP: {no}</code>"
+    if isinstance(expiry_ts, int):
+        return f"{_icon('vip')} <code>VIP: {yes} · {time.strftime('%d-%m-%Y', time.localtime(expiry_ts))}</code>"
+    if not lookup:   # الحالة من user_view: VIP بلا تاريخ انتهاء → شارة عادية بلا قراءة ملف
+        return f"{_icon('vip')} <code>VIP: {yes}</code>"
     try:
         from utils.vip_store import get_vip_meta as _get_vip_meta_local  # lazy
         meta = _get_vip_meta_local(user_id) or {}
@@ -358,6 +320,7 @@ def _hero_html(
     users_count: Optional[int],
     app_ver: Optional[str],
     lang_label: str,
+    vip_expiry: Optional[int] = None,
 ) -> str:
     title  = _k(lang, "home_title_plain", "مرحبًا بك في محرك الثعبان" if lang=="ar" else "Welcome to Snake Engine")
     pitch  = _k(lang, "pitch_plain", "منصة قوية لتعديل ألعاب أندرويد — بدون روت وبدون حظر." if lang=="ar" else "Powerful Android modding — no root, no bans.")
@@ -365,7 +328,7 @@ def _hero_html(
     cta    = _k(lang, "cta_plain", "ابدأ الآن — اختر أداتك:" if lang=="ar" else "Start now — choose your tool:")
     ok_alert = _k(lang, "hero.status.ok", "لا إشعارات" if lang=="ar" else "All caught up")
 
-    vip_badge   = _fmt_vip_badge(lang, 0, is_vip)
+    vip_badge   = _fmt_vip_badge(lang, 0, is_vip, vip_expiry, lookup=False)
     role_chip   = _chip(_k(lang,"hero.badge.role","الدور" if lang=="ar" else "Role"), role_label, _icon("role"))
     lang_chip   = _chip(_k(lang,"hero.badge.lang","اللغة" if lang=="ar" else "Lang"), lang_label, _icon("lang"))
     ver_chip    = _chip(_k(lang,"hero.badge.version","الإصدار" if lang=="ar" else "Version"), (app_ver or "-"), _icon("ver")) if (SHOW_VERSION and app_ver) else ""
@@ -409,13 +372,14 @@ async def render_home_card(message: Message, *, lang: str | None = None):
         _lang = "en"
 
     uid = message.from_user.id
-    is_sup = bool(_is_supplier and _is_supplier(uid))
-    is_vip = bool(_is_vip and _is_vip(uid))
-    is_prom = bool(_is_promoter and _is_promoter(uid))
-
-    total, unseen = _load_alert_counts(uid, _lang)
-    users_count = _count_known_users()
-    app_ver = _get_app_version()
+    # كل شيء من الذاكرة: لقطة عامة + مشاهد ملفات لكل مستخدم (utils.home_snapshot)
+    g = home_snapshot.global_view()
+    u = home_snapshot.user_view(uid)
+    is_sup, is_vip, is_prom = u["is_supplier"], u["is_vip"], u["is_promoter"]
+
+    total, unseen = u["alerts_total"], u["alerts_unseen"]
+    users_count = g.get("users_count")
+    app_ver = g.get("app_ver")
     lang_label = "AR" if _lang == "ar" else "EN"
 
     roles = []
@@ -443,13 +407,15 @@ async def render_home_card(message: Message, *, lang: str | None = None):
         users_count=users_count,
         app_ver=app_ver,
         lang_label=lang_label,
+        vip_expiry=u["vip_expiry"],
     )
 
     await message.answer(
         text,
         parse_mode="HTML",
         disable_web_page_preview=True,
-        reply_markup=_build_main_kb(_lang, is_vip=is_vip, is_promoter=is_prom, is_supplier=is_sup),
+        reply_markup=_build_main_kb(_lang, is_vip=is_vip, is_promoter=is_prom, is_supplier=is_sup,
+                                    live_n=g.get("live_n", 0)),
     )
 
 # --------- Aliases / fallbacks ---------
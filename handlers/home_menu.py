@@ -18,6 +18,7 @@ from aiogram.types import (
 )
 
 from lang import t, get_user_lang
+from utils.kb_cache import cached_markup
 
 router = Router(name="home_menu")
 log = logging.getLogger(__name__)
@@ -44,6 +45,7 @@ def _save_started(d: dict) -> None:
 
 
 # ===== لوحة إنلاين 3×3 (تُعرض فقط مع /start) =====
+@cached_markup("home_menu.main")
 def main_menu_kb(lang: str) -> InlineKeyboardMarkup:
     L = (lang or "ar").startswith("ar")
     def LBL(ar, en): return ar if L else en
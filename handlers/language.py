@@ -13,6 +13,7 @@ from aiogram.filters import Command
 from aiogram.exceptions import TelegramBadRequest
 
 from lang import t, get_user_lang, set_user_lang
+from utils import command_menu_cache
 from handlers.persistent_menu import make_bottom_kb
 
 router = Router()
@@ -69,21 +70,23 @@ def _admin_extra_commands(lang: str) -> List[BotCommand]:
     return [BotCommand(command="admin", description=desc)] if desc.strip() else []
 
 async def update_user_commands(bot, chat_id: int, lang: str) -> None:
-    """يضبط أوامر هذه الدردشة فقط، ويتجاهل الوصف الفارغ بدون أن يكرّش."""
+    """يضبط أوامر هذه الدردشة فقط، ويتجاهل الوصف الفارغ بدون أن يكرّش.
+    لا يستدعي API إذا لم تتغيّر بصمة القائمة (lang + admin + الأوامر)."""
     is_admin = int(chat_id) in ADMIN_IDS
     cmds = _public_commands(lang)
     if is_admin:
         cmds += _admin_extra_commands(lang)
 
-    # امسح أوامر هذه المحادثة ثم اضبط الجديدة
-    try:
-        await bot.delete_my_commands(scope=BotCommandScopeChat(chat_id=chat_id))
-    except Exception:
-        pass
+    fp = command_menu_cache.fingerprint(lang, is_admin, cmds)
+    # التسجيل قبل الاستدعاء يدمج طلبات /start المتزامنة لنفس الدردشة في استدعاء واحد
+    if not command_menu_cache.mark(chat_id, fp):
+        return
 
+    # set_my_commands يستبدل قائمة النطاق كاملة — لا حاجة لـ delete_my_commands قبله
     try:
         await bot.set_my_commands(commands=cmds, scope=BotCommandScopeChat(chat_id=chat_id))
     except Exception as e:
+        command_menu_cache.forget(chat_id)
         # سجل الخطأ فقط بدون تعطيل التفاعل
         import logging
         logging.getLogger(__name__).warning(f"set_my_commands failed: {e}")
@@ -120,7 +123,9 @@ async def smart_edit(message: Message, text: str, reply_markup: InlineKeyboardMa
         return await message.answer(text, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
     except TelegramBadRequest as e:
         msg = str(e).lower()
-        if "there is no text in the message to edit" in msg or "message is not modified" in msg:
+        if "message is not modified" in msg:
+            return message
+        if "there is no text in the message to edit" in msg:
             return await message.answer(text, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
         raise
 
@@ -14,6 +14,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.enums import ParseMode
 
 from lang import t, get_user_lang
+from utils.admin_notify import notify as notify_admins_bus
 
 router = Router(name="promoter")
 # ✅ قيّد كولباكات المروّج على بادئة prom:
@@ -145,7 +146,10 @@ def is_promoter(uid: int) -> bool:
     ويحترم مفتاح active إن كان موجودًا.
     """
     d = _load_store()
-    u = d.get("users", {}).get(str(uid))
+    return _promoter_active(d.get("users", {}).get(str(uid)))
+
+def _promoter_active(u: Any) -> bool:
+    """قاعدة is_promoter على سجل واحد (تُستخدم أيضًا في utils.home_snapshot)."""
     if not u:
         return False
     if isinstance(u, dict):
@@ -440,20 +444,15 @@ async def prom_save_proof(m: Message, state: FSMContext):
         f"{_tf(lang,'prom.adm.attempts','المحاولات (24 ساعة)','Attempts (24h)')}: <code>{attempts_now}/{daily_limit}</code>\n"
     )
 
-    for admin_id in ADMIN_IDS:
-        try:
-            await m.bot.send_message(
-                admin_id, txt,
-                reply_markup=_admin_review_kb(int(uid), L(admin_id)),
-                parse_mode=ParseMode.HTML,
-                disable_web_page_preview=True
-            )
-            if photo_ids:
-                await m.bot.send_photo(admin_id, photo_ids[-1], caption=_tf(L(admin_id), "prom.adm.proof_caption", "📎 إثبات", "📎 Proof"))
-            elif video_ids:
-                await m.bot.send_video(admin_id, video_ids[0], caption=_tf(L(admin_id), "prom.adm.proof_caption", "📎 إثبات", "📎 Proof"))
-        except Exception:
-            pass
+    proof = ("photo", photo_ids[-1]) if photo_ids else (("video", video_ids[0]) if video_ids else None)
+    notify_admins_bus(
+        m.bot, txt, kind="promoter_request", admins=ADMIN_IDS,
+        reply_markup=lambda aid: _admin_review_kb(int(uid), L(aid)),
+        followup=(lambda aid: (*proof, _tf(L(aid), "prom.adm.proof_caption", "📎 إثبات", "📎 Proof"))) if proof else None,
+        summary=f"{uid} · {store['users'][uid]['name']}", link=f"tg://user?id={uid}",
+        queue=lambda aid: ("📣 " + _tf(L(aid), "prom.adm.requests", "طلبات المروّجين", "Promoter requests"),
+                           "promadm:open"),
+    )
 
     await m.answer(_tf(lang, "prom.submitted", "تم إرسال طلبك. سيتم مراجعته من قبل الإدارة ✅", "Your request was submitted. Admins will review it ✅"))
 
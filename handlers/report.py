@@ -9,6 +9,8 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from lang import t, get_user_lang
+from utils import report_log, gcra
+from utils.admin_notify import notify as notify_admins_bus
 
 router = Router(name="report_handler")
 log = logging.getLogger(__name__)
@@ -24,7 +26,7 @@ router.callback_query.filter(
 DATA_DIR = Path("data"); DATA_DIR.mkdir(parents=True, exist_ok=True)
 SETTINGS_FILE  = DATA_DIR / "report_settings.json"
 STATE_FILE     = DATA_DIR / "report_users.json"
-LOG_FILE       = DATA_DIR / "reports_log.json"
+LOG_FILE       = DATA_DIR / "reports_log.json"       # قديم: يُرحَّل تلقائيًا إلى utils.report_log
 THREADS_FILE   = DATA_DIR / "support_threads.json"
 FEEDBACK_FILE  = DATA_DIR / "report_feedback.json"
 BLOCKLIST_FILE = DATA_DIR / "report_blocklist.json"   # للحظر المؤقت/الدائم
@@ -96,8 +98,30 @@ def load_state() -> dict:
 
 def save_state(d: dict): _save_json(STATE_FILE, d)
 
+# ===== تبريد البلاغات (GCRA: بلاغ واحد كل cooldown_days) =====
+# report_users.json يبقى المصدر الدائم؛ المحدِّد يُعبّأ منه مرة لكل قيمة cooldown_days
+# فيصبح فحص /report من الذاكرة بدل قراءة الملف في كل مرة.
+_CD_PREFIX = "report.cooldown."
+
+def _cooldown(cd_days: int) -> gcra.Limiter:
+    period = cd_days * 86400
+
+    def _seed(lim: gcra.Limiter) -> None:
+        for uid, iso in load_state().get("last", {}).items():
+            dt = parse_iso_z(iso)
+            if dt and str(uid).isdigit():
+                lim.seed(int(uid), dt.timestamp() + period)
+
+    return gcra.limiter(f"{_CD_PREFIX}{cd_days}d", 1, period, clock=_wall_ts, seed=_seed)
+
+def _wall_ts() -> float:
+    return datetime.datetime.now(datetime.timezone.utc).timestamp()
+
 def append_log(item: dict):
-    data = _load_json(LOG_FILE, []); data.append(item); _save_json(LOG_FILE, data)
+    try:
+        report_log.append(item)
+    except Exception as e:
+        log.error(f"[report] append log error: {e}")
 
 def load_threads() -> dict:
     d = _load_json(THREADS_FILE, {"users": {}}); d.setdefault("users", {}); return d
@@ -250,25 +274,27 @@ async def _notify_admins_new_report(m: Message, user_id: int, text: str):
         "— — —\n" + text
     )
     targets = list(set(ADMIN_IDS + ([ADMIN_ALERT_CHAT_ID] if ADMIN_ALERT_CHAT_ID else [])))
-    success = False
-    for aid in targets:
-        try:
-            a_lang = get_user_lang(aid) or "en"
-            await m.bot.send_message(aid, admin_msg, reply_markup=_admin_controls_kb(user_id, a_lang))
-            try:
-                await m.bot.copy_message(chat_id=aid, from_chat_id=m.chat.id, message_id=m.message_id)
-            except Exception as e:
-                log.warning(f"[report] copy_message -> {aid} failed: {e}")
-            success = True
-        except Exception as e:
-            log.warning(f"[report] notify -> {aid} failed: {e}")
-    if not success and (m.from_user.id in ADMIN_IDS):
+
+    async def _fallback(sent: int, failed: int):
+        # كما سابقًا: إن فشل التسليم لكل الأدمنز والمُبلِّغ أدمن، نعرض له نسخة محلية
+        if sent or m.from_user.id not in ADMIN_IDS:
+            return
         lang = get_user_lang(m.from_user.id) or "en"
         try:
             await m.answer("🔔 <b>Admin Copy</b>\n" + admin_msg, reply_markup=_admin_controls_kb(user_id, lang))
         except Exception as e:
             log.error(f"[report] local admin fallback failed: {e}")
 
+    # عبر ناقل الإشعارات (غير حاجب، وتجميع دفعات البلاغات بعد أول بضعة)
+    notify_admins_bus(
+        m.bot, admin_msg, kind="report", admins=targets,
+        reply_markup=lambda aid: _admin_controls_kb(user_id, get_user_lang(aid) or "en"),
+        copy_from=(m.chat.id, m.message_id),
+        summary=f"{user_id} · {m.from_user.full_name}", link=f"tg://user?id={user_id}",
+        queue=lambda aid: ("📥 " + _tf(get_user_lang(aid) or "en", "rin.title", "صندوق الوارد"), "rin:open"),
+        on_result=_fallback,
+    )
+
 # ===== /report =====
 @router.message(
     StateFilter(None),
@@ -298,18 +324,13 @@ async def report_cmd(m: Message, state: FSMContext):
 
         cd_days = int(st.get("cooldown_days", 0) or 0)
         if cd_days > 0:
-            last_iso = load_state().get("last", {}).get(str(user_id))
-            if last_iso:
-                last_dt = parse_iso_z(last_iso)
-                if last_dt:
-                    now = datetime.datetime.now(datetime.timezone.utc)
-                    next_allowed = last_dt + datetime.timedelta(days=cd_days)
-                    if now < next_allowed:
-                        remain = human_remaining(next_allowed - now)
-                        return await m.reply(
-                            _tf(lang, "report.cooldown_wait", "يرجى الانتظار {remaining} قبل إرسال بلاغ آخر.")
-                            .format(remaining=remain)
-                        )
+            wait = _cooldown(cd_days).retry_after(user_id)
+            if wait > 0:
+                remain = human_remaining(datetime.timedelta(seconds=wait))
+                return await m.reply(
+                    _tf(lang, "report.cooldown_wait", "يرجى الانتظار {remaining} قبل إرسال بلاغ آخر.")
+                    .format(remaining=remain)
+                )
 
     await state.set_state(ReportState.waiting_text)
     await m.reply(_tf(lang, "report.prompt", "أرسل وصف مشكلتك بالتفصيل (صور/فيديو إن لزم)."))
@@ -352,6 +373,8 @@ async def report_receive_any(m: Message, state: FSMContext):
     await _notify_admins_new_report(m, user_id, display_text)
 
     st = load_state(); st.setdefault("last", {})[str(user_id)] = utcnow_iso(); save_state(st)
+    for lim in gcra.limiters(_CD_PREFIX):
+        lim.seed(user_id, _wall_ts() + lim.period)
     await state.clear()
     await m.reply(_tf(lang, "report.saved", "تم استلام بلاغك ✅"))
 
@@ -420,9 +443,8 @@ async def _notify_admins_feedback(bot, rec: dict):
            f"• Time: <code>{rec['time']}</code>\n")
     if rec.get("reason"): msg += f"• Reason: {rec['reason']}\n"
     targets = list(set(ADMIN_IDS + ([ADMIN_ALERT_CHAT_ID] if ADMIN_ALERT_CHAT_ID else [])))
-    for aid in targets:
-        try: await bot.send_message(aid, msg)
-        except Exception: pass
+    notify_admins_bus(bot, msg, kind="report_feedback", admins=targets,
+                      summary=f"{rec['user_id']} · {rec['result']}")
 
 @router.callback_query(F.data.in_(["rfb:yes", "rfb:no", "rfb:skip"]))
 async def rfb_choice(cb: CallbackQuery, state: FSMContext):
@@ -549,6 +571,8 @@ async def rpadm_clearcd(cb: CallbackQuery):
     st = load_state()
     (st.setdefault("last", {})).pop(str(uid), None)
     save_state(st)
+    for lim in gcra.limiters(_CD_PREFIX):
+        lim.reset(uid)
 
     u_lang = get_user_lang(uid) or "ar"
     try:
@@ -588,8 +612,7 @@ async def rpadm_info(cb: CallbackQuery):
     uid = int(cb.data.split(":")[2])
     blocked, remain = _bl_is_blocked(uid)
     bl_line = f"{'Blocked' if blocked else 'Not blocked'}" + (f" — {remain}" if blocked and remain else "")
-    logs = _load_json(LOG_FILE, [])
-    last_log = next((it for it in reversed(logs) if int(it.get("user_id", 0)) == uid), None)
+    last_log = report_log.last_one(uid)
     last_line = "-" if not last_log else f"{last_log.get('date','-')} · {(last_log.get('text') or '(media)')[:120]}"
     th = get_thread(uid) or {}
     sess_line = f"open={bool(th.get('open'))}, admin_id={th.get('admin_id')}"
@@ -617,8 +640,7 @@ async def cmd_rinfo(m: Message):
     bl_line = f"{'Blocked' if blocked else 'Not blocked'}" + (f" — {remain}" if blocked and remain else "")
     th = get_thread(uid) or {}
     sess_line = f"open={bool(th.get('open'))}, admin_id={th.get('admin_id')}"
-    logs = _load_json(LOG_FILE, [])
-    last = next((it for it in reversed(logs) if int(it.get('user_id',0))==uid), None)
+    last = report_log.last_one(uid)
     last_line = "-" if not last else f"{last.get('date','-')} · {(last.get('text') or '(media)')[:200]}"
     await m.reply(f"👤 <b>User</b> <code>{uid}</code>\n• Block: <b>{bl_line}</b>\n• Session: {sess_line}\n• Last: {last_line}")
 
@@ -11,6 +11,7 @@ from aiogram.filters import Command
 from aiogram.enums import ParseMode
 
 from lang import t, get_user_lang
+from utils.admin_notify import notify as notify_admins_bus
 from handlers.supplier_payment import prompt_user_payment  # إرسال شاشة الدفع بعد الموافقة
 
 # ⬇️ إلغاء/تفعيل المورد (اختياري – لو غير موجود يكمل بدون خطأ)
@@ -337,30 +338,33 @@ async def app_submit(cb: CallbackQuery, state: FSMContext):
     await state.clear()
     await cb.message.edit_text(_tr(lang, "apply_submitted", "Your application has been submitted. We will contact you shortly.", "تم إرسال طلبك. سنتواصل معك قريبًا."), parse_mode=ParseMode.HTML)
 
-    # إشعار كل أدمن بلغته
-    for aid in ADMIN_IDS:
-        try:
-            al = get_user_lang(aid) or "en"
-            title = _tr(al, "admin_new_app", "New supplier application", "طلب مورد جديد")
-            lbl_rec  = _tr(al, "admin_lbl_recid", "RecID", "المعرّف")
-            lbl_user = _tr(al, "admin_lbl_user",  "User",  "المستخدم")
-            txt = (
-                f"🆕 <b>{title}</b>\n"
-                f"• {lbl_rec}: <code>{rec['id']}</code>\n"
-                f"• {lbl_user}: <code>{rec['user_id']}</code> @{rec['username']}\n\n"
-                + _summary(al, {
-                    'name': rec.get('name',''),
-                    'country': rec.get('country',''),
-                    'channel': rec.get('channel',''),
-                    'exp': rec.get('exp',''),
-                    'vol': rec.get('vol',''),
-                    'pref': rec.get('pref',''),
-                })
-            )
-            kb = _kb_admin(rec["id"], al)
-            await cb.message.bot.send_message(aid, txt, reply_markup=kb, disable_web_page_preview=True, parse_mode=ParseMode.HTML)
-        except Exception:
-            pass
+    # إشعار كل أدمن بلغته (عبر ناقل الإشعارات: غير حاجب + تجميع الدفعات)
+    def _admin_txt(aid: int) -> str:
+        al = get_user_lang(aid) or "en"
+        title = _tr(al, "admin_new_app", "New supplier application", "طلب مورد جديد")
+        lbl_rec  = _tr(al, "admin_lbl_recid", "RecID", "المعرّف")
+        lbl_user = _tr(al, "admin_lbl_user",  "User",  "المستخدم")
+        return (
+            f"🆕 <b>{title}</b>\n"
+            f"• {lbl_rec}: <code>{rec['id']}</code>\n"
+            f"• {lbl_user}: <code>{rec['user_id']}</code> @{rec['username']}\n\n"
+            + _summary(al, {
+                'name': rec.get('name',''),
+                'country': rec.get('country',''),
+                'channel': rec.get('channel',''),
+                'exp': rec.get('exp',''),
+                'vol': rec.get('vol',''),
+                'pref': rec.get('pref',''),
+            })
+        )
+
+    notify_admins_bus(
+        cb.message.bot, _admin_txt, kind="reseller_apply", admins=ADMIN_IDS,
+        reply_markup=lambda aid: _kb_admin(rec["id"], get_user_lang(aid) or "en"),
+        summary=f"{rec['user_id']} @{rec['username']}", link=f"tg://user?id={rec['user_id']}",
+        queue=lambda aid: (_tr(get_user_lang(aid) or "en", "admin_hub_btn_resapps",
+                           "📂 Supplier applications", "📂 طلبات الموردين"), "ah:resapps"),
+    )
 
     await cb.answer("OK")
 
@@ -5,7 +5,8 @@ import os
 import time
 import asyncio
 import logging
-from typing import List, Tuple, Union, Dict
+from collections import OrderedDict
+from typing import List, Tuple, Union, Dict, Optional
 
 from aiogram import Router, F
 from aiogram.filters import Command
@@ -18,6 +19,7 @@ from aiogram.enums import ChatMemberStatus
 from aiogram.exceptions import TelegramBadRequest
 
 from utils.rewards_flags import is_global_paused, is_user_paused
+from utils import timers
 from lang import t, get_user_lang
 from utils.rewards_store import (
     set_blocked, is_blocked, add_points, ensure_user, mark_warn, get_points
@@ -69,6 +71,8 @@ REQUIRED_CHANNELS = _parse_channels(os.getenv("REWARDS_CHANNELS", ""))
 LEAVE_DEDUCT_DEFAULT = int(os.getenv("REWARDS_LEAVE_DEDUCT", "50"))
 GRACE_SECONDS        = int(os.getenv("REWARDS_GRACE_SECONDS", "120"))   # مهلة السماح
 MEMBERSHIP_TTL       = int(os.getenv("REWARDS_RECHECK_TTL", "60"))      # كاش فحص الاشتراك
+MEMBERSHIP_CACHE_MAX = int(os.getenv("REWARDS_MEMBERSHIP_CACHE_MAX", "50000"))  # حد كاش LRU
+EVENT_TTL            = int(os.getenv("REWARDS_EVENT_TTL", "3600"))      # صلاحية البت القادم من chat_member
 ESCALATE             = os.getenv("REWARDS_DEDUCT_ESCALATE", "").strip() # "20,50,100"
 DEDUCT_SEQ           = [int(x) for x in ESCALATE.split(",") if x.strip().isdigit()]
 SKIP_ADMINS          = int(os.getenv("REWARDS_SKIP_ADMINS", "1"))       # إعفاء الأدمن
@@ -85,46 +89,135 @@ def _L(uid: int) -> str:
     return get_user_lang(uid) or "ar"
 
 # ---------------------- كاش ----------------------
+# عناوين القنوات: تُحلّ مرة واحدة عند الإقلاع (warmup_channels) ومحصورة بالقنوات المطلوبة
 _channel_title_cache: Dict[Union[int, str], str] = {}
-_membership_cache: Dict[tuple[int, Union[int, str]], tuple[bool, int]] = {}
-_leave_pending: Dict[tuple[int, Union[int, str]], int] = {}  # (uid, channel)->ts
+# chat_id الرقمي -> مدخل REQUIRED_CHANNELS (لربط أحداث chat_member بقنوات @username)
+_channel_ids: Dict[int, Union[int, str]] = {}
+# (uid, channel) -> (is_member, expires_at) — LRU محدود الحجم
+_membership_cache: "OrderedDict[tuple[int, Union[int, str]], tuple[bool, float]]" = OrderedDict()
+_inflight: Dict[tuple[int, Union[int, str]], asyncio.Future] = {}
+_cache_stats = {"hits": 0, "misses": 0, "event_updates": 0}
+
+_MEMBER_STATUSES = (ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR)
+
+def _cache_get(key: tuple[int, Union[int, str]]) -> Optional[bool]:
+    rec = _membership_cache.get(key)
+    if rec is None:
+        return None
+    if rec[1] <= time.monotonic():
+        _membership_cache.pop(key, None)
+        return None
+    _membership_cache.move_to_end(key)
+    return rec[0]
+
+def _cache_put(key: tuple[int, Union[int, str]], ok: bool, ttl: int = MEMBERSHIP_TTL) -> None:
+    _membership_cache[key] = (bool(ok), time.monotonic() + max(1, ttl))
+    _membership_cache.move_to_end(key)
+    while len(_membership_cache) > MEMBERSHIP_CACHE_MAX:
+        _membership_cache.popitem(last=False)
+
+def membership_cache_stats() -> dict:
+    """إحصاءات كاش الاشتراك (نسبة الإصابة، الحجم، تحديثات الأحداث)."""
+    hits, misses = _cache_stats["hits"], _cache_stats["misses"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+        "size": len(_membership_cache),
+        "max_size": MEMBERSHIP_CACHE_MAX,
+        "event_updates": _cache_stats["event_updates"],
+    }
+
+def _default_title(channel: Union[int, str]) -> str:
+    return channel if isinstance(channel, str) else str(channel)
+
+async def _resolve_channel(bot, channel: Union[int, str]) -> str:
+    try:
+        chat = await bot.get_chat(channel)
+        title = chat.title or _default_title(channel)
+        try:
+            _channel_ids[int(chat.id)] = channel
+        except Exception:
+            pass
+    except Exception:
+        return _default_title(channel)
+    _channel_title_cache[channel] = title
+    return title
+
+async def warmup_channels(bot):
+    """يحلّ عناوين ومعرّفات القنوات المطلوبة مرة واحدة عند الإقلاع (dp.startup)."""
+    if not REQUIRED_CHANNELS:
+        return
+    await asyncio.gather(*(_resolve_channel(bot, ch) for ch in REQUIRED_CHANNELS), return_exceptions=True)
+    log.info(f"[rewards_gate] resolved {len(_channel_title_cache)}/{len(REQUIRED_CHANNELS)} channel titles")
 
 async def _get_channel_title(bot, channel: Union[int, str]) -> str:
     if channel in _channel_title_cache:
         return _channel_title_cache[channel]
+    if isinstance(channel, int) and channel in _channel_ids:
+        return _channel_title_cache.get(_channel_ids[channel]) or _default_title(channel)
+    if channel in REQUIRED_CHANNELS:
+        # لم يُحلّ عند الإقلاع (فشل شبكة مثلًا) — محاولة واحدة الآن
+        return await _resolve_channel(bot, channel)
+    return _default_title(channel)
+
+def _channel_key_for(chat_id: int) -> Union[int, str]:
+    """يعيد مدخل REQUIRED_CHANNELS المطابق لـ chat_id (أو chat_id نفسه)."""
+    if chat_id in REQUIRED_CHANNELS:
+        return chat_id
+    return _channel_ids.get(chat_id, chat_id)
+
+async def _fetch_member(bot, user_id: int, channel: Union[int, str]) -> bool:
     try:
-        chat = await bot.get_chat(channel)
-        title = chat.title or (channel if isinstance(channel, str) else str(channel))
+        member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
+        return member.status in _MEMBER_STATUSES
     except Exception:
-        title = (channel if isinstance(channel, str) else str(channel))
-    _channel_title_cache[channel] = title
-    return title
+        return False
 
 async def _is_member_of(bot, user_id: int, channel: Union[int, str]) -> bool:
     key = (user_id, channel)
-    now = int(time.time())
-    cached = _membership_cache.get(key)
-    if cached and now - cached[1] < MEMBERSHIP_TTL:
-        return cached[0]
+    cached = _cache_get(key)
+    if cached is not None:
+        _cache_stats["hits"] += 1
+        return cached
+    _cache_stats["misses"] += 1
+    # دمج الطلبات المتزامنة لنفس المفتاح في نداء API واحد
+    fut = _inflight.get(key)
+    if fut is not None:
+        return await asyncio.shield(fut)
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
     try:
-        member = await bot.get_chat_member(chat_id=channel, user_id=user_id)
-        ok = member.status in (ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR)
-    except Exception:
-        ok = False
-    _membership_cache[key] = (ok, now)
-    return ok
+        ok = await _fetch_member(bot, user_id, channel)
+        _cache_put(key, ok)
+        fut.set_result(ok)
+        return ok
+    except BaseException:
+        if not fut.done():
+            fut.cancel()
+        raise
+    finally:
+        _inflight.pop(key, None)
 
 async def check_membership(bot, user_id: int) -> Tuple[bool, List[Union[int, str]]]:
     if SKIP_ADMINS and user_id in ADMIN_IDS:
         return True, []
     if not REQUIRED_CHANNELS:
         return True, []
-    missing = []
-    for ch in REQUIRED_CHANNELS:
-        if not await _is_member_of(bot, user_id, ch):
-            missing.append(ch)
+    results = await asyncio.gather(*(_is_member_of(bot, user_id, ch) for ch in REQUIRED_CHANNELS))
+    missing = [ch for ch, ok in zip(REQUIRED_CHANNELS, results) if not ok]
     return (len(missing) == 0), missing
 
+def _on_membership_event(uid: int, chat_id: int, is_member: bool) -> None:
+    """تحديث استباقي للكاش من أحداث chat_member (انضمام/مغادرة تقلب البت فورًا)."""
+    ttl = max(MEMBERSHIP_TTL, EVENT_TTL)
+    ch_key = _channel_key_for(chat_id)
+    _cache_put((uid, ch_key), is_member, ttl)
+    if ch_key != chat_id:
+        _cache_put((uid, chat_id), is_member, ttl)
+    _cache_stats["event_updates"] += 1
+
 # ---------------------- كيبورد الانضمام ----------------------
 def _channel_url(ch: Union[int, str]) -> str:
     if isinstance(ch, int):
@@ -168,10 +261,8 @@ async def require_membership(msg_or_cb: Message | CallbackQuery) -> bool:
     set_blocked(uid, True)
     text = t(lang, "rewards.gate.required", "الاشتراك بالقنوات إلزامي لاستخدام الجوائز.")
     if missing:
-        lines = []
-        for ch in missing:
-            title = await _get_channel_title(msg_or_cb.bot, ch)
-            lines.append(f"• {title}")
+        titles = await asyncio.gather(*(_get_channel_title(msg_or_cb.bot, ch) for ch in missing))
+        lines = [f"• {title}" for title in titles]
         if lines:
             text += "\n" + t(lang, "rewards.gate.missing_list", "القنوات المطلوبة التي لم تشترك بها:") + "\n" + "\n".join(lines)
     kb_markup = (await join_keyboard(msg_or_cb.bot, lang)).as_markup()
@@ -204,6 +295,19 @@ async def cmd_rewards_join(m: Message):
         disable_web_page_preview=True
     )
 
+@router.message(Command("rewards_cache"))
+async def cmd_rewards_cache(m: Message):
+    if m.from_user.id not in ADMIN_IDS:
+        return
+    st = membership_cache_stats()
+    await m.answer(
+        "📊 <b>Rewards membership cache</b>\n"
+        f"• Hit ratio: <b>{st['hit_ratio'] * 100:.1f}%</b> ({st['hits']}/{st['hits'] + st['misses']})\n"
+        f"• Size: <code>{st['size']}/{st['max_size']}</code>\n"
+        f"• Event updates: <code>{st['event_updates']}</code>\n"
+        f"• Channels resolved: <code>{len(_channel_title_cache)}/{len(REQUIRED_CHANNELS)}</code>"
+    )
+
 @router.callback_query(F.data == "rwd:gate:close")
 async def cb_gate_close(cb: CallbackQuery):
     try:
@@ -272,13 +376,20 @@ async def _send_preleave_notice(bot, uid: int, channel: Union[int, str]):
         pass
 
 # ---------------------- مهلة السماح والخصم ----------------------
-async def _apply_grace_and_deduct(bot, uid: int, channel: Union[int, str], leave_ts: int):
-    await asyncio.sleep(max(0, GRACE_SECONDS))
+# مؤقّت دائم لكل (uid, channel): العودة للقناة تلغيه، والمغادرة مجددًا تعيد ضبطه
+def _grace_key(uid: int, channel: Union[int, str]) -> str:
+    return f"rwd_grace:{uid}:{channel}"
 
-    if _leave_pending.get((uid, channel)) != leave_ts:
-        return
+async def _grace_action(bot, payload: dict):
+    await _apply_grace_and_deduct(bot, int(payload["uid"]), payload["channel"], int(payload.get("leave_ts") or 0))
 
-    if await _is_member_of(bot, uid, channel):
+timers.register_action("rewards.grace_deduct", _grace_action)
+
+async def _apply_grace_and_deduct(bot, uid: int, channel: Union[int, str], leave_ts: int):
+    # قبل الخصم نتحقق من API مباشرة (لا نعتمد على الكاش في قرار عقابي)
+    ok = await _fetch_member(bot, uid, channel)
+    _cache_put((uid, channel), ok)
+    if ok:
         return  # عاد خلال المهلة
 
     ensure_user(uid)
@@ -367,10 +478,12 @@ async def on_chat_member_update(event: ChatMemberUpdated):
         return
 
     new_status = event.new_chat_member.status
+    if new_status in _MEMBER_STATUSES or new_status in (ChatMemberStatus.LEFT, ChatMemberStatus.KICKED):
+        _on_membership_event(uid, chat_id, new_status in _MEMBER_STATUSES)
 
     # ===== عاد أو اشترك
-    if new_status in (ChatMemberStatus.MEMBER, ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR):
-        _leave_pending.pop((uid, chat_id), None)
+    if new_status in _MEMBER_STATUSES:
+        timers.cancel(_grace_key(uid, chat_id))
         was_blocked = is_blocked(uid)
         set_blocked(uid, False)
         if was_blocked:
@@ -410,8 +523,11 @@ async def on_chat_member_update(event: ChatMemberUpdated):
     # ===== غادر القناة
     if new_status in (ChatMemberStatus.LEFT, ChatMemberStatus.KICKED):
         leave_ts = int(time.time())
-        _leave_pending[(uid, chat_id)] = leave_ts
         # تنبيه مبكّر
         asyncio.create_task(_send_preleave_notice(event.bot, uid, chat_id))
-        # ثم مهلة السماح والخصم
-        asyncio.create_task(_apply_grace_and_deduct(event.bot, uid, chat_id, leave_ts))
+        # ثم مهلة السماح والخصم (مؤقّت دائم يصمد بعد إعادة التشغيل)
+        timers.schedule(
+            "rewards.grace_deduct", max(0, GRACE_SECONDS),
+            {"uid": uid, "channel": chat_id, "leave_ts": leave_ts},
+            key=_grace_key(uid, chat_id),
+        )
@@ -17,6 +17,7 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
 from lang import t, get_user_lang
+from utils.kb_cache import cached_markup
 from utils.rewards_store import (
     ensure_user, get_points, add_points, is_blocked, can_do
 )
@@ -115,6 +116,10 @@ def _kb_market(lang: str) -> InlineKeyboardBuilder:
     kb.row(InlineKeyboardButton(text=t(lang, "market.back", "⬅️ رجوع"), callback_data="rwd:hub"))
     return kb
 
+@cached_markup("rewards.market")
+def _market_markup(lang: str):
+    return _kb_market(lang).as_markup()
+
 async def _show_market(msg_or_cb: Message | CallbackQuery):
     """يعرض قائمة المتجر (تفصلنا لكي نستعملها مع ensure_human_then)."""
     uid = msg_or_cb.from_user.id
@@ -129,7 +134,7 @@ async def _show_market(msg_or_cb: Message | CallbackQuery):
         return await msg_or_cb.answer(txt)
 
     title = t(lang, "market.title", "🛍️ المتجر — اختر عنصرًا")
-    kb = _kb_market(lang).as_markup()
+    kb = _market_markup(lang)
     if isinstance(msg_or_cb, CallbackQuery):
         try:
             await msg_or_cb.message.edit_text(title, reply_markup=kb)
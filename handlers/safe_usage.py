@@ -42,8 +42,9 @@ async def _smart_edit_or_send(message: Message, text: str, reply_markup: InlineK
         )
     except TelegramBadRequest as e:
         msg = str(e).lower()
+        if "message is not modified" in msg:
+            return message  # المحتوى نفسه معروض أصلًا
         if ("there is no text in the message to edit" in msg or
-            "message is not modified" in msg or
             "message can't be edited" in msg):
             return await message.answer(
                 text,
@@ -9,6 +9,7 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.enums import ParseMode
 from lang import t, get_user_lang
+from utils.kb_cache import cached_markup, file_stamp
 
 # دعم المنطقة الزمنية (Python 3.9+). في حال عدم توفرها نستخدم تعويض +3
 try:
@@ -166,9 +167,10 @@ async def _smart_edit_or_send(msg: Message, text: str, reply_markup=None):
         )
     except TelegramBadRequest as e:
         low = str(e).lower()
+        if "message is not modified" in low:
+            return msg  # المحتوى نفسه معروض أصلًا
         if ("there is no text in the message to edit" in low or
-            "message can't be edited" in low or
-            "message is not modified" in low):
+            "message can't be edited" in low):
             return await msg.answer(
                 text,
                 reply_markup=reply_markup,
@@ -211,6 +213,11 @@ def _kb_main(lang: str, as_admin: bool, *, src: str) -> InlineKeyboardBuilder:
     kb.adjust(1)
     return kb
 
+# اللوحة المبنية مخزّنة حسب (اللغة، أدمن، المصدر) وتُبطل عند تعديل DATA_FILE
+@cached_markup("security.main", deps=file_stamp(DATA_FILE))
+def _main_markup(lang: str, as_admin: bool, *, src: str):
+    return _kb_main(lang, as_admin, src=src).as_markup()
+
 def _kb_admin(lang: str) -> InlineKeyboardBuilder:
     data = _load()
     kb = InlineKeyboardBuilder()
@@ -304,7 +311,7 @@ async def security_menu(cb: CallbackQuery):
     lang = L(cb.from_user.id)
     src = "vip" if cb.data == "security_status:vip" else "main"
     text = _main_text(lang)
-    kb = _kb_main(lang, is_admin(cb.from_user.id), src=src).as_markup()
+    kb = _main_markup(lang, is_admin(cb.from_user.id), src=src)
     await _smart_edit_or_send(cb.message, text, kb)
     await cb.answer()
 
@@ -314,7 +321,7 @@ async def security_refresh(cb: CallbackQuery):
     lang = L(cb.from_user.id)
     _, _, src = cb.data.split(":")
     text = _main_text(lang, ping_now=True)
-    kb = _kb_main(lang, is_admin(cb.from_user.id), src=src).as_markup()
+    kb = _main_markup(lang, is_admin(cb.from_user.id), src=src)
     try:
         await _smart_edit_or_send(cb.message, text, kb)
         await cb.answer(t(lang, "sec.refreshed"))
@@ -342,7 +349,7 @@ async def security_back_list(cb: CallbackQuery):
     lang = L(cb.from_user.id)
     _, _, src = cb.data.split(":")
     text = _main_text(lang)
-    kb = _kb_main(lang, is_admin(cb.from_user.id), src=src).as_markup()
+    kb = _main_markup(lang, is_admin(cb.from_user.id), src=src)
     await _smart_edit_or_send(cb.message, text, kb)
     await cb.answer()
 
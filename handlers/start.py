@@ -12,6 +12,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.enums import ParseMode
 
 from utils.known_users import add_known_user
+from utils.admin_notify import notify as notify_admins_bus
 from lang import t, get_user_lang
 
 # بطاقة الترحيب الجديدة (Hero Pro)
@@ -187,19 +188,20 @@ async def _serve_home(message: Message):
             async def _vip_bg():
                 try:
                     add_pending(user.user_id, app_id)
-                    for admin_id in _load_admin_ids():
-                        try:
-                            await message.bot.send_message(
-                                admin_id,
-                                f"{t(user.lang, 'vip.admin.new_request_title')}\n"
-                                f"👤 {t(user.lang,'vip.admin.user')}: <code>{user.user_id}</code>\n"
-                                f"🆔 {t(user.lang,'vip.admin.app_id')}: <code>{app_id}</code>\n\n"
-                                f"{t(user.lang,'vip.admin.instructions')}",
-                                reply_markup=_admin_review_kb(user.user_id, app_id, user.lang),
-                                parse_mode=ParseMode.HTML
-                            )
-                        except Exception:
-                            pass
+                    notify_admins_bus(
+                        message.bot,
+                        f"{t(user.lang, 'vip.admin.new_request_title')}\n"
+                        f"👤 {t(user.lang,'vip.admin.user')}: <code>{user.user_id}</code>\n"
+                        f"🆔 {t(user.lang,'vip.admin.app_id')}: <code>{app_id}</code>\n\n"
+                        f"{t(user.lang,'vip.admin.instructions')}",
+                        kind="vip_request",
+                        admins=_load_admin_ids(),
+                        reply_markup=_admin_review_kb(user.user_id, app_id, user.lang),
+                        summary=f"{user.user_id} · {app_id}",
+                        link=f"tg://user?id={user.user_id}",
+                        queue=lambda aid: ("⏳ " + (t(get_user_lang(aid) or "en", "admin.vip.pending_btn") or "Pending"),
+                                           "vipadm:pending"),
+                    )
                     try:
                         await message.answer(t(user.lang, "vip.apply.sent"))
                     except Exception:
@@ -16,6 +16,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from lang import t, get_user_lang
+from utils.admin_notify import notify as notify_admins_bus
 
 # اختياري: عند القبول نضيفه لقائمة المورّدين العمومية utils/suppliers.py
 try:
@@ -148,11 +149,7 @@ def _preview_text(lang: str, data: Dict[str, Any]) -> str:
 
 async def _notify_admins(bot, text: str, kb: Optional[InlineKeyboardMarkup] = None):
     # أرسل للإداريين
-    for uid in ADMIN_IDS:
-        try:
-            await bot.send_message(uid, text, parse_mode=ParseMode.HTML, reply_markup=kb)
-        except Exception:
-            pass
+    notify_admins_bus(bot, text, kind="supplier_apply", admins=ADMIN_IDS, reply_markup=kb)
     # قناة تدقيق اختيارية
     if AUDIT_CHAT_ID:
         try:
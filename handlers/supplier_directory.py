@@ -14,6 +14,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.enums import ParseMode
 
 from lang import t, get_user_lang
+from utils import supplier_index
 
 # هل المستخدم مورّد؟
 try:
@@ -115,41 +116,19 @@ def _save_pub(uid: int, data: dict):
     data["updated_at"] = _now_iso()
     with open(_pub_path(uid), "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    supplier_index.upsert(data)
 
 def _delete_pub(uid: int):
     try:
         os.remove(_pub_path(uid))
     except Exception:
         pass
+    supplier_index.remove(uid)
 
 # ================= بناء وتجديد الدليل العام =================
 def _rebuild_public_directory():
-    items = []
-    for name in os.listdir(SUP_DIR):
-        up = os.path.join(SUP_DIR, name, "pub.json")
-        if not os.path.isfile(up):
-            continue
-        try:
-            with open(up, "r", encoding="utf-8") as f:
-                d = json.load(f)
-            if d.get("status") == "approved" and d.get("visible"):
-                items.append({
-                    "user_id": d.get("user_id"),
-                    "username": d.get("username"),
-                    "name": d.get("name"),
-                    "country": d.get("country"),
-                    "languages": d.get("languages", ""),
-                    "contact": d.get("contact"),
-                    "whatsapp": d.get("whatsapp", ""),
-                    "channel": d.get("channel"),
-                    "bio": d.get("bio"),
-                    "verified": True,
-                    "updated_at": d.get("updated_at"),
-                })
-        except Exception:
-            continue
-    with open(PUB_FILE, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
+    # الفهرس يُحدَّث عند كل _save_pub/_delete_pub؛ هنا نعيد كتابة الملف العام فقط
+    supplier_index.write_public_file()
 
 # ================= حالات التعديل =================
 class PubStates(StatesGroup):
@@ -386,14 +365,13 @@ async def spub_unpublish(cb: CallbackQuery):
 # ================= واجهة المستخدم العامة (قائمة + بروفايل) =================
 PUB_PER_PAGE = 6
 
-def _read_public_items():
-    try:
-        with open(PUB_FILE, "r", encoding="utf-8") as f:
-            items = json.load(f)
-    except Exception:
-        items = []
-    items.sort(key=lambda x: x.get("updated_at",""), reverse=True)
-    return items
+def _read_public_page(page: int) -> tuple[list[dict], int, int]:
+    """يرجع (عناصر الصفحة, الصفحة بعد الضبط, عدد الصفحات) من الفهرس مباشرة."""
+    total = supplier_index.count("published")
+    total_pages = max(1, math.ceil(total/PUB_PER_PAGE))
+    page = max(1, min(page, total_pages))
+    items, _ = supplier_index.page("published", page, PUB_PER_PAGE)
+    return items, page, total_pages
 
 def _shorten(s: str, n: int) -> str:
     s = (s or "").strip()
@@ -479,13 +457,10 @@ def _kb_profile(lang: str, it: dict, page: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 async def _render_public_list(target, lang: str, page: int):
-    items = _read_public_items()
-    total_pages = max(1, math.ceil(len(items)/PUB_PER_PAGE))
-    page = max(1, min(page, total_pages))
-    view = items[(page-1)*PUB_PER_PAGE : page*PUB_PER_PAGE]
+    view, page, total_pages = _read_public_page(page)
 
     header = f"📇 <b>{_L(lang,'td_title','Trusted suppliers','الموردون الموثوقون')}</b>\n"
-    if not items:
+    if not view:
         header += "\n" + _L(lang,"td_empty","No suppliers published yet.","لا يوجد موردون منشورون حالياً.")
         text = header
     else:
@@ -524,8 +499,7 @@ async def td_view_cb(cb: CallbackQuery):
     uid = int(parts[2])
     page = int(parts[3]) if len(parts) >= 4 and parts[3].isdigit() else 1
 
-    items = _read_public_items()
-    it = next((x for x in items if int(x.get("user_id", 0)) == uid), None)
+    it = supplier_index.get_public(uid)
     if not it:
         return await cb.answer(_L(lang, "td_not_found", "Supplier not found.", "المورد غير موجود."), show_alert=True)
 
@@ -541,39 +515,25 @@ async def td_view_cb(cb: CallbackQuery):
 # ================= إدارة الأدمن =================
 PER_PAGE = 5
 
-def _iter_cards():
-    for name in os.listdir(SUP_DIR):
-        up = os.path.join(SUP_DIR, name, "pub.json")
-        if os.path.isfile(up):
-            try:
-                with open(up, "r", encoding="utf-8") as f:
-                    d = json.load(f)
-                d.setdefault("languages","")
-                d.setdefault("whatsapp","")
-                yield d
-            except Exception:
-                continue
-
-def _by_status(status: str):
+def _count_by_status(status: str) -> int:
+    if status == "banned":
+        return len(_load_ban())
+    return supplier_index.count(status)
+
+def _page_by_status(status: str, page: int, per_page: int = PER_PAGE) -> tuple[list[dict], int]:
+    """صفحة واحدة من الفهرس (الأحدث أولًا) + الإجمالي — بدون مسح مجلد الموردين."""
     if status == "banned":
-        ids = _load_ban()
-        return [{"user_id": i, "status": "banned"} for i in sorted(ids)]
-    items = []
-    for d in _iter_cards():
-        if status == "published":
-            if d.get("status") == "approved" and d.get("visible"):
-                items.append(d)
-        elif d.get("status") == status:
-            items.append(d)
-    items.sort(key=lambda x: x.get("updated_at",""), reverse=True)
-    return items
+        ids = sorted(_load_ban())
+        chunk = ids[(page-1)*per_page: page*per_page]
+        return [{"user_id": i, "status": "banned"} for i in chunk], len(ids)
+    return supplier_index.page(status, page, per_page)
 
 def _kb_admin_list(lang: str, status: str, page: int, total_pages: int, items: list[dict]) -> InlineKeyboardMarkup:
     rows = [[
-        InlineKeyboardButton(text=t(lang,"sd_btn_published").format(n=len(_by_status("published"))), callback_data="sd:list:published:1"),
-        InlineKeyboardButton(text=t(lang,"sd_btn_pending").format(n=len(_by_status("pending"))), callback_data="sd:list:pending:1"),
-        InlineKeyboardButton(text=t(lang,"sd_btn_hidden").format(n=len(_by_status("hidden"))), callback_data="sd:list:hidden:1"),
-        InlineKeyboardButton(text=t(lang,"sd_btn_banned").format(n=len(_by_status("banned"))), callback_data="sd:list:banned:1"),
+        InlineKeyboardButton(text=t(lang,"sd_btn_published").format(n=_count_by_status("published")), callback_data="sd:list:published:1"),
+        InlineKeyboardButton(text=t(lang,"sd_btn_pending").format(n=_count_by_status("pending")), callback_data="sd:list:pending:1"),
+        InlineKeyboardButton(text=t(lang,"sd_btn_hidden").format(n=_count_by_status("hidden")), callback_data="sd:list:hidden:1"),
+        InlineKeyboardButton(text=t(lang,"sd_btn_banned").format(n=_count_by_status("banned")), callback_data="sd:list:banned:1"),
     ]]
     for it in items:
         uid = it.get("user_id")
@@ -589,13 +549,12 @@ def _kb_admin_list(lang: str, status: str, page: int, total_pages: int, items: l
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 async def _render_admin_list(target, lang: str, status: str, page: int):
-    all_items = _by_status(status)
-    total_pages = max(1, math.ceil(len(all_items)/PER_PAGE))
+    total_pages = max(1, math.ceil(_count_by_status(status)/PER_PAGE))
     page = max(1, min(page, total_pages))
-    page_items = all_items[(page-1)*PER_PAGE: (page)*PER_PAGE]
+    page_items, total = _page_by_status(status, page)
 
     header = f"📇 <b>{t(lang,'sd_title')}</b>\n{t(lang,'sd_current_status')}: <b>{html.escape(status)}</b>"
-    if not all_items:
+    if not total:
         header += f"\n\n{t(lang,'sd_no_results')}"
     kb = _kb_admin_list(lang, status, page, total_pages, page_items)
 
@@ -1,7 +1,7 @@
 # handlers/vip_features.py
 from __future__ import annotations
 
-import os, asyncio, time, json, datetime as dt, re, logging, random, contextlib
+import os, time, json, datetime as dt, re, logging, random
 from typing import Optional, Tuple, List, Dict
 
 from aiogram import Router, F
@@ -13,6 +13,7 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 
 from lang import t, get_user_lang
+from utils import vip_status_ticker, admin_notify
 
 logger = logging.getLogger(__name__)
 router = Router(name="vip_features")
@@ -66,10 +67,6 @@ def _valid_app_id(s: str) -> bool:
         return bool(_SNAKE_RX.fullmatch(s))
     return bool(_SNAKE_RX.fullmatch(s) or _GENERIC_RX.fullmatch(s))
 
-# ====================== إعدادات العدّاد ======================
-VIP_STATUS_REFRESH_SEC = max(1, int(os.getenv("VIP_STATUS_REFRESH_SEC") or os.getenv("VIP_CRON_INTERVAL_SEC", "5")))
-VIP_STATUS_MAX_MIN = max(1, int(os.getenv("VIP_STATUS_MAX_MIN", "120")))
-
 # ====================== ملفات التخزين الخفيفة ======================
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -207,17 +204,11 @@ def _admin_ids() -> list[int]:
             ids.append(int(p))
     return ids or [7360982123]
 
-async def _notify_admins(bot, text: str, *, reply_kb=None, photo_id: str | None = None, doc_id: str | None = None):
-    for uid in _admin_ids():
-        try:
-            if photo_id:
-                await bot.send_photo(uid, photo_id, caption=text, reply_markup=reply_kb, parse_mode=ParseMode.HTML)
-            elif doc_id:
-                await bot.send_document(uid, doc_id, caption=text, reply_markup=reply_kb, parse_mode=ParseMode.HTML)
-            else:
-                await bot.send_message(uid, text, reply_markup=reply_kb, parse_mode=ParseMode.HTML)
-        except Exception:
-            pass
+async def _notify_admins(bot, text: str, *, reply_kb=None, photo_id: str | None = None, doc_id: str | None = None,
+                         kind: str = "vip_features", summary: str | None = None, link: str | None = None):
+    # عبر ناقل الإشعارات: غير حاجب + تجميع الدفعات لنفس النوع
+    admin_notify.notify(bot, text, kind=kind, admins=_admin_ids(), reply_markup=reply_kb,
+                        photo=photo_id, document=doc_id, summary=summary, link=link)
 
 def _now_iso() -> str:
     return dt.datetime.utcnow().isoformat() + "Z"
@@ -226,16 +217,15 @@ def _now_str() -> str:
     return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
 
 # ====================== تتبّع شاشة الحالة الحية ======================
-_LIVE_TASKS: Dict[int, asyncio.Task] = {}      # user_id -> task
+# التحديث الحي عبر utils.vip_status_ticker (مُجدول واحد مشترك بدل مهمة لكل مستخدم)
 _LIVE_MSG_IDS: Dict[int, int] = {}             # user_id -> message_id
 
+def _live_key(uid: int) -> str:
+    return f"features:{uid}"
+
 async def _stop_live_status(uid: int, *, bot=None, chat_id: int | None = None, delete_msg: bool = False):
-    """يلغي حلقة حالة VIP لهذه المستخدم ويحذف رسالتها إن لزم."""
-    task = _LIVE_TASKS.pop(uid, None)
-    if task and not task.done():
-        task.cancel()
-        with contextlib.suppress(Exception):
-            await asyncio.sleep(0)  # تسليم ليلتقط CancelledError
+    """يوقف تحديث حالة VIP لهذا المستخدم ويحذف رسالتها إن لزم."""
+    vip_status_ticker.unregister(_live_key(uid))
     mid = _LIVE_MSG_IDS.pop(uid, None)
     if delete_msg and bot and chat_id and mid:
         try:
@@ -367,8 +357,21 @@ async def _safe_edit_text(msg, text, **kwargs):
             return msg
         raise
 
+def _live_render(lang: str):
+    """دالة العرض للمُجدول المشترك: تُحسب من لقطة VIP واحدة لكل دورة."""
+    def render(meta: Optional[dict], now: int):
+        if meta is None:
+            return ("👑 " + _t_safe(lang, "vip.tools.status_msg", "حالة اشتراكك:", "Your VIP status:") +
+                    "\n" + _t_safe(lang, "vip.status.not_vip", "لست VIP", "Not VIP"),
+                    _kb_back_to_vip(lang), True)
+        expiry_ts = meta.get("expiry_ts")
+        if not isinstance(expiry_ts, int):
+            return _status_text(lang, None), _kb_back_to_vip(lang), True
+        return _status_text(lang, expiry_ts), _kb_back_to_vip(lang), expiry_ts - now <= 0
+    return render
+
 async def _run_live_status(cb: CallbackQuery):
-    """يشغل شاشة الحالة الحية مع تتبّع وإلغاء صحيحين."""
+    """يشغّل شاشة الحالة الحية ويسجّلها في المُجدول المشترك (لا يحجز المعالج)."""
     uid = cb.from_user.id
     lang = _lang(uid)
 
@@ -381,70 +384,16 @@ async def _run_live_status(cb: CallbackQuery):
                                   parse_mode=ParseMode.HTML,
                                   reply_markup=_kb_back_to_vip(lang))
 
-    # سجّل المعرّف والمهمة
-    _LIVE_MSG_IDS[uid] = msg.message_id
-    # سنجعل هذه الدالة نفسها هي الحلقة؛ نسجّل المهمة الحالية ليمكن إلغاؤها من أزرار الرجوع
-    _LIVE_TASKS[uid] = asyncio.current_task()  # type: ignore
+    mid = msg.message_id
+    _LIVE_MSG_IDS[uid] = mid
 
-    max_loops = (VIP_STATUS_MAX_MIN * 60) // VIP_STATUS_REFRESH_SEC
-    loops = 0
-    try:
-        while True:
-            await asyncio.sleep(VIP_STATUS_REFRESH_SEC); loops += 1
-            # توقّف إذا أُلغيت المهمة أو تغيّر الرسالة
-            if uid not in _LIVE_TASKS or _LIVE_MSG_IDS.get(uid) != msg.message_id:
-                break
-            if loops >= max_loops:
-                break
-
-            if not is_vip(uid):
-                try:
-                    await _safe_edit_text(msg,
-                        "👑 " + _t_safe(lang, "vip.tools.status_msg", "حالة اشتراكك:", "Your VIP status:") +
-                        "\n" + _t_safe(lang, "vip.status.not_vip", "لست VIP", "Not VIP"),
-                        parse_mode=ParseMode.HTML,
-                        reply_markup=_kb_back_to_vip(lang))
-                except Exception:
-                    pass
-                break
-
-            meta = get_vip_meta(uid) or {}
-            expiry_ts = meta.get("expiry_ts")
-            now = int(time.time())
-
-            if not isinstance(expiry_ts, int):
-                try:
-                    await _safe_edit_text(msg, _status_text(lang, None),
-                        parse_mode=ParseMode.HTML,
-                        reply_markup=_kb_back_to_vip(lang))
-                except Exception:
-                    pass
-                break
-
-            left = expiry_ts - now
-            if left <= 0:
-                try:
-                    await _safe_edit_text(msg, _status_text(lang, expiry_ts),
-                        parse_mode=ParseMode.HTML,
-                        reply_markup=_kb_back_to_vip(lang))
-                except Exception:
-                    pass
-                break
-
-            try:
-                await _safe_edit_text(msg, _status_text(lang, expiry_ts),
-                    parse_mode=ParseMode.HTML,
-                    reply_markup=_kb_back_to_vip(lang))
-            except Exception:
-                break
-    except asyncio.CancelledError:
-        # أُلغيت من زر الرجوع
-        pass
-    finally:
-        # نظّف فقط إذا ما زالت هذه الجلسة هي المسجّلة
-        if _LIVE_MSG_IDS.get(uid) == msg.message_id:
+    def _forget() -> None:
+        # المُجدول أسقط الشاشة (انتهاء/فشل): لا نُبقي معرّفها
+        if _LIVE_MSG_IDS.get(uid) == mid:
             _LIVE_MSG_IDS.pop(uid, None)
-        _LIVE_TASKS.pop(uid, None)
+
+    vip_status_ticker.register(_live_key(uid), cb.bot, uid, msg.chat.id, mid,
+                               _live_render(lang), on_drop=_forget)
 
 # ====================== بروفايل VIP (نص + أزرار) ======================
 def _vip_profile_text(lang: str, uid: int) -> str:
@@ -1009,7 +958,8 @@ async def mi_finish(msg: Message, state: FSMContext):
         f"• Reason: {item['note'] or '-'}\n"
         f"• When: <code>{_now_str()}</code>"
     )
-    await _notify_admins(msg.bot, admin, reply_kb=_admin_req_kb("manage_id", ticket, msg.from_user.id), photo_id=item["proof_photo"], doc_id=item["proof_doc"])
+    await _notify_admins(msg.bot, admin, reply_kb=_admin_req_kb("manage_id", ticket, msg.from_user.id), photo_id=item["proof_photo"], doc_id=item["proof_doc"],
+                         kind="vip_manage_id", summary=f"{msg.from_user.id} · {ticket}", link=f"tg://user?id={msg.from_user.id}")
 
 # ---- نقل الاشتراك ----
 class TransferFSM(StatesGroup):
@@ -1110,7 +1060,8 @@ async def transfer_finish(msg: Message, state: FSMContext):
         f"• Note: {item['note'] or '-'}\n"
         f"• When: <code>{_now_str()}</code>"
     )
-    await _notify_admins(msg.bot, admin_text, reply_kb=_admin_req_kb("transfer", ticket, msg.from_user.id), photo_id=item["proof_photo"], doc_id=item["proof_doc"])
+    await _notify_admins(msg.bot, admin_text, reply_kb=_admin_req_kb("transfer", ticket, msg.from_user.id), photo_id=item["proof_photo"], doc_id=item["proof_doc"],
+                         kind="vip_transfer", summary=f"{msg.from_user.id} · {ticket}", link=f"tg://user?id={msg.from_user.id}")
 
 # ---- تجديد / ترقية → المورّدون الموثوقون ----
 @router.callback_query(F.data == "viptool:renew")
@@ -1304,7 +1255,8 @@ async def report_seller_finish(msg: Message, state: FSMContext):
         f"• {_t_safe(lang, 'report.admin.lang', 'اللغة', 'Language')}: {you['lang'] or '-'}\n"
         f"• {_t_safe(lang, 'report.admin.when', 'الوقت', 'When')}: <code>{now_iso}</code>"
     )
-    await _notify_admins(msg.bot, admin_text)
+    await _notify_admins(msg.bot, admin_text, kind="vip_report",
+                         summary=f"{you['id']} → {seller}", link=you['link'])
 
 
 @router.callback_query(F.data.startswith("rs:reply:"))
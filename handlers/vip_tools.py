@@ -1,7 +1,7 @@
 # handlers/vip_tools.py
 from __future__ import annotations
 
-import os, time, asyncio, logging, secrets
+import time, logging
 from contextlib import suppress
 from typing import Dict, Optional
 
@@ -12,6 +12,7 @@ from aiogram.enums import ParseMode
 from aiogram.exceptions import TelegramBadRequest
 
 from lang import t, get_user_lang
+from utils import vip_status_ticker
 
 try:
     from utils.vip_store import is_vip, get_vip_meta, _now_ts, get_pending
@@ -24,9 +25,7 @@ except Exception:
 router = Router(name="vip_tools")
 logger = logging.getLogger(__name__)
 
-REFRESH_SEC  = max(1, int(os.getenv("VIP_STATUS_REFRESH_SEC", "5")))
-MAX_MINUTES  = max(1, int(os.getenv("VIP_STATUS_MAX_MIN", "120")))
-MAX_SECONDS  = MAX_MINUTES * 60
+REFRESH_SEC  = vip_status_ticker.TICK_SEC   # VIP_STATUS_REFRESH_SEC / VIP_STATUS_MAX_MIN في المُجدول
 
 # حاول استخدام لوحة VIP الرئيسية من handlers.vip
 try:
@@ -55,22 +54,14 @@ def _fmt_ts(ts: Optional[int], *, date_only: bool = True) -> str:
     except Exception: return "-"
 
 # ====== إدارة شاشة الحالة ======
-_running_tasks: Dict[int, asyncio.Task] = {}   # user_id -> task
-_status_token: Dict[int, str] = {}             # user_id -> token
+# التحديث الحي يتم عبر utils.vip_status_ticker (مُجدول واحد مشترك لكل المستخدمين)
 _status_msg_id: Dict[int, int] = {}            # user_id -> message_id (رسالة شاشة الحالة)
 
-def _new_token(uid: int) -> str:
-    tok = secrets.token_hex(8)
-    _status_token[uid] = tok
-    return tok
-
-def _invalidate_token(uid: int) -> None:
-    _status_token.pop(uid, None)
+def _view_key(uid: int) -> str:
+    return f"tools:{uid}"
 
 def _stop_status_loop(user_id: int):
-    task = _running_tasks.pop(user_id, None)
-    if task and not task.done():
-        task.cancel()
+    vip_status_ticker.unregister(_view_key(user_id))
 
 async def _delete_status_message(cb: CallbackQuery):
     """يحذف رسالة شاشة الحالة إن وُجدت."""
@@ -100,7 +91,6 @@ def _kb_status_view(lang: str):
 # ---------- فتح قائمة أدوات VIP ----------
 async def _open_tools_after_cleanup(cb: CallbackQuery):
     uid = cb.from_user.id
-    _invalidate_token(uid)
     _stop_status_loop(uid)
     await _delete_status_message(cb)
 
@@ -127,7 +117,6 @@ async def open_vip_tools_alias(cb: CallbackQuery):
 # ---------- عناصر بسيطة ----------
 async def _cleanup_then_send(cb: CallbackQuery, text_key: str):
     uid = cb.from_user.id
-    _invalidate_token(uid)
     _stop_status_loop(uid)
     await _delete_status_message(cb)
 
@@ -183,45 +172,18 @@ async def _safe_edit(msg: Message, text: str, *, reply_markup=None) -> Optional[
     except Exception:
         return None
 
-async def _loop_status(msg: Message, user_id: int, token: str):
-    lang = get_user_lang(user_id) or "en"
-    started = _now_ts()
-    try:
-        while True:
-            if _status_token.get(user_id) != token:
-                break
-
-            meta = get_vip_meta(user_id) or {}
-            exp  = meta.get("expiry_ts")
-
-            if not isinstance(exp, int):
-                await _safe_edit(msg, _status_text(lang, None, 0), reply_markup=_kb_status_view(lang))
-                break
-
-            left = exp - _now_ts()
-            if left <= 0:
-                await _safe_edit(
-                    msg,
-                    "❗ " + t(lang, "vip.status.expired_now") + "\n" + t(lang, "vip.status.contact_support"),
-                    reply_markup=_kb_status_view(lang),
-                )
-                break
-
-            new_msg = await _safe_edit(msg, _status_text(lang, exp, left), reply_markup=_kb_status_view(lang))
-            if new_msg is None:
-                break
-            msg = new_msg
-
-            if _now_ts() - started >= MAX_SECONDS:
-                break
-            await asyncio.sleep(REFRESH_SEC)
-    except asyncio.CancelledError:
-        pass
-    finally:
-        _running_tasks.pop(user_id, None)
-        if _status_token.get(user_id) == token:
-            _invalidate_token(user_id)
-        _status_msg_id.pop(user_id, None)
+def _status_render(lang: str):
+    """دالة العرض للمُجدول المشترك: تُحسب من لقطة VIP واحدة لكل دورة."""
+    def render(meta: Optional[dict], now: int):
+        exp = (meta or {}).get("expiry_ts") if meta is not None else 0
+        if meta is not None and not isinstance(exp, int):
+            return _status_text(lang, None, 0), _kb_status_view(lang), True
+        left = (exp or 0) - now
+        if left <= 0:
+            return ("❗ " + t(lang, "vip.status.expired_now") + "\n" + t(lang, "vip.status.contact_support"),
+                    _kb_status_view(lang), True)
+        return _status_text(lang, exp, left), _kb_status_view(lang), False
+    return render
 
 # ---------- عرض حالة الاشتراك ----------
 @router.callback_query(F.data == "viptool:status")
@@ -235,13 +197,10 @@ async def vip_status_live(cb: CallbackQuery):
     exp  = meta.get("expiry_ts")
     text = _status_text(lang, exp if isinstance(exp, int) else None, max(0, (exp or 0) - _now_ts()))
 
-    # أبطِل القديمة وأوقفها واحذف رسالتها
-    _invalidate_token(uid)
+    # أوقف القديمة واحذف رسالتها
     _stop_status_loop(uid)
     await _delete_status_message(cb)
 
-    token = _new_token(uid)
-
     # عدّل نفس الرسالة إن أمكن؛ إن فشل، أرسل رسالة جديدة
     edited = await _safe_edit(cb.message, text, reply_markup=_kb_status_view(lang))
     if edited is None:
@@ -253,7 +212,15 @@ async def vip_status_live(cb: CallbackQuery):
     if not isinstance(exp, int) or exp - _now_ts() <= 0:
         return await cb.answer()
 
-    _running_tasks[uid] = asyncio.create_task(_loop_status(edited, uid, token))
+    mid = edited.message_id
+
+    def _forget() -> None:
+        # المُجدول أسقط الشاشة (انتهاء/فشل): لا نحذف هذا المعرّف لاحقًا (قد يصير رسالة القائمة)
+        if _status_msg_id.get(uid) == mid:
+            _status_msg_id.pop(uid, None)
+
+    vip_status_ticker.register(_view_key(uid), cb.bot, uid, edited.chat.id, mid,
+                               _status_render(lang), on_drop=_forget)
     await cb.answer()
 
 # ---------- رجوع للقائمة الرئيسية ----------
@@ -262,7 +229,6 @@ async def vip_tool_back(cb: CallbackQuery):
     uid  = cb.from_user.id
     lang = get_user_lang(uid) or "en"
 
-    _invalidate_token(uid)
     _stop_status_loop(uid)
     await _delete_status_message(cb)
 
@@ -1,6 +1,9 @@
 # lang.py
 from __future__ import annotations
-import json, os, threading
+import json, os, string, threading
+from collections import Counter
+from types import MappingProxyType
+from typing import Mapping
 
 # ===== إعدادات عامة =====
 # اللغات المسموح بها فقط
@@ -19,6 +22,23 @@ _LOCK = threading.RLock()
 _translations: dict[str, dict] = {}
 _known_langs: set[str] = set()  # اللغات المحمّلة فعليًا (محصورة EN/AR فقط)
 
+# كتالوجات مُجمّعة: لغة → خريطة ثابتة (نصوص فقط) مدموج فيها فولباك الإنجليزية.
+# تُبنى في reload_locales() وتُستبدل دفعة واحدة (إسناد ذرّي)، فالقراءة بلا قفل.
+_CATALOGS: dict[str | None, Mapping[str, str]] = {}
+_ALIASES: dict[str, str] = {}   # ذاكرة تطبيع أكواد مثل 'en-US' → 'en'
+_ALIASES_MAX = 256
+_CATALOG_VERSION = 0            # يزيد مع كل reload_locales (ختم لذاكرات مثل لوحات الأزرار)
+
+# قوالب format مُحلّلة مسبقًا (نص القالب → شكل مُجمّع) + إحصاء محدود للمفقود/أخطاء التنسيق
+_FORMATTER = string.Formatter()
+_TEMPLATES: dict[str, tuple] = {}
+_TEMPLATES_MAX = 8192
+_MISSES: Counter = Counter()       # "lang:key" → مرات الطلب بلا ترجمة
+_FMT_ERRORS: Counter = Counter()   # key → مرات فشل التنسيق
+_TALLY_MAX = 1000
+_UNTRANSLATED: dict[str, int] = {} # لغة → عدد مفاتيح الإنجليزية غير المترجمة (من التجميع)
+_CONV = {"r": repr, "s": str, "a": ascii}
+
 
 def _atomic_write(path: str, data) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -76,27 +96,73 @@ def load_translations() -> dict[str, dict]:
     return translations
 
 
+def _compile(translations: dict[str, dict]) -> dict[str | None, Mapping[str, str]]:
+    """لكل لغة مسموحة: نصوص الإنجليزية ثم نصوص اللغة فوقها (القيم غير النصية تُهمل)."""
+    en = {k: v for k, v in (translations.get("en") or {}).items() if isinstance(v, str)}
+    catalogs: dict[str | None, Mapping[str, str]] = {}
+    for code in ALLOWED_LANGS:
+        merged = dict(en)
+        if code != "en":
+            merged.update((k, v) for k, v in (translations.get(code) or {}).items() if isinstance(v, str))
+        catalogs[code] = MappingProxyType(merged)
+    catalogs[None] = catalogs[""] = catalogs[_DEFAULT_LANG]
+    for code in ALLOWED_LANGS - {"en"}:
+        own = translations.get(code) or {}
+        _UNTRANSLATED[code] = sum(1 for k in en if not isinstance(own.get(k), str))
+    return catalogs
+
+
 def reload_locales() -> None:
-    """إعادة تحميل ملفات الترجمة من القرص (EN/AR فقط)."""
-    global _translations, _known_langs
+    """إعادة تحميل ملفات الترجمة من القرص (EN/AR فقط) وتجميع الكتالوجات."""
+    global _translations, _known_langs, _CATALOGS, _CATALOG_VERSION
     with _LOCK:
-        _translations = load_translations()
-        _known_langs = set(_translations.keys()).intersection(ALLOWED_LANGS)
-        if "en" not in _known_langs:
+        translations = load_translations()
+        known = set(translations.keys()).intersection(ALLOWED_LANGS)
+        if "en" not in known:
             # ضمّن الإنجليزية كطبقة فولباك فارغة على الأقل
-            _translations["en"] = _translations.get("en", {})
-            _known_langs.add("en")
+            translations["en"] = translations.get("en", {})
+            known.add("en")
+        catalogs = _compile(translations)
+        _translations, _known_langs, _CATALOGS = translations, known, catalogs
+        _CATALOG_VERSION += 1
+        _TEMPLATES.clear()
+        _MISSES.clear()   # بعد إصلاح الملفات نبدأ العدّ من جديد
 
 
 # تحميل أولي
 reload_locales()
 
 
+def catalog_version() -> int:
+    """ختم نسخة الكتالوجات الحالية (يتغيّر عند إعادة التحميل)."""
+    return _CATALOG_VERSION
+
+
 def available_languages() -> list[str]:
     """اللغات المتاحة فعليًا (محصورة في ALLOWED_LANGS)."""
-    with _LOCK:
-        langs = _known_langs or {_DEFAULT_LANG, "en"}
-        return sorted(langs)
+    langs = _known_langs or {_DEFAULT_LANG, "en"}
+    return sorted(langs)
+
+
+def _catalog(lang_code) -> Mapping[str, str]:
+    try:
+        cat = _CATALOGS.get(lang_code)
+    except TypeError:   # كود غير قابل للتجزئة
+        cat = None
+    if cat is not None:
+        return cat
+    code = str(lang_code)
+    norm = _ALIASES.get(code)
+    if norm is None:
+        norm = _normalize_lang(code)
+        if len(_ALIASES) < _ALIASES_MAX:
+            _ALIASES[code] = norm
+    return _CATALOGS[norm]
+
+
+def lookup(lang_code: str | None, key: str, default=None):
+    """قراءة مباشرة من الكتالوج المُجمّع (لغة → إنجليزية)، وإلا default."""
+    return _catalog(lang_code).get(key, default)
 
 
 def t(lang_code: str, key: str) -> str:
@@ -105,26 +171,154 @@ def t(lang_code: str, key: str) -> str:
     """
     if not key:
         return ""
-    lang_code = _normalize_lang(lang_code)
-    with _LOCK:
-        # محاولة لغة المستخدم
-        user_map = _translations.get(lang_code) or {}
-        if key in user_map and isinstance(user_map[key], str):
-            return user_map[key]
-        # فولباك الإنجليزية
-        en_map = _translations.get("en") or {}
-        if key in en_map and isinstance(en_map[key], str):
-            return en_map[key]
-        # في النهاية المفتاح نفسه
+    val = _catalog(lang_code).get(key)
+    if val is None:
+        _note_miss(lang_code, key)
         return key
+    return val
 
 
-def tf(lang_code: str, key: str, **kwargs) -> str:
-    """t() + format(**kwargs) مع fallback آمن."""
+def t_compat(*args, **kwargs) -> str:
+    """
+    الصيغة الموحّدة التي يثبّتها bot.py مكان t:
+      - t(lang, key)            → النص أو "" إن لم يوجد
+      - t(lang, key, fallback)  → النص أو fallback (أو المفتاح)
+    النصوص الفارغة/المسافات تُعامل كغير موجودة، ولا ترفع استثناءً.
+    """
+    if len(args) >= 3:
+        lang_code, key, fallback = args[0], args[1], args[2]
+        try:
+            val = _catalog(lang_code).get(key) if key else None
+        except Exception:
+            val = None
+        if val and val != key and not val.isspace():
+            return val
+        if key:
+            _note_miss(lang_code, key)
+        return fallback or key or ""
+
+    lang_code = args[0] if args else kwargs.get("lang_code")
+    key = args[1] if len(args) >= 2 else kwargs.get("key")
+    if not key:
+        return ""
+    try:
+        val = _catalog(lang_code).get(key)
+    except Exception:
+        return ""
+    if val and val != key and not val.isspace():
+        return val
+    _note_miss(lang_code, key)
+    return ""
+
+
+# ===== قوالب مُجمّعة =====
+
+def _tally(counter: Counter, k: str) -> None:
+    counter[k] += 1
+    if len(counter) > _TALLY_MAX:
+        keep = counter.most_common(_TALLY_MAX // 2)
+        counter.clear()
+        counter.update(dict(keep))
+
+
+def _note_miss(lang_code, key) -> None:
+    try:
+        code = lang_code if lang_code in ALLOWED_LANGS else _normalize_lang(lang_code)
+        _tally(_MISSES, f"{code}:{key}")
+    except Exception:
+        pass
+
+
+def _compile_template(tpl: str) -> tuple:
+    """
+    ("c", text)          بلا حقول → نص ثابت
+    ("s", names, segs)   حقول بأسماء بسيطة → تجميع مباشر للمقاطع
+    ("x",)               حقول مركّبة/موضعية → str.format_map
+    ("e",)               قالب غير صالح
+    """
+    try:
+        parsed = list(_FORMATTER.parse(tpl))
+    except ValueError:
+        return ("e",)
+    if all(f is None for _, f, _, _ in parsed):
+        return ("c", "".join(lit for lit, _, _, _ in parsed))
+    names: set[str] = set()
+    segs = []
+    for lit, f, spec, conv in parsed:
+        if f is None:
+            segs.append((lit, None, "", None))
+            continue
+        if not f.isidentifier() or "{" in (spec or ""):
+            return ("x",)
+        names.add(f)
+        segs.append((lit, f, spec or "", _CONV.get(conv) if conv else None))
+    return ("s", frozenset(names), tuple(segs))
+
+
+def format_template(tpl: str, kwargs: dict, key: str = "") -> str:
+    """
+    تنسيق قالب بصيغة str.format مع تحليل واحد لكل قالب.
+    عند نقص وسيط أو خطأ تنسيق: يُحتسب في الإحصاء ويُرجع القالب كما هو.
+    """
+    comp = _TEMPLATES.get(tpl)
+    if comp is None:
+        comp = _compile_template(tpl)
+        if len(_TEMPLATES) >= _TEMPLATES_MAX:
+            _TEMPLATES.clear()
+        _TEMPLATES[tpl] = comp
+    kind = comp[0]
+    if kind == "c":
+        return comp[1]
     try:
-        return t(lang_code, key).format(**kwargs)
+        if kind == "s" and comp[1] <= kwargs.keys():
+            out = []
+            for lit, f, spec, conv in comp[2]:
+                if lit:
+                    out.append(lit)
+                if f is not None:
+                    v = kwargs[f]
+                    if conv is not None:
+                        v = conv(v)
+                    out.append(format(v, spec))
+            return "".join(out)
+        if kind == "x":
+            return tpl.format_map(kwargs)
     except Exception:
-        return t(lang_code, key)
+        pass
+    _tally(_FMT_ERRORS, key or tpl[:60])
+    return tpl
+
+
+def tf(lang_code: str, key: str, **kwargs) -> str:
+    """t() + format(**kwargs) بقالب مُجمّع، ويرجع النص بلا تنسيق عند الخطأ."""
+    tpl = t(lang_code, key)
+    return format_template(tpl, kwargs, key) if tpl else tpl
+
+
+def i18n_stats() -> dict:
+    return {
+        "missing_keys": len(_MISSES),
+        "missing_hits": sum(_MISSES.values()),
+        "format_errors": sum(_FMT_ERRORS.values()),
+        "templates": len(_TEMPLATES),
+        "untranslated": dict(_UNTRANSLATED),
+    }
+
+
+def i18n_report(top: int = 20) -> str:
+    """أكثر المفاتيح المفقودة طلبًا + أخطاء التنسيق + عدد غير المترجم لكل لغة (نص عادي)."""
+    st = i18n_stats()
+    lines = [f"missing: {st['missing_keys']} keys / {st['missing_hits']} hits, "
+             f"format errors: {st['format_errors']}, templates: {st['templates']}"]
+    for code, n in sorted(_UNTRANSLATED.items()):
+        lines.append(f"untranslated ({code}): {n}")
+    if _MISSES:
+        lines.append("top missing:")
+        lines += [f"  {n:>6}  {k}" for k, n in _MISSES.most_common(top)]
+    if _FMT_ERRORS:
+        lines.append("format errors:")
+        lines += [f"  {n:>6}  {k}" for k, n in _FMT_ERRORS.most_common(top)]
+    return "\n".join(lines)
 
 
 def set_user_lang(user_id: int, lang_code: str):
@@ -132,6 +326,7 @@ def set_user_lang(user_id: int, lang_code: str):
     حفظ لغة المستخدم بشكل ذرّي. تُجبر القيم إلى EN/AR فقط،
     وإن كانت اللغة غير محمّلة فعليًا → نستخدم الافتراضي.
     """
+    global _USER_LANGS
     lang_code = _normalize_lang(lang_code)
     with _LOCK:
         try:
@@ -147,6 +342,10 @@ def set_user_lang(user_id: int, lang_code: str):
             lang_code = _DEFAULT_LANG
         data[str(user_id)] = lang_code
         _atomic_write(USER_LANG_FILE, data)
+        try:
+            _USER_LANGS = (_file_stamp(USER_LANG_FILE), data)
+        except OSError:
+            pass
 
 
 def get_user_lang(user_id: int) -> str:
@@ -154,19 +353,39 @@ def get_user_lang(user_id: int) -> str:
     جلب لغة المستخدم. يرجع الافتراضي لو غير معرّف أو غير محمّل.
     لا يقوم بأي تغيير تلقائي على ملف المستخدمين.
     """
+    lang_code = _user_langs().get(str(user_id))
+    if isinstance(lang_code, str):
+        lc = _normalize_lang(lang_code)
+        return lc if lc in _known_langs else _DEFAULT_LANG
+    return _DEFAULT_LANG
+
+
+_USER_LANGS: tuple = (None, {})   # (mtime_ns, size, inode) → محتوى user_langs.json
+
+
+def _file_stamp(path: str) -> tuple:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _user_langs() -> dict:
+    """محتوى USER_LANG_FILE من الذاكرة، يُعاد تحميله فقط عند تغيّر الملف."""
+    global _USER_LANGS
+    try:
+        stamp = _file_stamp(USER_LANG_FILE)
+    except OSError:
+        return {}
+    if stamp == _USER_LANGS[0]:
+        return _USER_LANGS[1]
     try:
         with open(USER_LANG_FILE, "r", encoding="utf-8") as f:
             data = json.load(f)
-            if isinstance(data, dict):
-                lang_code = data.get(str(user_id))
-                if isinstance(lang_code, str):
-                    lc = _normalize_lang(lang_code)
-                    return lc if lc in _known_langs else _DEFAULT_LANG
-    except FileNotFoundError:
-        pass
+        if not isinstance(data, dict):
+            data = {}
     except Exception:
-        pass
-    return _DEFAULT_LANG
+        return _USER_LANGS[1]
+    _USER_LANGS = (stamp, data)
+    return data
 
 
 # ===== دوال اختيارية (مفيدة) — لا تكسر التوافق =====
@@ -0,0 +1,125 @@
+# middlewares/callback_ack.py
+from __future__ import annotations
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Set
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.methods import AnswerCallbackQuery
+from aiogram.types import Update
+
+# ردّ مبكر على أزرار callback:
+# - إن لم يستدعِ المعالج cb.answer() خلال CB_ACK_DEADLINE_MS نرد نحن بصمت
+#   (يختفي مؤشر التحميل عند المستخدم)، وكذلك بعد انتهاء المعالج إن لم يرد أبدًا.
+# - المعالج الذي يرد في الوقت يحتفظ بتنبيهه/رسالته (show_alert/text).
+# - رد المعالج بعد الرد التلقائي يُبتلع محليًا (بدل خطأ "query is too old").
+# - زمن أول رد لكل بادئة callback (قبل أول ":") عبر callback_ack_stats().
+# يتكوّن من جزأين يتشاركان الحالة: middleware على update + request middleware على الجلسة.
+
+log = logging.getLogger(__name__)
+
+ACK_ENABLED  = os.getenv("CB_ACK_ENABLED", "1").strip() not in ("0", "false", "False", "")
+DEADLINE_SEC = max(0.05, float(os.getenv("CB_ACK_DEADLINE_MS", "300")) / 1000.0)
+_SAMPLES     = 256
+
+# callback_id -> [t0, prefix, answered_by: None|"handler"|"auto"]
+_pending: Dict[str, list] = {}
+_stats: Dict[str, Dict[str, Any]] = {}
+_auto_inflight: Set[str] = set()   # ردود تلقائية جارية (تمييزها عن رد المعالج)
+
+
+def _prefix(data: str | None) -> str:
+    return (data or "").split(":", 1)[0][:32] or "-"
+
+def _record(prefix: str, dt: float, by: str) -> None:
+    st = _stats.get(prefix)
+    if st is None:
+        st = _stats[prefix] = {"count": 0, "auto": 0, "late": 0, "max": 0.0,
+                               "samples": deque(maxlen=_SAMPLES)}
+    st["count"] += 1
+    if by == "auto":
+        st["auto"] += 1
+    if dt > st["max"]:
+        st["max"] = dt
+    st["samples"].append(dt)
+
+def callback_ack_stats() -> Dict[str, Dict[str, float]]:
+    """لكل بادئة: العدد، عدد الردود التلقائية، وزمن أول رد p50/p95/max (ms)."""
+    out: Dict[str, Dict[str, float]] = {}
+    for prefix, st in _stats.items():
+        s: Deque[float] = st["samples"]
+        vals = sorted(s)
+        pick = (lambda p: vals[min(len(vals) - 1, int(len(vals) * p))] * 1000) if vals else (lambda p: 0.0)
+        out[prefix] = {"count": st["count"], "auto": st["auto"], "late": st["late"],
+                       "p50_ms": round(pick(.50), 1), "p95_ms": round(pick(.95), 1),
+                       "max_ms": round(st["max"] * 1000, 1)}
+    return out
+
+
+class CallbackAckRequestMiddleware(BaseRequestMiddleware):
+    """على جلسة البوت: يسجّل أول رد، ويبتلع ردود المعالج بعد الرد التلقائي."""
+
+    async def __call__(self, make_request, bot, method):
+        if not isinstance(method, AnswerCallbackQuery):
+            return await make_request(bot, method)
+        rec = _pending.get(method.callback_query_id)
+        if rec is None:
+            return await make_request(bot, method)
+        if rec[2] is not None:
+            # سبق الرد (تلقائيًا): لا نرسل ردًا ثانيًا سيرفضه Telegram
+            if rec[2] == "auto" and rec[1] in _stats:
+                _stats[rec[1]]["late"] += 1
+            return True   # سلسلة الجلسة ترجع response.result (bool لـ answerCallbackQuery)
+        by = "auto" if method.callback_query_id in _auto_inflight else "handler"
+        rec[2] = by
+        _record(rec[1], time.monotonic() - rec[0], by)
+        return await make_request(bot, method)
+
+
+class CallbackAckMiddleware(BaseMiddleware):
+    """
+    outer middleware على update (سجّلها أولًا ليُحسب زمن الانتظار في المسارات):
+        dp.update.outer_middleware(CallbackAckMiddleware())
+    ومعها على الجلسة:
+        session.middleware(CallbackAckRequestMiddleware())
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        cb = event.callback_query
+        if not ACK_ENABLED or cb is None:
+            return await handler(event, data)
+
+        rec = [time.monotonic(), _prefix(cb.data), None]
+        _pending[cb.id] = rec
+        timer = asyncio.get_running_loop().call_later(
+            DEADLINE_SEC, lambda: asyncio.ensure_future(self._auto_ack(cb, rec))
+        )
+        try:
+            return await handler(event, data)
+        finally:
+            timer.cancel()
+            if rec[2] is None:
+                await self._auto_ack(cb, rec)  # المعالج لم يرد أبدًا
+            _pending.pop(cb.id, None)
+
+    @staticmethod
+    async def _auto_ack(cb, rec: list) -> None:
+        if rec[2] is not None:
+            return
+        _auto_inflight.add(cb.id)
+        try:
+            await cb.bot(AnswerCallbackQuery(callback_query_id=cb.id))
+        except Exception as e:
+            log.debug(f"[callback_ack] auto answer failed: {e}")
+        finally:
+            _auto_inflight.discard(cb.id)
@@ -0,0 +1,138 @@
+# middlewares/metrics.py
+from __future__ import annotations
+
+import time
+import importlib
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import Update
+
+from utils import metrics as m
+
+# ربط aiogram بسجل utils.metrics:
+# - UpdateMetricsMiddleware (outer على update، الأول): الزمن الكلي لكل نوع تحديث
+#   شاملًا انتظار المسار.
+# - HandlerMetricsMiddleware (inner، الأخير): زمن المعالج لكل router/handler + الأخطاء.
+# - timed(stage, mw): يغلّف middleware ويقيس زمنه الذاتي فقط (بلا ما بعده في السلسلة).
+# - ApiMetricsMiddleware (على الجلسة، الأخير): زمن كل طريقة Bot API ورمز الخطأ.
+
+UPDATE_SECONDS  = m.histogram("bot_update_seconds", "Total update processing time", ("type",))
+HANDLER_SECONDS = m.histogram("bot_handler_seconds", "Handler time per router/handler", ("router", "handler"))
+HANDLER_ERRORS  = m.counter("bot_handler_errors_total", "Handler exceptions", ("router", "handler", "error"))
+STAGE_SECONDS   = m.histogram("bot_middleware_seconds", "Middleware self time per stage", ("stage", "event"))
+API_SECONDS     = m.histogram("bot_api_seconds", "Bot API call latency", ("method",))
+API_ERRORS      = m.counter("bot_api_errors_total", "Bot API errors", ("method", "code"))
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event: Update, data: Dict[str, Any]):
+        t0 = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            UPDATE_SECONDS.observe(time.perf_counter() - t0, type=event.event_type)
+
+
+def _handler_name(h) -> str:
+    cb = getattr(h, "callback", None)
+    if cb is None:
+        return "-"
+    mod = (getattr(cb, "__module__", "") or "").rsplit(".", 1)[-1]
+    return f"{mod}.{getattr(cb, '__qualname__', '?')}"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    async def __call__(self, handler, event, data: Dict[str, Any]):
+        router = getattr(data.get("event_router"), "name", None) or "-"
+        name = _handler_name(data.get("handler"))
+        t0 = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.inc(router=router, handler=name, error=type(e).__name__)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - t0, router=router, handler=name)
+
+
+class _Timed(BaseMiddleware):
+    """يقيس زمن middleware ذاتيًا: الكلي ناقص الوقت داخل handler التالي."""
+
+    def __init__(self, stage: str, inner: BaseMiddleware):
+        self.stage = stage
+        self.inner = inner
+
+    async def __call__(self, handler, event, data: Dict[str, Any]):
+        nested = [0.0]
+
+        async def _next(ev, d):
+            t1 = time.perf_counter()
+            try:
+                return await handler(ev, d)
+            finally:
+                nested[0] += time.perf_counter() - t1
+
+        t0 = time.perf_counter()
+        try:
+            return await self.inner(_next, event, data)
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - t0 - nested[0],
+                                  stage=self.stage, event=type(event).__name__)
+
+def timed(stage: str, mw: BaseMiddleware) -> BaseMiddleware:
+    return _Timed(stage, mw)
+
+
+def _api_code(e: Exception) -> str:
+    if isinstance(e, TelegramRetryAfter):
+        return "429"
+    if isinstance(e, TelegramAPIError):
+        code = getattr(e, "error_code", None)
+        if code:
+            return str(code)
+        return type(e).__name__.replace("Telegram", "") or "api"
+    return type(e).__name__    # شبكة/مهلة
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    async def __call__(self, make_request: Callable[..., Awaitable[Any]], bot, method):
+        name = type(method).__name__
+        t0 = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            API_ERRORS.inc(method=name, code=_api_code(e))
+            raise
+        finally:
+            API_SECONDS.observe(time.perf_counter() - t0, method=name)
+
+
+def _stats_of(mod: str, fn: str, keys=None):
+    def _get():
+        st = getattr(importlib.import_module(mod), fn)()
+        return {k: v for k, v in st.items()
+                if (keys is None or k in keys) and isinstance(v, (int, float)) and not isinstance(v, bool)}
+    return _get
+
+def register_gauges() -> None:
+    """أعماق الطوابير وإحصاءات الوحدات كمقاييس gauge (تُقرأ عند كل /metrics)."""
+    m.gauge_fn("bot_lanes", "User lanes: active lanes, queued and dropped updates",
+               _stats_of("middlewares.user_lanes", "lane_stats",
+                         ("active_lanes", "queued", "dropped_dup", "dropped_overflow", "wait_p99")), ("key",))
+    m.gauge_fn("bot_api_scheduler", "API scheduler waiting calls and chat buckets",
+               _stats_of("utils.api_scheduler", "scheduler_stats",
+                         ("waiting_interactive", "waiting_bulk", "chats")), ("key",))
+    m.gauge_fn("bot_timers", "Durable timers",
+               _stats_of("utils.timers", "stats", ("pending", "heap", "running")), ("key",))
+    m.gauge_fn("bot_admin_notify", "Admin notification queues",
+               _stats_of("utils.admin_notify", "stats", ("queued", "open_digests", "dropped")), ("key",))
+    m.gauge_fn("bot_vip_status_views", "Live VIP status views",
+               _stats_of("utils.vip_status_ticker", "stats", ("active",)), ("key",))
+    m.gauge_fn("bot_edit_cache", "Edit dedupe cache",
+               _stats_of("utils.smart_edit", "edit_cache_stats"), ("key",))
+    m.gauge_fn("bot_gcra_keys", "Tracked keys per GCRA limiter",
+               lambda: {n: st["keys"] for n, st in importlib.import_module("utils.gcra").stats().items()},
+               ("limiter",))
@@ -1,6 +1,6 @@
 # middlewares/tracer.py
 from __future__ import annotations
-import logging
+import os, random, time, logging
 from aiogram import BaseMiddleware
 from aiogram.types import Update
 
@@ -27,10 +27,23 @@ def _desc_update(upd: Update) -> tuple[str, int | None, str | None]:
     # fallback
     return "other", None, None
 
+# تتبّع عيّنة من التحديثات على مستوى DEBUG فقط (المقاييس الكاملة في middlewares.metrics):
+# TRACE_SAMPLE نسبة التحديثات المتتبَّعة (0..1)، والحمولة تُقتطع إلى TRACE_PAYLOAD_MAX حرفًا.
+TRACE_SAMPLE      = min(1.0, max(0.0, float(os.getenv("TRACE_SAMPLE", "0.01") or 0)))
+TRACE_PAYLOAD_MAX = int(os.getenv("TRACE_PAYLOAD_MAX", "64"))
+
+log = logging.getLogger("trace")
+
 class TracerMiddleware(BaseMiddleware):
     async def __call__(self, handler, event: Update, data):
+        if not TRACE_SAMPLE or not log.isEnabledFor(logging.DEBUG) or random.random() >= TRACE_SAMPLE:
+            return await handler(event, data)
         kind, uid, payload = _desc_update(event)
-        logging.info(f"[TRACE] enter {kind} uid={uid} payload={payload!r}")
-        res = await handler(event, data)
-        logging.info(f"[TRACE] exit  {kind}")
-        return res
+        if payload and len(payload) > TRACE_PAYLOAD_MAX:
+            payload = payload[:TRACE_PAYLOAD_MAX] + "…"
+        t0 = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            log.debug(f"[TRACE] {kind} uid={uid} payload={payload!r} "
+                      f"{(time.perf_counter() - t0) * 1000:.1f}ms")
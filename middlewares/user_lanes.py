@@ -0,0 +1,176 @@
+# middlewares/user_lanes.py
+from __future__ import annotations
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+# منفّذ "مسارات" لكل مستخدم على مستوى Dispatcher (outer middleware على dp.update):
+# - تحديثات نفس المستخدم تُنفَّذ بالترتيب واحدًا تلو الآخر (لا تداخل في
+#   قراءة/تعديل/كتابة ملفات JSON)، والمستخدمون المختلفون يعملون بالتوازي.
+# - سقف عام للتنفيذ المتزامن (LANES_MAX_CONCURRENCY) يحمي الحلقة من المعالجات الثقيلة.
+# - عمق أقصى لكل مسار (LANES_MAX_DEPTH): ما يزيد عنه يُسقط، وتُسقط أيضًا أزرار
+#   callback المكررة (نفس data) التي ما زالت تنتظر في المسار.
+# - مقاييس زمن الانتظار في المسار: lane_stats().
+
+log = logging.getLogger(__name__)
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        v = int(os.getenv(name, "").strip())
+        return v if v > 0 else default
+    except Exception:
+        return default
+
+LANES_ENABLED   = os.getenv("LANES_ENABLED", "1").strip() not in ("0", "false", "False", "")
+MAX_CONCURRENCY = _env_int("LANES_MAX_CONCURRENCY", 64)
+MAX_DEPTH       = _env_int("LANES_MAX_DEPTH", 8)
+_WAIT_SAMPLES   = 4096
+
+
+class _Lane:
+    __slots__ = ("busy", "waiters", "queued_cb")
+
+    def __init__(self):
+        self.busy = False
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.queued_cb: Set[str] = set()
+
+
+_stats: Dict[str, float] = {"handled": 0, "queued": 0, "dropped_dup": 0, "dropped_overflow": 0,
+                            "max_wait": 0.0, "max_depth": 0}
+_waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+_inflight = 0      # تحديثات دخلت المسارات ولم تنتهِ (منتظرة + قيد التنفيذ)
+
+
+def _pct(vals, p: float) -> float:
+    if not vals:
+        return 0.0
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(len(vals) * p))]
+
+
+def lane_stats() -> Dict[str, Any]:
+    """ملخص المقاييس: عدد المسارات النشطة وزمن الانتظار p50/p99 (ثوانٍ)."""
+    waits = list(_waits)
+    return dict(_stats, active_lanes=len(_LANES), inflight=_inflight,
+                wait_p50=_pct(waits, .50), wait_p99=_pct(waits, .99))
+
+def inflight() -> int:
+    return _inflight
+
+
+_LANES: Dict[int, _Lane] = {}
+
+
+class UserLaneMiddleware(BaseMiddleware):
+    """
+    سجّلها كـ outer middleware على update (بعد UserContextMiddleware الافتراضي):
+        dp.update.outer_middleware(UserLaneMiddleware())
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_depth: int = MAX_DEPTH):
+        super().__init__()
+        self._sem = asyncio.Semaphore(max(1, max_concurrency))
+        self._max_depth = max(1, max_depth)
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        global _inflight
+        _inflight += 1
+        try:
+            return await self._enter(handler, event, data)
+        finally:
+            _inflight -= 1
+
+    async def _enter(self, handler, event: Update, data: Dict[str, Any]) -> Any:
+        user = data.get("event_from_user")
+        uid: Optional[int] = getattr(user, "id", None)
+        if not LANES_ENABLED or uid is None or event.chat_member or event.my_chat_member:
+            # بلا مستخدم (أو أحداث عضوية القنوات): سقف التزامن فقط
+            async with self._sem:
+                return await handler(event, data)
+
+        cb = event.callback_query
+        cb_key = f"{cb.data}|{cb.message.message_id if cb.message else ''}" if cb else None
+
+        lane = _LANES.get(uid)
+        if lane is None:
+            lane = _LANES[uid] = _Lane()
+
+        if lane.busy:
+            if cb_key is not None and cb_key in lane.queued_cb:
+                _stats["dropped_dup"] += 1
+                await self._quiet_answer(cb)
+                return None
+            if len(lane.waiters) >= self._max_depth:
+                _stats["dropped_overflow"] += 1
+                if cb is not None:
+                    await self._quiet_answer(cb)
+                log.info(f"[lanes] uid={uid} lane full ({len(lane.waiters)}), update dropped")
+                return None
+
+        t0 = time.monotonic()
+        if lane.busy:
+            fut = asyncio.get_running_loop().create_future()
+            lane.waiters.append(fut)
+            if cb_key is not None:
+                lane.queued_cb.add(cb_key)
+            _stats["queued"] += 1
+            if len(lane.waiters) > _stats["max_depth"]:
+                _stats["max_depth"] = len(lane.waiters)
+            try:
+                await fut  # يُسلَّم المسار لنا مباشرة عند انتهاء السابق
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self._release(uid, lane)  # استلمنا المسار ثم أُلغينا — مرّره للتالي
+                else:
+                    try:
+                        lane.waiters.remove(fut)
+                    except ValueError:
+                        pass
+                raise
+            finally:
+                if cb_key is not None:
+                    lane.queued_cb.discard(cb_key)
+        else:
+            lane.busy = True
+
+        try:
+            async with self._sem:
+                wait = time.monotonic() - t0
+                _waits.append(wait)
+                if wait > _stats["max_wait"]:
+                    _stats["max_wait"] = wait
+                _stats["handled"] += 1
+                return await handler(event, data)
+        finally:
+            self._release(uid, lane)
+
+    @staticmethod
+    def _release(uid: int, lane: _Lane) -> None:
+        while lane.waiters:
+            fut = lane.waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # المسار يبقى busy ويُسلَّم للتالي
+                return
+        lane.busy = False
+        if _LANES.get(uid) is lane:
+            _LANES.pop(uid, None)
+
+    @staticmethod
+    async def _quiet_answer(cb) -> None:
+        try:
+            await cb.answer()
+        except Exception:
+            pass
@@ -3,7 +3,6 @@ from __future__ import annotations
 
 import os
 import time
-from collections import deque, defaultdict
 from typing import Callable, Awaitable, Any, Dict
 
 from aiogram import BaseMiddleware
@@ -11,11 +10,27 @@ from aiogram.types import TelegramObject, Message, CallbackQuery
 
 # --- Helpers ---
 try:
-    from utils.vip_access import has_vip_or_admin
+    from utils.vip_access import has_vip_or_admin, ADMIN_IDS
 except Exception:
+    ADMIN_IDS: set[int] = set()
     def has_vip_or_admin(_uid: int) -> bool:
         return False
 
+try:
+    from utils.loop_watchdog import current_lag
+except Exception:
+    def current_lag() -> float:
+        return 0.0
+
+try:
+    from middlewares.user_lanes import inflight
+except Exception:
+    def inflight() -> int:
+        return 0
+
+from utils import metrics as _metrics
+from utils import gcra
+
 try:
     from lang import t, get_user_lang
 except Exception:
@@ -31,8 +46,15 @@ def _env_int(name: str, default: int) -> int:
     except Exception:
         return default
 
-def _env_set(name: str) -> set[str]:
-    return {x.strip() for x in os.getenv(name, "").split(",") if x.strip()}
+def _env_set(name: str, default: str = "") -> set[str]:
+    return {x.strip() for x in os.getenv(name, default).split(",") if x.strip()}
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        v = float(os.getenv(name, "").strip())
+        return v if v > 0 else default
+    except Exception:
+        return default
 
 # === Settings (per-type & per-tier) ===
 # Enable/disable
@@ -56,29 +78,89 @@ MSG_WHITELIST = _env_set("RL_MSG_WHITELIST")    # e.g. "start,report,admin"
 # Callback prefixes or full data keys before ":" e.g. "admin", "vip", "maint"
 CB_WHITELIST  = _env_set("RL_CB_WHITELIST")     # e.g. "admin,maint,rin"
 
-# Housekeeping
-_CLEAN_EVERY   = 2000
-_MAX_DEQUE_LEN = 128
+# === Overload shedding ===
+# Pressure = max(loop lag / SHED_LAG_MS, in-flight updates / SHED_INFLIGHT).
+# Level 0 below 1.0, then 1 / 2 / 3 at pressure 1 / 2 / 3+. Levels rise at once
+# and fall one step per SHED_COOLDOWN_SEC. Only the "user" tier is tightened:
+# admins, VIPs and live-support traffic keep their normal limits.
+SHED_ENABLED      = os.getenv("SHED_ENABLED", "1").strip() not in ("0", "false", "False", "")
+SHED_LAG_SEC      = _env_float("SHED_LAG_MS", 100.0) / 1000.0
+SHED_INFLIGHT     = _env_int("SHED_INFLIGHT", 48)
+SHED_COOLDOWN_SEC = _env_float("SHED_COOLDOWN_SEC", 2.0)
+SHED_FACTORS      = (1.0, 0.5, 0.25, 0.1)     # cap multiplier per level (min 1)
+# Expensive callbacks (card renders, exports): data prefixes rejected from level 1
+SHED_EXPENSIVE_CB = tuple(_env_set(
+    "SHED_EXPENSIVE_CB", "home,back_to_menu,rprof,sec:,sk:export,sa:export,promp:live:list"))
+# Live support: FSM states, callbacks and commands never shed.
+# States are aiogram raw states (handlers/report.py, handlers/live_chat.py).
+# Callback entries ending in ":" are prefixes, the rest match exactly
+# ("report" must not catch "report_seller:start").
+SUPPORT_STATES    = _env_set("SHED_SUPPORT_STATES",
+                             "LiveChat:active,ReportState:waiting_text,"
+                             "ChatReplyState:waiting_text,FeedbackState:waiting_reason")
+_SUPPORT_CB_RAW   = _env_set("SHED_SUPPORT_CB", "live:,rchat:,rfb:,report,report:open,bot:live")
+SUPPORT_CB        = tuple(x for x in _SUPPORT_CB_RAW if x.endswith(":"))
+SUPPORT_CB_EXACT  = {x for x in _SUPPORT_CB_RAW if not x.endswith(":")}
+SUPPORT_CMDS      = _env_set("SHED_SUPPORT_CMDS", "support,livechat,report")
+_LEVEL_TTL        = 0.25
 
-class _Bucket:
-    """Sliding window bucket per user & type."""
-    __slots__ = ("dq",)
-    def __init__(self):
-        self.dq: deque[float] = deque()
+TIERS = ("admin", "vip", "support", "user")
+
+SHED_TOTAL = _metrics.counter("bot_shed_total", "Updates rejected by the rate limiter", ("tier", "reason"))
+
+_shed: Dict[str, Dict[str, int]] = {tier: {"rate": 0, "overload": 0, "expensive": 0} for tier in TIERS}
+_level = 0
+_level_at = 0.0        # last computation
+_level_raised = 0.0    # last time the level went up or held
+
+def overload_level() -> int:
+    """Current overload level 0..3 (cached for _LEVEL_TTL)."""
+    global _level, _level_at, _level_raised
+    now = time.monotonic()
+    if now - _level_at < _LEVEL_TTL:
+        return _level
+    _level_at = now
+    if not SHED_ENABLED:
+        _level = 0
+        return 0
+    pressure = max(current_lag() / SHED_LAG_SEC, inflight() / SHED_INFLIGHT)
+    target = 0 if pressure < 1 else min(3, int(pressure))
+    if target >= _level:
+        _level, _level_raised = target, now
+    elif now - _level_raised >= SHED_COOLDOWN_SEC:
+        _level, _level_raised = _level - 1, now
+    return _level
+
+def shed_stats() -> Dict[str, Any]:
+    """Per-tier rejection counts by reason + the current overload level."""
+    return {"level": _level, "lag_ms": round(current_lag() * 1000, 1), "inflight": inflight(),
+            "tiers": {tier: dict(c) for tier, c in _shed.items()}}
+
+def _note_shed(tier: str, reason: str) -> None:
+    _shed[tier][reason] += 1
+    SHED_TOTAL.inc(tier=tier, reason=reason)
+
+_metrics.gauge_fn("bot_overload_level", "Rate limiter overload level (0-3)", lambda: _level)
 
 class VipRateLimitMiddleware(BaseMiddleware):
     """
-    Per-user sliding window rate limit:
+    Per-user rate limit (GCRA: `cap` per `window` with a burst of `cap`,
+    one float per user per rule; idle users are compacted away):
       - Separate limits for Message vs CallbackQuery
       - Separate limits for VIP/Admin vs Regular
       - Separate whitelists for commands & callback prefixes
       - Localized throttle messages
+      - Overload mode (see overload_level): tightens "user" tier caps and
+        rejects expensive callbacks first; admin/VIP/support are reserved
     """
     def __init__(self):
         super().__init__()
-        # hits[(uid, "msg"|"cb")] -> deque[timestamps]
-        self._hits: Dict[tuple[int, str], _Bucket] = defaultdict(_Bucket)
-        self._counter = 0
+        self._rules = {
+            ("msg", True):  gcra.limiter("rl.msg.vip",  VIP_MSG_MAX, VIP_MSG_WINDOW),
+            ("msg", False): gcra.limiter("rl.msg.user", USR_MSG_MAX, USR_MSG_WINDOW),
+            ("cb", True):   gcra.limiter("rl.cb.vip",   VIP_CB_MAX,  VIP_CB_WINDOW),
+            ("cb", False):  gcra.limiter("rl.cb.user",  USR_CB_MAX,  USR_CB_WINDOW),
+        }
 
     # ---------- Whitelists ----------
     def _is_msg_whitelisted(self, msg: Message) -> bool:
@@ -97,38 +179,31 @@ class VipRateLimitMiddleware(BaseMiddleware):
         key = data.split(":", 1)[0] if ":" in data else data
         return key in CB_WHITELIST
 
-    # ---------- Core ----------
-    def _allowed(self, uid: int, typ: str, vip: bool) -> bool:
-        now = time.monotonic()
-        bucket = self._hits[(uid, typ)]
-        dq = bucket.dq
-
-        if typ == "msg":
-            window = VIP_MSG_WINDOW if vip else USR_MSG_WINDOW
-            cap    = VIP_MSG_MAX     if vip else USR_MSG_MAX
-        else:
-            window = VIP_CB_WINDOW if vip else USR_CB_WINDOW
-            cap    = VIP_CB_MAX    if vip else USR_CB_MAX
-
-        # purge
-        while dq and (now - dq[0] > window):
-            dq.popleft()
-
-        if len(dq) >= cap:
-            return False
-
-        dq.append(now)
-        if len(dq) > _MAX_DEQUE_LEN:
-            while len(dq) > _MAX_DEQUE_LEN:
-                dq.popleft()
+    # ---------- Tiers ----------
+    @staticmethod
+    def _tier(uid: int, event: TelegramObject, data: Dict[str, Any], vip: bool) -> str:
+        if uid in ADMIN_IDS:
+            return "admin"
+        if data.get("raw_state") in SUPPORT_STATES:
+            return "support"
+        if isinstance(event, CallbackQuery):
+            cb = event.data or ""
+            if cb in SUPPORT_CB_EXACT or cb.startswith(SUPPORT_CB):
+                return "support"
+        elif isinstance(event, Message):
+            txt = (event.text or "").lstrip()
+            if txt.startswith("/") and txt.split()[0].lstrip("/").split("@", 1)[0] in SUPPORT_CMDS:
+                return "support"
+        return "vip" if vip else "user"
 
-        self._counter += 1
-        if self._counter % _CLEAN_EVERY == 0:
-            to_del = [k for k, b in self._hits.items() if not b.dq]
-            for k in to_del:
-                self._hits.pop(k, None)
-
-        return True
+    # ---------- Core ----------
+    def _allowed(self, uid: int, typ: str, vip: bool, factor: float = 1.0) -> bool:
+        lim = self._rules[(typ, vip)]
+        if factor >= 1.0:
+            return lim.allow(uid)
+        # Overload: each hit costs more, i.e. cap shrinks to max(1, cap*factor)
+        cap = lim.limit
+        return lim.allow(uid, cost=cap / max(1, int(cap * factor)))
 
     async def __call__(self,
                        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
@@ -155,11 +230,23 @@ class VipRateLimitMiddleware(BaseMiddleware):
             return await handler(event, data)
 
         vip = has_vip_or_admin(uid)
+        tier = self._tier(uid, event, data, vip)
+        level = overload_level() if tier == "user" else 0
+
+        reason = None
+        if level and typ == "cb" and (event.data or "").startswith(SHED_EXPENSIVE_CB):
+            reason = "expensive"
+        elif not self._allowed(uid, typ, vip, SHED_FACTORS[level]):
+            reason = "overload" if level else "rate"
 
-        if not self._allowed(uid, typ, vip):
+        if reason is not None:
+            _note_shed(tier, reason)
             try:
                 lang = get_user_lang(uid) or "en"
-                key = "rate.limit.slow.cb" if typ == "cb" else "rate.limit.slow.msg"
+                if reason == "rate":
+                    key = "rate.limit.slow.cb" if typ == "cb" else "rate.limit.slow.msg"
+                else:
+                    key = "rate.limit.busy"
                 text = t(lang, key)
             except Exception:
                 text = "⏳ Slow down a bit."
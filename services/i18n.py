@@ -1,24 +1,16 @@
-import json, os
-from functools import lru_cache
-from typing import Dict
+from typing import Any
 
-_LOCALES_DIR = os.path.join(os.path.dirname(__file__), "..", "locales")
-_FILES = {"en": "en.json", "ar": "ar.json"}
+import lang as _lang
 
-def _load(path: str) -> Dict[str, str]:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+# واجهة (key, locale) فوق كتالوجات lang المُجمّعة وقوالبها — جدول واحد ومُنسِّق واحد.
 
-@lru_cache(maxsize=2)
-def _table(locale: str) -> Dict[str, str]:
-    fname = _FILES.get(locale, _FILES["en"])
-    return _load(os.path.join(_LOCALES_DIR, fname))
-
-def t(key: str, locale: str = "en", **kwargs) -> str:
-    table = _table(locale)
-    s = table.get(key) or _table("en").get(key) or key
-    return s.format(**kwargs) if kwargs else s
+def t(key: str, locale: str = "en", **kwargs: Any) -> str:
+    s = _lang.lookup(locale, key)
+    if not s:
+        _lang._note_miss(locale, key)
+        s = key
+    return _lang.format_template(s, kwargs, key) if kwargs else s
 
 def reload_locales() -> None:
-    """Call this if you edit JSON at runtime (clears cache)."""
-    _table.cache_clear()
+    """Call this if you edit JSON at runtime (recompiles catalogs)."""
+    _lang.reload_locales()
@@ -0,0 +1,101 @@
+# tests/test_gcra.py
+# محدِّد GCRA: حدّ الاندفاع بالضبط (بلا رفض زائف بسبب أخطاء الفواصل العشرية)،
+# الكلفة > 1، الضغط، seed/reset.
+import random
+
+import pytest
+
+from utils import gcra
+from utils.gcra import Limiter
+
+# أساسات زمنية: monotonic صغير/كبير وساعة حائط (report cooldown يستخدم time.time)
+BASES = [0.0, 1234.5678, 987654.321, 1.79e9 + 0.123]
+
+
+def _burst(lim: Limiter, now: float, n: int, cost: float = 1.0) -> int:
+    return sum(lim.hit("k", cost, now=now) == 0.0 for _ in range(n))
+
+
+@pytest.mark.parametrize("limit,period", [(12, 10), (3, 1), (7, 60), (30, 1), (1, 5)])
+def test_full_burst_allowed_then_limited(limit, period):
+    rng = random.Random(limit * 1000 + period)
+    for base in BASES + [rng.uniform(1e3, 2e9) for _ in range(300)]:
+        lim = Limiter("t", limit, period)
+        assert _burst(lim, base, limit) == limit, base
+        assert lim.hit("k", now=base) > 0
+
+
+@pytest.mark.parametrize("cost", [2.0, 3.0, 4.0])
+def test_cost_above_one(cost):
+    rng = random.Random(int(cost))
+    for base in BASES + [rng.uniform(1e3, 2e9) for _ in range(300)]:
+        lim = Limiter("t", 12, 10)
+        assert _burst(lim, base, 12, cost) == int(12 // cost), base
+
+
+def test_refill_and_retry_after():
+    lim = Limiter("t", 12, 10)
+    now = 5000.0
+    assert _burst(lim, now, 12) == 12
+    wait = lim.hit("k", now=now)
+    assert wait == pytest.approx(10 / 12)
+    assert lim.retry_after("k", now=now) == pytest.approx(wait)
+    # بعد فاصل واحد بالضبط: طلب واحد فقط
+    later = now + 10 / 12
+    assert lim.retry_after("k", now=later) == 0.0
+    assert lim.hit("k", now=later) == 0.0
+    assert lim.hit("k", now=later) > 0
+
+
+def test_rejected_hit_consumes_nothing():
+    lim = Limiter("t", 2, 10)
+    assert _burst(lim, 100.0, 2) == 2
+    before = lim.level("k", now=100.0)
+    for _ in range(5):
+        assert lim.hit("k", now=100.0) > 0
+    assert lim.level("k", now=100.0) == before == pytest.approx(2)
+
+
+def test_compact_evicts_only_idle_keys():
+    lim = Limiter("t", 1, 10)
+    lim.hit("old", now=0.0)
+    lim.hit("new", now=8.0)
+    assert lim.compact(now=12.0) == 1
+    assert len(lim) == 1
+    # الخامل المحذوف مكافئ لمفتاح جديد: اندفاع كامل مجددًا
+    assert lim.hit("old", now=12.0) == 0.0
+    assert lim.hit("new", now=12.0) > 0
+
+
+def test_auto_compaction_on_growth():
+    lim = Limiter("t", 1, 1)
+    for i in range(gcra._MIN_COMPACT - 1):
+        lim.hit(i, now=0.0)
+    assert len(lim) == gcra._MIN_COMPACT - 1
+    lim.hit("trigger", now=5.0)   # كل السابقين خاملون عند t=5
+    assert len(lim) == 1
+    assert lim.stats()["evicted"] == gcra._MIN_COMPACT - 1
+
+
+def test_seed_and_reset():
+    lim = Limiter("t", 1, 100)
+    lim.seed("u", 150.0)
+    assert lim.hit("u", now=100.0) == pytest.approx(50.0)
+    assert lim.hit("u", now=150.0) == 0.0
+    assert lim.hit("u", now=151.0) > 0
+    lim.reset("u")
+    assert len(lim) == 0
+    assert lim.hit("u", now=151.0) == 0.0
+
+
+def test_registry_seeds_once():
+    calls = []
+    name = "test.gcra.registry"
+    gcra._LIMITERS.pop(name, None)
+    try:
+        a = gcra.limiter(name, 1, 10, seed=lambda lim: calls.append(lim.seed("x", 1e12)))
+        b = gcra.limiter(name, 1, 10, seed=lambda lim: calls.append(None))
+        assert a is b and len(calls) == 1
+        assert not a.allow("x")
+    finally:
+        gcra._LIMITERS.pop(name, None)
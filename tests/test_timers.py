@@ -0,0 +1,162 @@
+# tests/test_timers.py
+# خدمة المؤقّتات (utils/timers): 100k مؤقّت معلّق بحدود صريحة للذاكرة ودقّة التنفيذ،
+# الاستعادة بعد إعادة التشغيل (at-least-once)، الإلغاء بالمفتاح، والإجراء غير المسجّل.
+import asyncio, importlib, time, tracemalloc
+
+import pytest
+
+N = 100_000
+MAX_BYTES_PER_TIMER = 1024        # قيس ~500 B/timer مع payload صغير
+MAX_P99_LATENESS = 1.0            # ثوانٍ، 100k مؤقّت مستحق خلال SPREAD
+SPREAD = 5.0
+
+
+@pytest.fixture
+def timers(tmp_path, monkeypatch):
+    import utils.timers as mod
+    mod = importlib.reload(mod)   # حالة وحدة نظيفة لكل اختبار
+    monkeypatch.setattr(mod, "JOURNAL_FILE", tmp_path / "timers.jsonl")
+    monkeypatch.setattr(mod, "COMPACT_MIN_LINES", 10 * N)
+    yield mod
+    if mod._loop_task is not None:
+        mod._loop_task.cancel()
+    if mod._journal is not None:
+        mod._journal.close()
+
+
+def _restart(mod):
+    """محاكاة إعادة تشغيل: تُنسى الذاكرة ويُعاد بناؤها من الدفتر فقط."""
+    if mod._loop_task is not None:
+        mod._loop_task.cancel()
+        mod._loop_task = None
+    mod._timers.clear(); mod._heap.clear(); mod._firing.clear()
+    if mod._journal is not None:
+        mod._journal.close()
+        mod._journal = None
+    mod._loaded = False
+    mod._ensure_loaded()
+
+
+def test_100k_memory_and_restore(timers):
+    base = time.time() + 3600
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for i in range(N):
+        timers.schedule_at("t.noop", base + i, {"i": i}, key=f"k:{i}")
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_timer = (after - before) / N
+    assert per_timer < MAX_BYTES_PER_TIMER, f"{per_timer:.0f} B/timer"
+
+    _restart(timers)
+    assert timers.pending_count() == N
+    assert timers._timers["k:123"].payload == {"i": 123}
+
+
+def test_100k_firing_lateness(timers):
+    lateness = []
+
+    async def main():
+        done = asyncio.Event()
+
+        async def _action(bot, payload):
+            lateness.append(time.time() - payload["due"])
+            if len(lateness) >= N:
+                done.set()
+
+        timers.register_action("t.fire", _action)
+        t0 = time.perf_counter()
+        start = time.time() + 3.0
+        for i in range(N):
+            due = start + SPREAD * i / N
+            timers.schedule_at("t.fire", due, {"due": due}, key=f"f:{i}")
+        assert time.perf_counter() - t0 < 3.0, "scheduling must finish before the first due time"
+        await timers.init_timers(bot=None)
+        await asyncio.wait_for(done.wait(), timeout=SPREAD + 60)
+
+    asyncio.run(main())
+    lateness.sort()
+    p99 = lateness[int(len(lateness) * .99)]
+    assert len(lateness) == N
+    assert p99 < MAX_P99_LATENESS, f"p99 lateness {p99 * 1000:.0f} ms"
+    assert timers.pending_count() == 0
+
+
+def test_restart_is_at_least_once(timers):
+    fired = []
+
+    async def crash_mid_action():
+        started = asyncio.Event()
+
+        async def _slow(bot, payload):
+            started.set()
+            await asyncio.sleep(3600)
+
+        timers.register_action("t.once", _slow)
+        timers.schedule("t.once", 0, {"n": 1}, key="once")
+        await timers.init_timers(bot=None)
+        await asyncio.wait_for(started.wait(), 5)
+        # انهيار أثناء التنفيذ: لا done في الدفتر
+
+    asyncio.run(crash_mid_action())
+    _restart(timers)
+    assert timers.is_pending("once")
+
+    async def rerun():
+        ok = asyncio.Event()
+
+        async def _action(bot, payload):
+            fired.append(payload["n"]); ok.set()
+
+        timers.register_action("t.once", _action)
+        await timers.init_timers(bot=None)
+        await asyncio.wait_for(ok.wait(), 5)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(rerun())
+    assert fired == [1]
+    _restart(timers)
+    assert not timers.is_pending("once")   # done كُتب بعد النجاح
+
+
+def test_cancel_and_replace_by_key(timers):
+    fired = []
+
+    async def main():
+        async def _action(bot, payload):
+            fired.append(payload["v"])
+
+        timers.register_action("t.k", _action)
+        timers.schedule("t.k", 0.2, {"v": "cancelled"}, key="a")
+        timers.schedule("t.k", 0.2, {"v": "old"}, key="b")
+        timers.schedule("t.k", 0.2, {"v": "new"}, key="b")   # نفس المفتاح يستبدل
+        assert timers.cancel("a") is True
+        assert timers.cancel("a") is False
+        await timers.init_timers(bot=None)
+        await asyncio.sleep(0.6)
+
+    asyncio.run(main())
+    assert fired == ["new"]
+    _restart(timers)
+    assert timers.pending_count() == 0
+
+
+def test_missing_handler_keeps_timer_pending(timers):
+    fired = []
+
+    async def main():
+        timers.schedule("t.late", 0, {"v": 1}, key="late")
+        await timers.init_timers(bot=None)
+        await asyncio.sleep(0.2)
+        assert timers.is_pending("late")   # لا done رغم غياب الإجراء
+
+        async def _action(bot, payload):
+            fired.append(payload["v"])
+
+        timers.register_action("t.late", _action)   # يُنفَّذ فورًا لا بعد مهلة الإعادة
+        await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+    assert fired == [1]
+    _restart(timers)
+    assert not timers.is_pending("late")
@@ -0,0 +1,54 @@
+# tests/test_vip_rate_limit_tier.py
+# تصنيف تحديثات الدعم الحي (بلاغ، رد على محادثة بلاغ، دردشة حية) في فئة support
+# كي لا تُرفض عند الضغط الزائد.
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("aiogram")
+
+from aiogram.types import CallbackQuery, Chat, Message, User  # noqa: E402
+
+from middlewares.vip_rate_limit import VipRateLimitMiddleware  # noqa: E402
+
+UID = 555000111
+
+
+def _user() -> User:
+    return User.model_construct(id=UID, is_bot=False, first_name="U")
+
+def _msg(text: str = "my report text") -> Message:
+    return Message.model_construct(message_id=1, date=datetime.now(timezone.utc), text=text,
+                                   chat=Chat.model_construct(id=UID, type="private"),
+                                   from_user=_user())
+
+def _cb(data: str) -> CallbackQuery:
+    return CallbackQuery.model_construct(id="1", from_user=_user(), chat_instance="c", data=data)
+
+def _tier(event, state=None) -> str:
+    return VipRateLimitMiddleware._tier(UID, event, {"raw_state": state}, False)
+
+
+@pytest.mark.parametrize("state", [
+    "ReportState:waiting_text",
+    "ChatReplyState:waiting_text",
+    "FeedbackState:waiting_reason",
+    "LiveChat:active",
+])
+def test_support_states(state):
+    assert _tier(_msg(), state) == "support"
+
+
+@pytest.mark.parametrize("data", ["report", "report:open", "bot:live", "live:cancel",
+                                  "rchat:reply:42", "rfb:yes"])
+def test_support_callbacks(data):
+    assert _tier(_cb(data)) == "support"
+
+
+def test_support_command():
+    assert _tier(_msg("/report")) == "support"
+
+
+@pytest.mark.parametrize("event", [_msg("hello"), _cb("report_seller:start"), _cb("home")])
+def test_regular_traffic_is_user_tier(event):
+    assert _tier(event) == "user"
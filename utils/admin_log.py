@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import os
-from typing import Optional, Iterable
+from typing import Optional
 from aiogram import Bot
 from aiogram.enums import ParseMode
 
@@ -37,10 +37,6 @@ ADMIN_ID = int(os.getenv("ADMIN_ID", "7360982123"))  # غيّره عند الح
 # حدود تيليجرام
 TG_MAX_TEXT = 4096
 
-def _chunks(s: str, size: int = TG_MAX_TEXT) -> Iterable[str]:
-    for i in range(0, len(s), size):
-        yield s[i:i + size]
-
 async def admin_log(
     bot: Bot,
     text: str,
@@ -48,6 +44,7 @@ async def admin_log(
     parse_mode: Optional[ParseMode | str] = ParseMode.HTML,
     disable_web_page_preview: bool = True,
     thread_id: Optional[int] = None,
+    kind: str = "",
 ) -> None:
     """
     يرسل لوج إلى:
@@ -55,6 +52,7 @@ async def admin_log(
       - وإلا يرسل إلى ADMIN_ID بالخاص.
 
     • يقسم الرسالة تلقائياً إذا تجاوزت 4096 حرف.
+    • kind (اختياري): أحداث نفس النوع المتقاربة تُجمَّع في ملخّص واحد.
     • parse_mode افتراضي HTML (يمكن تمرير None لتعطيله).
     • لن يرفع استثناءً عند الفشل.
     """
@@ -62,19 +60,10 @@ async def admin_log(
     topic_id = thread_id if thread_id is not None else ADMIN_LOG_THREAD_ID
 
     try:
-        for part in _chunks(text, TG_MAX_TEXT):
-            # بعض إصدارات aiogram تستخدم reply_to_message_thread_id لمواضيع المنتديات
-            kwargs = dict(
-                chat_id=target,
-                text=part,
-                disable_web_page_preview=disable_web_page_preview,
-            )
-            if parse_mode:
-                kwargs["parse_mode"] = parse_mode  # type: ignore
-            if topic_id is not None:
-                kwargs["message_thread_id"] = topic_id  # type: ignore
-
-            await bot.send_message(**kwargs)  # type: ignore[arg-type]
+        # عبر ناقل الإشعارات: لا ينتظر الإرسال، والتقسيم إلى 4096 يتم هناك
+        from utils.admin_notify import notify
+        notify(bot, text, kind=kind, admins=[target], parse_mode=parse_mode,
+               disable_web_page_preview=disable_web_page_preview, thread_id=topic_id)
     except Exception:
         # لا نوقف المنطق لو فشل اللوج
         pass
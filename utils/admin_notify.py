@@ -0,0 +1,329 @@
+# utils/admin_notify.py
+from __future__ import annotations
+
+import os, re, time, html, asyncio, logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from aiogram.enums import ParseMode
+
+from utils.api_scheduler import bulk_priority
+
+# ناقل إشعارات الأدمن:
+# - notify(...) غير حاجب: يضع الحدث في طابور كل أدمن ويرجع فورًا.
+# - عامل (task) لكل أدمن يرسل بالترتيب، والأدمنز يُخدَمون بالتوازي (أولوية جماعية).
+# - تجميع الدفعات: أول حدث من نوع kind يُرسل فورًا ويفتح نافذة ADMIN_DIGEST_WINDOW_SEC؛
+#   أحداث نفس النوع داخل النافذة تُجمَّع في رسالة ملخّص (عدد + أسطر + روابط)،
+#   مقسّمة على رسائل بحد ADMIN_DIGEST_MAX_LINES سطرًا دون حذف أي حدث.
+#   إن لم يصل داخل النافذة إلا حدث واحد يُرسل كما هو.
+# - الأحداث القابلة للتصرف (أزرار/وسائط/نسخة رسالة: طلبات VIP، البلاغات، ...):
+#   أول ADMIN_DIGEST_KEEP_FULL منها في النافذة تُرسل كاملة، والباقي يُجمَّع في ملخّص
+#   واحد (عدد + سطر ورابط لأول ADMIN_DIGEST_MAX_LINES) مع زر queue=(نص، callback)
+#   إلى قائمة الطلبات المعلّقة حيث تبقى كل الطلبات.
+#   بلا queue لا تُجمَّع أبدًا (لا مكان آخر للتصرف فيها).
+# - on_result(sent, failed): يُستدعى مرة بعد حسم كل المستلمين (مثل بديل "Admin Copy").
+# - text/reply_markup/summary تقبل قيمة ثابتة أو دالة (admin_id) -> قيمة (للغة كل أدمن).
+
+log = logging.getLogger(__name__)
+
+DIGEST_WINDOW = max(0.0, float(os.getenv("ADMIN_DIGEST_WINDOW_SEC", "30")))
+DIGEST_LINES  = max(1, int(os.getenv("ADMIN_DIGEST_MAX_LINES", "15")))
+KEEP_FULL     = max(1, int(os.getenv("ADMIN_DIGEST_KEEP_FULL", "3")))   # للأحداث القابلة للتصرف
+QUEUE_MAX     = max(10, int(os.getenv("ADMIN_NOTIFY_QUEUE_MAX", "2000")))
+TG_MAX_TEXT   = 4096
+
+PerAdmin = Union[Any, Callable[[int], Any]]
+
+
+def _parse_ids(raw: str) -> List[int]:
+    out: List[int] = []
+    for p in (raw or "").split(","):
+        p = p.strip()
+        if p.lstrip("-").isdigit():
+            out.append(int(p))
+    return out
+
+def admin_ids() -> List[int]:
+    """ADMIN_IDS (أو ADMIN_ID) من البيئة بدون تكرار."""
+    ids = _parse_ids(os.getenv("ADMIN_IDS") or os.getenv("ADMIN_ID", ""))
+    return list(dict.fromkeys(ids))
+
+def _resolve(v: PerAdmin, aid: int) -> Any:
+    return v(aid) if callable(v) else v
+
+
+class _Event:
+    __slots__ = ("bot", "aid", "kind", "text", "markup", "photo", "document", "video",
+                 "copy_from", "followup", "summary", "link", "queue", "parse_mode", "no_preview",
+                 "thread_id", "batch", "members")
+
+    def __init__(self, **kw):
+        for k in self.__slots__:
+            setattr(self, k, kw.get(k))
+
+
+class _Digest:
+    __slots__ = ("until", "events", "count", "full", "handle")
+
+    def __init__(self, until: float):
+        self.until = until
+        self.events: List[_Event] = []
+        self.count = 0
+        self.full = 0          # أحداث أُرسلت كاملة في هذه النافذة
+        self.handle: Optional[asyncio.TimerHandle] = None
+
+
+class _Batch:
+    """نتيجة notify() واحد عبر كل المستلمين → on_result(sent, failed)."""
+    __slots__ = ("left", "sent", "failed", "sealed", "cb")
+
+    def __init__(self, cb: Callable[[int, int], Any]):
+        self.left = self.sent = self.failed = 0
+        self.sealed = False
+        self.cb = cb
+
+    def done(self, ok: bool) -> None:
+        self.left -= 1
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.fire()
+
+    def fire(self) -> None:
+        if not self.sealed or self.left > 0 or self.cb is None:
+            return
+        cb, self.cb = self.cb, None
+        try:
+            r = cb(self.sent, self.failed)
+            if asyncio.iscoroutine(r):
+                asyncio.ensure_future(r)
+        except Exception as e:
+            log.warning(f"[admin_notify] on_result failed: {e}")
+
+
+_queues: Dict[int, "asyncio.Queue[_Event]"] = {}
+_workers: Dict[int, asyncio.Task] = {}
+_digests: Dict[Tuple[int, str], _Digest] = {}
+_stats: Dict[str, int] = {"enqueued": 0, "sent": 0, "failed": 0, "dropped": 0,
+                          "digested": 0, "digests": 0}
+_lat: Deque[float] = deque(maxlen=512)
+
+
+def notify(
+    bot,
+    text: PerAdmin,
+    *,
+    kind: str = "",
+    admins: Optional[Iterable[int]] = None,
+    reply_markup: PerAdmin = None,
+    photo: Optional[str] = None,
+    document: Optional[str] = None,
+    video: Optional[str] = None,
+    copy_from: Optional[Tuple[int, int]] = None,
+    followup: PerAdmin = None,
+    summary: PerAdmin = None,
+    link: Optional[str] = None,
+    queue: PerAdmin = None,
+    on_result: Optional[Callable[[int, int], Any]] = None,
+    parse_mode: Optional[str] = ParseMode.HTML,
+    disable_web_page_preview: bool = True,
+    thread_id: Optional[int] = None,
+) -> int:
+    """
+    يضع إشعارًا لكل أدمن (admins أو ADMIN_IDS) ويرجع عدد المستلمين.
+    kind: نوع الحدث للتجميع ("" = بلا تجميع)، summary/link: سطر الحدث داخل الملخّص.
+    queue=(نص، callback_data): زر قائمة الطلبات المعلّقة في ملخّص الأحداث القابلة للتصرف.
+    on_result(sent, failed): بعد حسم التسليم لكل المستلمين (قد تكون async).
+    copy_from=(chat_id, message_id): تُنسخ الرسالة الأصلية بعد الإشعار.
+    followup=("photo"|"video"|"document", file_id, caption): وسائط تُرسل بعد الإشعار (مثل الإثبات).
+    """
+    targets = list(dict.fromkeys(admins)) if admins is not None else admin_ids()
+    now = time.monotonic()
+    batch = _Batch(on_result) if on_result is not None else None
+    n = 0
+    for aid in targets:
+        try:
+            ev = _Event(bot=bot, aid=aid, kind=kind, text=_resolve(text, aid),
+                        markup=_resolve(reply_markup, aid), photo=photo, document=document,
+                        video=video, copy_from=copy_from, followup=_resolve(followup, aid), summary=_resolve(summary, aid),
+                        link=link, queue=_resolve(queue, aid), parse_mode=parse_mode,
+                        no_preview=disable_web_page_preview, thread_id=thread_id, batch=batch)
+        except Exception as e:
+            log.warning(f"[admin_notify] build event for {aid} failed: {e}")
+            continue
+        n += 1
+        if batch is not None:
+            batch.left += 1
+        keep = 1 if _digestible(ev) else (KEEP_FULL if ev.queue else 0)
+        if kind and DIGEST_WINDOW > 0 and keep:
+            d = _digests.get((aid, kind))
+            if d is None or now >= d.until:
+                d = _digests[(aid, kind)] = _Digest(now + DIGEST_WINDOW)
+                d.handle = asyncio.get_running_loop().call_later(DIGEST_WINDOW, _flush_digest, aid, kind, d)
+            if d.full >= keep:
+                d.events.append(ev)
+                d.count += 1
+                _stats["digested"] += 1
+                continue
+            d.full += 1
+        _enqueue(ev)
+    if batch is not None:
+        batch.sealed = True
+        batch.fire()
+    return n
+
+async def notify_admins(bot, text: PerAdmin, **kw) -> int:
+    """توافق مع الاستدعاءات القديمة (await notify_admins(bot, text)) — لا ينتظر الإرسال."""
+    return notify(bot, text, **kw)
+
+
+def _digestible(ev: _Event) -> bool:
+    """نص فقط (يُجمَّع بعد أول حدث)؛ غير ذلك قابل للتصرف (يُجمَّع فقط مع queue)."""
+    return not (ev.markup or ev.photo or ev.document or ev.video or ev.copy_from or ev.followup)
+
+def _enqueue(ev: _Event) -> None:
+    q = _queues.get(ev.aid)
+    if q is None:
+        q = _queues[ev.aid] = asyncio.Queue(maxsize=QUEUE_MAX)
+    try:
+        q.put_nowait(ev)
+    except asyncio.QueueFull:
+        _stats["dropped"] += 1
+        log.warning(f"[admin_notify] queue full for admin {ev.aid}, event dropped")
+        _settle(ev, False)
+        return
+    _stats["enqueued"] += 1
+    w = _workers.get(ev.aid)
+    if w is None or w.done():
+        _workers[ev.aid] = asyncio.create_task(_worker(ev.aid, q))
+
+
+def _settle(ev: _Event, ok: bool) -> None:
+    for m in (ev.members or (ev,)):
+        if m.batch is not None:
+            m.batch.done(ok)
+
+def _strip_html(s: str) -> str:
+    return html.unescape(re.sub(r"<[^>]+>", "", s or ""))
+
+def _summary_line(ev: _Event) -> str:
+    base = ev.summary if ev.summary else next((ln for ln in _strip_html(ev.text or "").splitlines() if ln.strip()), "—")
+    line = "• " + html.escape(base.strip()[:120])
+    if ev.link:
+        line += f" — <a href=\"{html.escape(ev.link, quote=True)}\">↗</a>"
+    return line
+
+def _flush_digest(aid: int, kind: str, d: _Digest) -> None:
+    if _digests.get((aid, kind)) is d:
+        _digests.pop((aid, kind), None)
+    if not d.events:
+        return
+    if len(d.events) == 1:
+        _enqueue(d.events[0])  # حدث وحيد: يُرسل كاملًا
+        return
+    first = d.events[0]
+    queue = next((ev.queue for ev in reversed(d.events) if ev.queue), None)
+    markup = _queue_markup(queue)
+    head = f"📦 <b>{html.escape(kind)}</b> × {d.count} ({int(DIGEST_WINDOW)}s)"
+    if d.full:
+        head += f" · +{d.full} ↑"   # أُرسلت كاملة قبل الملخّص
+    if markup is not None:
+        # كل حدث موجود في قائمة المعلّقة: رسالة واحدة، والباقي عبر الزر
+        rest = len(d.events) - DIGEST_LINES
+        lines = [head] + [_summary_line(ev) for ev in d.events[:DIGEST_LINES]]
+        if rest > 0:
+            lines.append(f"… +{rest} ⏳")
+        _stats["digests"] += 1
+        _enqueue(_Event(bot=first.bot, aid=aid, kind=kind, text="\n".join(lines), markup=markup,
+                        parse_mode=ParseMode.HTML, no_preview=True, thread_id=first.thread_id,
+                        members=list(d.events)))
+        return
+    parts = (len(d.events) + DIGEST_LINES - 1) // DIGEST_LINES
+    for i in range(0, len(d.events), DIGEST_LINES):
+        part = f" [{i // DIGEST_LINES + 1}/{parts}]" if parts > 1 else ""
+        chunk = d.events[i:i + DIGEST_LINES]
+        lines = [head + part] + [_summary_line(ev) for ev in chunk]
+        _stats["digests"] += 1
+        _enqueue(_Event(bot=first.bot, aid=aid, kind=kind, text="\n".join(lines),
+                        parse_mode=ParseMode.HTML, no_preview=True, thread_id=first.thread_id,
+                        members=chunk))
+
+def _queue_markup(queue: Any):
+    """queue=(نص، callback_data) أو InlineKeyboardButton → لوحة بزر واحد."""
+    if not queue:
+        return None
+    from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+    btn = queue if isinstance(queue, InlineKeyboardButton) else \
+        InlineKeyboardButton(text=str(queue[0]), callback_data=str(queue[1]))
+    return InlineKeyboardMarkup(inline_keyboard=[[btn]])
+
+
+async def _deliver(ev: _Event) -> None:
+    bot, aid = ev.bot, ev.aid
+    common: Dict[str, Any] = {"reply_markup": ev.markup, "parse_mode": ev.parse_mode}
+    if ev.thread_id is not None:
+        common["message_thread_id"] = ev.thread_id
+    if ev.photo:
+        await bot.send_photo(aid, ev.photo, caption=ev.text, **common)
+    elif ev.document:
+        await bot.send_document(aid, ev.document, caption=ev.text, **common)
+    elif ev.video:
+        await bot.send_video(aid, ev.video, caption=ev.text, **common)
+    else:
+        text = ev.text or ""
+        for i in range(0, max(1, len(text)), TG_MAX_TEXT):
+            await bot.send_message(aid, text[i:i + TG_MAX_TEXT],
+                                   disable_web_page_preview=ev.no_preview, **common)
+    if ev.followup:
+        kind, file_id, caption = ev.followup
+        sender = {"photo": bot.send_photo, "video": bot.send_video, "document": bot.send_document}.get(kind)
+        if sender and file_id:
+            await sender(aid, file_id, caption=caption)
+    if ev.copy_from:
+        try:
+            await bot.copy_message(chat_id=aid, from_chat_id=ev.copy_from[0], message_id=ev.copy_from[1])
+        except Exception as e:
+            log.warning(f"[admin_notify] copy -> {aid} failed: {e}")
+
+async def _worker(aid: int, q: "asyncio.Queue[_Event]") -> None:
+    with bulk_priority():
+        while True:
+            try:
+                ev = await asyncio.wait_for(q.get(), timeout=60)
+            except asyncio.TimeoutError:
+                if q.empty():
+                    _workers.pop(aid, None)
+                    return
+                continue
+            t0 = time.monotonic()
+            ok = False
+            try:
+                await _deliver(ev)
+                _stats["sent"] += 1
+                ok = True
+            except Exception as e:
+                _stats["failed"] += 1
+                log.warning(f"[admin_notify] send -> {aid} failed: {e}")
+            finally:
+                _settle(ev, ok)
+                _lat.append(time.monotonic() - t0)
+                q.task_done()
+
+
+async def drain(timeout: float = 10.0) -> None:
+    """ينتظر تفريغ الطوابير (عند الإيقاف). الملخّصات المعلّقة تُرسل فورًا."""
+    for (aid, kind), d in list(_digests.items()):
+        if d.handle:
+            d.handle.cancel()
+        _flush_digest(aid, kind, d)
+    try:
+        await asyncio.wait_for(asyncio.gather(*(q.join() for q in _queues.values())), timeout)
+    except asyncio.TimeoutError:
+        log.warning("[admin_notify] drain timed out")
+
+def stats() -> Dict[str, Any]:
+    lat = sorted(_lat)
+    p95 = lat[min(len(lat) - 1, int(len(lat) * .95))] if lat else 0.0
+    return dict(_stats, queued=sum(q.qsize() for q in _queues.values()),
+                open_digests=len(_digests), send_p95=round(p95, 3))
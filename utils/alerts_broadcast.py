@@ -7,6 +7,8 @@ from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
 from utils.alerts_config import get_config
+from utils import timers
+from utils.api_scheduler import bulk_priority
 
 DATA_DIR = Path("data"); DATA_DIR.mkdir(parents=True, exist_ok=True)
 STATS_FILE   = DATA_DIR / "alerts_stats.json"
@@ -69,6 +71,11 @@ def _load_active() -> List[Dict[str, Any]]:
 
 def _save_active(lst: List[Dict[str, Any]]):
     _save_json(ACTIVE_FILE, lst)
+    try:
+        from utils.home_snapshot import mark_dirty
+        mark_dirty()   # عدّاد الإشعارات في الشاشة الرئيسية
+    except Exception:
+        pass
 
 def _gc_active(lst: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     now = int(time.time())
@@ -102,13 +109,22 @@ def get_active_alerts(lang: str) -> List[Dict[str, Any]]:
         })
     return sorted(out, key=lambda x: x["ts"], reverse=True)
 
-async def _auto_delete(bot: Bot, chat_id: int, message_id: int, after_seconds: int):
+async def _auto_delete_action(bot: Bot, payload: Dict[str, Any]):
     try:
-        await asyncio.sleep(max(0, int(after_seconds)))
-        await bot.delete_message(chat_id, message_id)
+        await bot.delete_message(int(payload["chat_id"]), int(payload["message_id"]))
     except Exception:
         pass
 
+timers.register_action("alerts.auto_delete", _auto_delete_action)
+
+def _auto_delete(chat_id: int, message_id: int, after_seconds: int) -> None:
+    """يجدول حذف رسالة التنبيه عبر خدمة المؤقّتات (يصمد بعد إعادة التشغيل)."""
+    timers.schedule(
+        "alerts.auto_delete", max(0, int(after_seconds)),
+        {"chat_id": int(chat_id), "message_id": int(message_id)},
+        key=f"alert_del:{chat_id}:{message_id}",
+    )
+
 # ---------- broadcast ----------
 async def broadcast(
     bot: Bot,
@@ -152,8 +168,19 @@ async def broadcast(
     if not recipients:
         return (0, 0, 0)
 
-    sent = skipped = failed = 0
+    with bulk_priority():
+        sent, skipped, failed = await _send_all(
+            bot, recipients, text_en=text_en, text_ar=text_ar, delivery=delivery,
+            ping_ttl=ping_ttl, alert_id=alert_id, delay=delay,
+        )
 
+    _inc_stats(kind, sent)
+    return (sent, skipped, failed)
+
+
+async def _send_all(bot: Bot, recipients: Set[int], *, text_en: Optional[str], text_ar: Optional[str],
+                    delivery: str, ping_ttl: int, alert_id: str, delay: float) -> Tuple[int, int, int]:
+    sent = skipped = failed = 0
     for uid in recipients:
         lang = _pick_lang(uid)
         body = (text_en if lang == "en" else text_ar) or (text_ar or text_en)
@@ -164,7 +191,7 @@ async def broadcast(
             if delivery == "push":
                 m = await bot.send_message(uid, body)
                 if ping_ttl > 0:
-                    asyncio.create_task(_auto_delete(bot, uid, m.message_id, ping_ttl))
+                    _auto_delete(uid, m.message_id, ping_ttl)
             else:
                 title = "🔔 إشعار جديد" if lang == "ar" else "🔔 New alert"
                 open_btn = "فتح الإشعار" if lang == "ar" else "Open alert"
@@ -177,7 +204,7 @@ async def broadcast(
                 ])
                 m = await bot.send_message(uid, title, reply_markup=kb)
                 if ping_ttl > 0:
-                    asyncio.create_task(_auto_delete(bot, uid, m.message_id, ping_ttl))
+                    _auto_delete(uid, m.message_id, ping_ttl)
 
             sent += 1
         except (TelegramForbiddenError, TelegramBadRequest):
@@ -187,5 +214,4 @@ async def broadcast(
 
         await asyncio.sleep(delay)
 
-    _inc_stats(kind, sent)
     return (sent, skipped, failed)
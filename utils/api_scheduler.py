@@ -0,0 +1,220 @@
+# utils/api_scheduler.py
+from __future__ import annotations
+
+import os, time, asyncio, logging, contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+# مُجدول الطلبات الصادرة على مستوى جلسة البوت (AiohttpSession):
+# - دلو رموز عام (~30 رسالة/ث) + دلو لكل دردشة (1/ث للخاص، 20/د للمجموعات).
+# - أولويات: التفاعلي (الافتراضي) يسبق الجماعي؛ الجماعي لا يستهلك آخر
+#   API_BULK_RESERVE رموز ويتنحّى ما دام هناك تفاعلي ينتظر الدلو العام
+#   (لا من ينتظر دلو دردشته فقط).
+#   الجماعي يُعلَّم بـ: with bulk_priority(): ...
+# - TelegramRetryAfter يُحترم مركزيًا (إيقاف الدردشة، والعام عند العاصفة)
+#   ثم يُعاد الطلب من make_request (مصنع طلب جديد، وليس coroutine مستهلكة).
+# - أخطاء الشبكة تُعاد فقط للطرق غير المُرسِلة (تجنّب رسائل مكررة).
+
+log = logging.getLogger(__name__)
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip())
+    except Exception:
+        return default
+
+GLOBAL_RATE    = _env_float("API_GLOBAL_RATE", 28.0)       # رسالة/ثانية
+GLOBAL_BURST   = _env_float("API_GLOBAL_BURST", 30.0)
+PRIVATE_RATE   = _env_float("API_CHAT_RATE", 1.0)
+PRIVATE_BURST  = _env_float("API_CHAT_BURST", 3.0)
+GROUP_RATE     = _env_float("API_GROUP_RATE", 20.0 / 60.0)
+GROUP_BURST    = _env_float("API_GROUP_BURST", 3.0)
+BULK_RESERVE   = _env_float("API_BULK_RESERVE", 5.0)        # رموز محجوزة للتفاعلي
+MAX_RETRIES    = int(_env_float("API_MAX_RETRIES", 3))
+MAX_CHATS      = int(_env_float("API_MAX_CHAT_BUCKETS", 50000))
+STORM_WINDOW   = 10.0
+STORM_CHATS    = 3     # RetryAfter من 3 دردشات مختلفة خلال النافذة → إيقاف عام
+
+INTERACTIVE, BULK = 0, 1
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("api_priority", default=INTERACTIVE)
+
+# الطرق التي تُحتسب ضمن حدود الإرسال (بأسماء Bot API)
+_LIMITED_PREFIXES = ("send", "copy", "forward", "edit")
+_NON_IDEMPOTENT   = ("send", "copy", "forward")
+
+
+@contextmanager
+def bulk_priority():
+    """كل طلبات Bot API داخل هذا السياق تُعامل كجماعية (بث/تذكيرات/إشعارات أدمن)."""
+    token = _priority.set(BULK)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Bucket:
+    __slots__ = ("rate", "burst", "tokens", "ts", "paused_until")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(0.001, rate)
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.ts = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.ts:
+            self.tokens = min(self.burst, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+
+    def delay(self, now: float, need: float = 1.0) -> float:
+        """كم ننتظر حتى يتوفر need رمز (0 = متاح الآن)."""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= need:
+            return 0.0
+        return (need - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1.0
+
+
+class ApiScheduler(BaseRequestMiddleware):
+    """
+    التسجيل:
+        session = AiohttpSession(...)
+        session.middleware(ApiScheduler())
+    """
+
+    def __init__(self):
+        self._global = _Bucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._chats: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self._waiting = [0, 0]                      # عدد المنتظرين لكل أولوية
+        self._blocked_global = 0                    # تفاعليون دلو دردشتهم جاهز وينتظرون الدلو العام فقط
+        self._storm: "OrderedDict[str, float]" = OrderedDict()
+        self.stats: Dict[str, float] = {"requests": 0, "throttled": 0, "wait_total": 0.0,
+                                        "retry_after": 0, "retries": 0, "global_pauses": 0}
+
+    # ---------- الدلاء ----------
+    def _chat_bucket(self, chat_id: Any) -> _Bucket:
+        key = str(chat_id)
+        b = self._chats.get(key)
+        if b is None:
+            is_group = key.startswith("-") or key.startswith("@")
+            b = _Bucket(GROUP_RATE, GROUP_BURST) if is_group else _Bucket(PRIVATE_RATE, PRIVATE_BURST)
+            self._chats[key] = b
+            if len(self._chats) > MAX_CHATS:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(key)
+        return b
+
+    async def _acquire(self, chat_id: Any, prio: int) -> None:
+        t0 = time.monotonic()
+        chat = self._chat_bucket(chat_id) if chat_id is not None else None
+        need = 1.0 + (BULK_RESERVE if prio == BULK else 0.0)
+        on_global = False   # هل هذا الطلب (التفاعلي) محسوب ضمن _blocked_global؟
+        self._waiting[prio] += 1
+        try:
+            while True:
+                now = time.monotonic()
+                chat_wait = chat.delay(now) if chat else 0.0
+                global_wait = self._global.delay(now, need)
+                if prio == INTERACTIVE:
+                    # من ينتظر دلو دردشته فقط لا يُوقف الجماعي لدردشات أخرى
+                    blocked = chat_wait <= 0 < global_wait
+                    if blocked != on_global:
+                        self._blocked_global += 1 if blocked else -1
+                        on_global = blocked
+                wait = max(chat_wait, global_wait)
+                if wait <= 0 and prio == BULK and self._blocked_global > 0:
+                    wait = 1.0 / self._global.rate  # تنحَّ للتفاعلي المحجوب على الدلو العام
+                if wait <= 0:
+                    self._global.take()
+                    if chat:
+                        chat.take()
+                    break
+                await asyncio.sleep(min(wait, 5.0))
+        finally:
+            self._waiting[prio] -= 1
+            if on_global:
+                self._blocked_global -= 1
+        waited = time.monotonic() - t0
+        if waited > 0.001:
+            self.stats["throttled"] += 1
+            self.stats["wait_total"] += waited
+
+    def _on_retry_after(self, chat_id: Any, retry_after: float) -> None:
+        now = time.monotonic()
+        until = now + retry_after
+        self.stats["retry_after"] += 1
+        if chat_id is not None:
+            b = self._chat_bucket(chat_id)
+            b.paused_until = max(b.paused_until, until)
+            key = str(chat_id)
+            self._storm[key] = now
+            self._storm.move_to_end(key)
+            while self._storm and next(iter(self._storm.values())) < now - STORM_WINDOW:
+                self._storm.popitem(last=False)
+        if chat_id is None or len(self._storm) >= STORM_CHATS:
+            if until > self._global.paused_until:
+                self._global.paused_until = until
+                self.stats["global_pauses"] += 1
+                log.warning(f"[api_scheduler] global pause {retry_after:.1f}s (flood control)")
+
+    # ---------- الوسيط ----------
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        api = getattr(method, "__api_method__", "") or ""
+        if not api.startswith(_LIMITED_PREFIXES):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        prio = _priority.get()
+        attempt = 0
+        while True:
+            await self._acquire(chat_id, prio)
+            self.stats["requests"] += 1
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= MAX_RETRIES:
+                    raise
+                self._on_retry_after(chat_id, float(getattr(e, "retry_after", 1) or 1))
+            except (TelegramNetworkError, TelegramServerError):
+                if attempt >= MAX_RETRIES or api.startswith(_NON_IDEMPOTENT):
+                    raise
+                await asyncio.sleep(min(10.0, 0.5 * (2 ** attempt)))
+            attempt += 1
+            self.stats["retries"] += 1
+
+
+_instance: Optional[ApiScheduler] = None
+
+def install(session) -> ApiScheduler:
+    """يسجّل المجدول على جلسة البوت (مرة واحدة) ويرجعه."""
+    global _instance
+    if _instance is None:
+        _instance = ApiScheduler()
+    session.middleware(_instance)
+    return _instance
+
+def scheduler_stats() -> Dict[str, Any]:
+    if _instance is None:
+        return {}
+    return dict(_instance.stats, chats=len(_instance._chats),
+                waiting_interactive=_instance._waiting[INTERACTIVE],
+                waiting_bulk=_instance._waiting[BULK],
+                blocked_global=_instance._blocked_global)
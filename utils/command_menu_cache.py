@@ -0,0 +1,105 @@
+# utils/command_menu_cache.py
+from __future__ import annotations
+
+import os, json, hashlib, logging, threading
+from typing import Dict, Iterable
+
+# بصمة قائمة الأوامر المضبوطة لكل دردشة (BotCommandScopeChat):
+# - البصمة = hash(lang + admin + الأوامر) — إن لم تتغيّر لا نستدعي set_my_commands.
+# - الحفظ إلحاقي في data/chat_commands.log بأسطر "chat_id<TAB>fp" (الأخير يفوز)،
+#   ويُضغط الملف عند التحميل إذا كثرت الأسطر المكررة.
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = "data"
+FP_FILE  = os.path.join(DATA_DIR, "chat_commands.log")
+
+_LOCK = threading.RLock()
+_fps: Dict[int, str] = {}
+_loaded = False
+
+
+def fingerprint(lang: str, is_admin: bool, commands: Iterable) -> str:
+    """بصمة ثابتة لقائمة أوامر (BotCommand أو أزواج (command, description))."""
+    items = []
+    for c in commands:
+        if isinstance(c, (tuple, list)):
+            items.append([str(c[0]), str(c[1])])
+        else:
+            items.append([str(getattr(c, "command", "")), str(getattr(c, "description", ""))])
+    raw = json.dumps([lang or "", bool(is_admin), items], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _append(chat_id: int, fp: str) -> None:
+    try:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        with open(FP_FILE, "a", encoding="utf-8") as f:
+            f.write(f"{int(chat_id)}\t{fp}\n")
+    except Exception as e:
+        log.warning(f"[command_menu_cache] append failed: {e}")
+
+
+def _compact_locked() -> None:
+    tmp = f"{FP_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for cid, fp in _fps.items():
+            f.write(f"{cid}\t{fp}\n")
+    os.replace(tmp, FP_FILE)
+
+
+def _ensure_loaded() -> None:
+    global _loaded
+    if _loaded:
+        return
+    with _LOCK:
+        if _loaded:
+            return
+        lines = 0
+        try:
+            with open(FP_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    cid, _, fp = line.rstrip("\n").partition("\t")
+                    try:
+                        cid_i = int(cid)
+                    except Exception:
+                        continue
+                    if fp and fp != "-":
+                        _fps[cid_i] = fp
+                    else:
+                        _fps.pop(cid_i, None)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning(f"[command_menu_cache] load failed: {e}")
+        if lines > 1000 and lines > 2 * len(_fps):
+            try:
+                _compact_locked()
+            except Exception as e:
+                log.warning(f"[command_menu_cache] compaction failed: {e}")
+        _loaded = True
+
+
+def is_current(chat_id: int, fp: str) -> bool:
+    _ensure_loaded()
+    return _fps.get(int(chat_id)) == fp
+
+
+def mark(chat_id: int, fp: str) -> bool:
+    """يسجّل البصمة. يرجع False إن كانت مسجّلة مسبقًا (لا حاجة لاستدعاء API)."""
+    _ensure_loaded()
+    with _LOCK:
+        if _fps.get(int(chat_id)) == fp:
+            return False
+        _fps[int(chat_id)] = fp
+        _append(chat_id, fp)
+    return True
+
+
+def forget(chat_id: int) -> None:
+    """يمسح بصمة الدردشة (مثلًا بعد فشل set_my_commands) لتُعاد المحاولة لاحقًا."""
+    _ensure_loaded()
+    with _LOCK:
+        if _fps.pop(int(chat_id), None) is not None:
+            _append(chat_id, "-")
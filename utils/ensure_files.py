@@ -21,41 +21,46 @@ AR_KEYS = {
     "unknown_gate.unknown_user": "⛔ هذا البوت مقيَّد. أرسل /start أولاً."
 }
 
-def _load_json(p: Path) -> dict:
+def _load_json(p: Path) -> dict | None:
+    """يرجع {} إن لم يوجد الملف، و None إن كان تالفًا (لا نكتب فوقه)."""
     if not p.exists():
         return {}
     try:
         with p.open("r", encoding="utf-8") as f:
             data = json.load(f)
-        return data if isinstance(data, dict) else {}
+        return data if isinstance(data, dict) else None
     except Exception:
-        return {}
+        return None
+
+def _dump(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False, indent=2)
 
-def _save_json(p: Path, data: dict) -> None:
+def _save_json(p: Path, data: dict) -> bool:
+    """يكتب بشكل ذرّي فقط إذا اختلف المحتوى فعليًا. يرجع True إن كتب."""
+    text = _dump(data)
+    try:
+        if p.exists() and p.read_text(encoding="utf-8") == text:
+            return False
+    except Exception:
+        pass
     p.parent.mkdir(parents=True, exist_ok=True)
-    with p.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, p)
+    return True
 
-def _ensure_locales():
-    # EN
-    en = _load_json(EN)
-    changed = False
-    for k, v in EN_KEYS.items():
-        if en.get(k) != v:
-            en[k] = v
-            changed = True
-    if changed or not EN.exists():
-        _save_json(EN, en)
+def _merge_keys(p: Path, keys: dict) -> None:
+    data = _load_json(p)
+    if data is None:
+        return  # ملف تالف: لا نستبدله بمفاتيحنا فقط
+    missing = {k: v for k, v in keys.items() if data.get(k) != v}
+    if missing or not p.exists():
+        data.update(missing)
+        _save_json(p, data)
 
-    # AR
-    ar = _load_json(AR)
-    changed = False
-    for k, v in AR_KEYS.items():
-        if ar.get(k) != v:
-            ar[k] = v
-            changed = True
-    if changed or not AR.exists():
-        _save_json(AR, ar)
+def _ensure_locales():
+    _merge_keys(EN, EN_KEYS)
+    _merge_keys(AR, AR_KEYS)
 
 def _ensure_data_files():
     DATA.mkdir(parents=True, exist_ok=True)
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from typing import Optional, Tuple
 from aiogram import Bot
 from lang import t, get_user_lang
+from utils import gcra
 
 # ===== مسارات البيانات (محايدة، بدون VIP) =====
 DATA_DIR = "data"
@@ -18,6 +19,10 @@ ATTEMPT_WINDOW_MINUTES   = 10              # نافذة احتساب المحا
 BAN_STEPS_HOURS          = [1, 6, 12, 24]  # 1h → 6h → 12h → 24h (يثبت بعدها على 24h)
 STRIKE_DECAY_DAYS        = 7               # ينخفض مستوى التصعيد درجة كل 7 أيام من دون مخالفات
 
+# عدّ المحاولات: GCRA بمعدل WARN_THRESHOLD لكل نافذة (رقم واحد لكل مستخدم في الذاكرة)
+# — المحاولات العادية لا تكتب escalation_state.json، فقط الحظر وانقاص المستوى.
+_attempts = gcra.limiter("escalation.attempts", WARN_THRESHOLD, ATTEMPT_WINDOW_MINUTES * 60)
+
 os.makedirs(DATA_DIR, exist_ok=True)
 for p, default in [(BANS_FILE, {}), (STATE_FILE, {})]:
     if not os.path.exists(p):
@@ -107,7 +112,8 @@ def is_banned_now(user_id: int) -> Tuple[bool, Optional[int], Optional[str]]:
 async def process_attempt(bot: Bot, user_id: int, lang: str | None = None, chat_id: int | None = None):
     """
     تُستدعى عندما يحاول مستخدم الدخول لميزة محجوبة.
-    - عند وصول عدد المحاولات في النافذة إلى WARN_THRESHOLD ⇒ رسالة تحذير.
+    - عند وصول عدد المحاولات في النافذة إلى WARN_THRESHOLD ⇒ رسالة تحذير
+      (المحاولات تُعدّ بـ GCRA: تستعيد محاولة كل ATTEMPT_WINDOW_MINUTES/WARN_THRESHOLD).
     - بعدها ⇒ حظر مؤقت بمدة تصاعدية: 1h → 6h → 12h → 24h (ثم يثبت على 24h).
     - تستخدم مفاتيح ترجمة عامة:
         • rate_warn: "Warning: you made {attempts} attempts in a short time.\nIf you continue, you will be temporarily banned for {duration}."
@@ -132,80 +138,61 @@ async def process_attempt(bot: Bot, user_id: int, lang: str | None = None, chat_
             pass
         return
 
-    # سجلّ المستخدم في حالة الإساءة
-    u = state.get(str(user_id), {
-        "count": 0,
-        "window_until": (_now() + timedelta(minutes=ATTEMPT_WINDOW_MINUTES)).isoformat(),
-        "warned": False,
+    # سجلّ التصعيد الدائم (المستوى وموعد الانقاص فقط؛ عدّ المحاولات في الذاكرة)
+    key = str(user_id)
+    u = state.get(key) or {
         "strike": 0,
         "decay_at": (_now() + timedelta(days=STRIKE_DECAY_DAYS)).isoformat(),
-        "last_ban_at": None
-    })
-
-    # تطبيق الانقاص التلقائي
+        "last_ban_at": None,
+    }
+    before = (u.get("strike", 0), u.get("decay_at"))
     u = _decay_strike(u)
-
-    # إعادة ضبط النافذة إن انتهت
-    try:
-        if _now() >= datetime.fromisoformat(u["window_until"]):
-            u["count"] = 0
-            u["warned"] = False
-            u["window_until"] = (_now() + timedelta(minutes=ATTEMPT_WINDOW_MINUTES)).isoformat()
-    except Exception:
-        u["window_until"] = (_now() + timedelta(minutes=ATTEMPT_WINDOW_MINUTES)).isoformat()
-
-    # تسجيل المحاولة الحالية
-    u["count"] += 1
-
-    # 1) التحذير عند الوصول للحد
-    if u["count"] == WARN_THRESHOLD and not u.get("warned", False):
-        next_idx = min(u.get("strike", 0), len(BAN_STEPS_HOURS) - 1)
-        next_seconds = int(BAN_STEPS_HOURS[next_idx] * 3600)
-        text = (t(lang, "rate_warn") or "⚠️ Warning: you made {attempts} attempts. Continuing may lead to a temporary ban for {duration}.") \
-            .replace("{attempts}", str(u["count"])) \
-            .replace("{duration}", _human_duration(next_seconds, lang))
-        try:
-            await bot.send_message(send_to, text, parse_mode="HTML", disable_web_page_preview=True)
-        except Exception:
-            pass
-        u["warned"] = True
-        state[str(user_id)] = u
-        _save(STATE_FILE, state)
+    for legacy in ("count", "window_until", "warned"):   # حقول النافذة القديمة
+        u.pop(legacy, None)
+
+    # 1) محاولة ضمن الحد: تحذير عندما تكون التالية سببًا للحظر
+    if _attempts.hit(user_id) == 0.0:
+        if _attempts.retry_after(user_id) > 0:
+            next_idx = min(u.get("strike", 0), len(BAN_STEPS_HOURS) - 1)
+            next_seconds = int(BAN_STEPS_HOURS[next_idx] * 3600)
+            text = (t(lang, "rate_warn") or "⚠️ Warning: you made {attempts} attempts. Continuing may lead to a temporary ban for {duration}.") \
+                .replace("{attempts}", str(WARN_THRESHOLD)) \
+                .replace("{duration}", _human_duration(next_seconds, lang))
+            try:
+                await bot.send_message(send_to, text, parse_mode="HTML", disable_web_page_preview=True)
+            except Exception:
+                pass
+        if key in state and (u.get("strike", 0), u.get("decay_at")) != before:
+            state[key] = u
+            _save(STATE_FILE, state)
         return
 
-    # 2) بعد التحذير: حظر تصاعدي
-    if u["count"] > WARN_THRESHOLD:
-        idx = min(u.get("strike", 0), len(BAN_STEPS_HOURS) - 1)
-        seconds = int(BAN_STEPS_HOURS[idx] * 3600)
-        until = _now() + timedelta(seconds=seconds)
-
-        # سجلّ الحظر
-        bans[str(user_id)] = {"until": until.isoformat()}
-        _save(BANS_FILE, bans)
-
-        # تصفير العداد ورفع مستوى التصعيد
-        u["count"] = 0
-        u["warned"] = False
-        u["strike"] = min(u.get("strike", 0) + 1, len(BAN_STEPS_HOURS) - 1)
-        u["last_ban_at"] = _now().isoformat()
-        u["decay_at"] = (_now() + timedelta(days=STRIKE_DECAY_DAYS)).isoformat()
-        state[str(user_id)] = u
-        _save(STATE_FILE, state)
-
-        # رسالة الحظر — تستخدم rate_banned
-        text = (t(lang, "rate_banned") or "⏱️ You have been temporarily banned for {duration}. You may try again after: {until}.") \
-            .replace("{duration}", _human_duration(seconds, lang)) \
-            .replace("{until}", _fmt(until.isoformat()))
-        try:
-            await bot.send_message(send_to, text, parse_mode="HTML", disable_web_page_preview=True)
-        except Exception:
-            pass
-        return
+    # 2) تجاوز الحد بعد التحذير: حظر تصاعدي
+    _attempts.reset(user_id)
+    idx = min(u.get("strike", 0), len(BAN_STEPS_HOURS) - 1)
+    seconds = int(BAN_STEPS_HOURS[idx] * 3600)
+    until = _now() + timedelta(seconds=seconds)
 
-    # 3) أقل من حد التحذير → حفظ الحالة فقط
-    state[str(user_id)] = u
+    # سجلّ الحظر
+    bans[key] = {"until": until.isoformat()}
+    _save(BANS_FILE, bans)
+
+    # رفع مستوى التصعيد
+    u["strike"] = min(u.get("strike", 0) + 1, len(BAN_STEPS_HOURS) - 1)
+    u["last_ban_at"] = _now().isoformat()
+    u["decay_at"] = (_now() + timedelta(days=STRIKE_DECAY_DAYS)).isoformat()
+    state[key] = u
     _save(STATE_FILE, state)
 
+    # رسالة الحظر — تستخدم rate_banned
+    text = (t(lang, "rate_banned") or "⏱️ You have been temporarily banned for {duration}. You may try again after: {until}.") \
+        .replace("{duration}", _human_duration(seconds, lang)) \
+        .replace("{until}", _fmt(until.isoformat()))
+    try:
+        await bot.send_message(send_to, text, parse_mode="HTML", disable_web_page_preview=True)
+    except Exception:
+        pass
+
 def on_manual_unban(user_id: int):
     """
     تُستدعى اختياريًا بعد إلغاء حظر يدوي.
@@ -0,0 +1,234 @@
+# utils/fsm_storage.py
+from __future__ import annotations
+
+import os, json, time, sqlite3, asyncio, logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType
+try:
+    from aiogram.fsm.storage.base import DefaultKeyBuilder, KeyBuilder
+except ImportError:  # aiogram < 3.4
+    from aiogram.fsm.storage.redis import DefaultKeyBuilder, KeyBuilder  # type: ignore
+
+from utils.metrics import observe_store
+
+# تخزين FSM دائم على SQLite بدل MemoryStorage:
+# - WAL + كاتب واحد (خيط مخصص) — كل عمليات SQLite تمر عبر نفس الخيط.
+# - القراءة من كاش في الذاكرة؛ قاعدة البيانات تُقرأ مرة واحدة لكل مفتاح.
+# - الكتابة مؤجّلة ومجمّعة (FSM_FLUSH_MS) في معاملة واحدة.
+# - الحالات المهجورة تنتهي بعد FSM_STATE_TTL ثانية (تُحذف من الكاش والقاعدة).
+
+log = logging.getLogger(__name__)
+
+FSM_DB_PATH   = os.getenv("FSM_DB_PATH", os.path.join("data", "fsm.sqlite3"))
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", str(2 * 24 * 3600)))
+FSM_FLUSH_MS  = int(os.getenv("FSM_FLUSH_MS", "50"))
+_PURGE_EVERY  = 300
+
+
+class _Entry:
+    __slots__ = ("state", "data", "ts")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], ts: float):
+        self.state = state
+        self.data = data
+        self.ts = ts
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    BaseStorage على SQLite متوافق مع KeyBuilder في aiogram 3.
+    الاستخدام:
+        storage = SQLiteStorage()
+        dp = Dispatcher(storage=storage)
+        dp.shutdown.register(storage.close)
+    """
+
+    def __init__(
+        self,
+        path: str = FSM_DB_PATH,
+        *,
+        key_builder: Optional[KeyBuilder] = None,
+        state_ttl: int = FSM_STATE_TTL,
+        flush_ms: int = FSM_FLUSH_MS,
+    ) -> None:
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self.path = path
+        self.state_ttl = max(0, int(state_ttl))
+        self.flush_delay = max(0, int(flush_ms)) / 1000.0
+
+        self._cache: Dict[str, _Entry] = {}
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_purge = time.time()
+        self._closed = False
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._db = self._executor.submit(self._open).result()
+
+    # ---------- SQLite (خيط الكاتب فقط) ----------
+    def _open(self) -> sqlite3.Connection:
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY, state TEXT, data TEXT NOT NULL DEFAULT '{}',"
+            " updated_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS fsm_updated ON fsm(updated_at)")
+        return db
+
+    def _select(self, key: str) -> Optional[tuple]:
+        return self._db.execute(
+            "SELECT state, data, updated_at FROM fsm WHERE key = ?", (key,)
+        ).fetchone()
+
+    def _write_batch(self, upserts: list, deletes: list, purge_before: Optional[float]) -> None:
+        db = self._db
+        db.execute("BEGIN")
+        try:
+            if upserts:
+                db.executemany(
+                    "INSERT INTO fsm(key, state, data, updated_at) VALUES(?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET state=excluded.state, data=excluded.data, "
+                    "updated_at=excluded.updated_at",
+                    upserts,
+                )
+            if deletes:
+                db.executemany("DELETE FROM fsm WHERE key = ?", deletes)
+            if purge_before is not None:
+                db.execute("DELETE FROM fsm WHERE updated_at < ?", (purge_before,))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # ---------- الكاش ----------
+    def _expired(self, e: _Entry, now: float) -> bool:
+        return bool(self.state_ttl) and (e.state is not None or e.data) and now - e.ts > self.state_ttl
+
+    async def _entry(self, key: StorageKey) -> tuple[str, _Entry]:
+        k = self.key_builder.build(key)
+        e = self._cache.get(k)
+        if e is None:
+            t0 = time.perf_counter()
+            row = await self._run(self._select, k)
+            observe_store("fsm", "load", time.perf_counter() - t0, len(row[1] or "") if row else 0)
+            e = self._cache.get(k)  # ربما كُتب أثناء الانتظار
+            if e is None:
+                if row:
+                    try:
+                        data = json.loads(row[1] or "{}")
+                    except Exception:
+                        data = {}
+                    e = _Entry(row[0], data if isinstance(data, dict) else {}, float(row[2]))
+                else:
+                    e = _Entry(None, {}, time.time())
+                self._cache[k] = e
+        if self._expired(e, time.time()):
+            e.state, e.data, e.ts = None, {}, time.time()
+            self._mark(k)
+        return k, e
+
+    def _mark(self, k: str) -> None:
+        self._dirty.add(k)
+        if self._flush_task is None and not self._closed:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            if self.flush_delay:
+                await asyncio.sleep(self.flush_delay)
+        finally:
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """يكتب كل التغييرات المعلّقة في معاملة واحدة."""
+        if not self._dirty:
+            return
+        keys, self._dirty = self._dirty, set()
+        upserts, deletes = [], []
+        for k in keys:
+            e = self._cache.get(k)
+            if e is None or (e.state is None and not e.data):
+                deletes.append((k,))
+                continue
+            try:
+                upserts.append((k, e.state, json.dumps(e.data, ensure_ascii=False), e.ts))
+            except (TypeError, ValueError) as ex:
+                # قيمة غير قابلة للتسلسل: تبقى في الكاش فقط (مثل MemoryStorage)
+                log.warning(f"[fsm_storage] data for {k} not JSON-serializable, kept in memory: {ex}")
+
+        now = time.time()
+        purge_before = None
+        if self.state_ttl and now - self._last_purge > _PURGE_EVERY:
+            self._last_purge = now
+            purge_before = now - self.state_ttl
+            for k in [k for k, e in self._cache.items() if now - e.ts > self.state_ttl and k not in self._dirty]:
+                self._cache.pop(k, None)
+        t0 = time.perf_counter()
+        try:
+            await self._run(self._write_batch, upserts, deletes, purge_before)
+        except Exception as ex:
+            log.warning(f"[fsm_storage] flush failed, will retry: {ex}")
+            self._dirty |= keys
+            if not self._closed and self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush_later())
+            return
+        observe_store("fsm", "save", time.perf_counter() - t0, sum(len(u[2]) for u in upserts))
+        # الإدخالات الفارغة لا داعي لبقائها في الكاش بعد حذفها من القاعدة
+        for (k,) in deletes:
+            e = self._cache.get(k)
+            if e is not None and e.state is None and not e.data and k not in self._dirty:
+                self._cache.pop(k, None)
+
+    # ---------- واجهة BaseStorage ----------
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k, e = await self._entry(key)
+        e.state = state.state if isinstance(state, State) else state
+        e.ts = time.time()
+        self._mark(k)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        _, e = await self._entry(key)
+        return e.state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        k, e = await self._entry(key)
+        e.data = dict(data)
+        e.ts = time.time()
+        self._mark(k)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, e = await self._entry(key)
+        return dict(e.data)
+
+    async def update_data(self, key: StorageKey, data: Dict[str, Any]) -> Dict[str, Any]:
+        k, e = await self._entry(key)
+        e.data = {**e.data, **data}
+        e.ts = time.time()
+        self._mark(k)
+        return dict(e.data)
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        try:
+            await self._run(self._db.close)
+        finally:
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,147 @@
+# utils/gcra.py
+from __future__ import annotations
+
+import os, math, time, logging
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# محدِّد معدّل GCRA (Generic Cell Rate Algorithm) بذاكرة ثابتة لكل مفتاح:
+# - لكل مفتاح رقم واحد فقط: TAT (الوقت النظري لوصول الطلب التالي).
+# - limit طلب كل period ثانية مع اندفاع حتى burst (افتراضيًا = limit).
+# - المفتاح الخامل (TAT <= الآن) مكافئ تمامًا لمفتاح غير موجود، فالضغط
+#   (compact) يحذفه بلا أي فقد للدقّة.
+# - الضغط تلقائي ومُطفأ الكلفة: عند تضاعف عدد المفاتيح منذ آخر ضغط،
+#   وأيضًا دوريًا عبر run_compaction_loop() لكل المحدِّدات المسجّلة.
+#
+#   lim = limiter("rewards.cooldown.5s", 1, 5)
+#   if not lim.allow((uid, "daily_click")): ...
+#   wait = lim.hit(uid)      # 0.0 = مسموح، وإلا ثوانٍ حتى السماح
+
+log = logging.getLogger(__name__)
+
+COMPACT_SEC = max(10, int(os.getenv("GCRA_COMPACT_SEC", "300")))
+_MIN_COMPACT = 1024
+
+
+def _over(wait: float, at: float) -> bool:
+    """wait > 0 مع سماحية لأخطاء تراكم الفواصل العشرية (آخر طلب في الاندفاع
+    يعطي wait ≈ 1e-16 بدل 0). السماحية نسبية لمقدار الوقت (ساعة الحائط ~1e9)."""
+    return wait > 1e-9 + 64 * math.ulp(at)
+
+
+class Limiter:
+    __slots__ = ("name", "limit", "period", "burst", "clock", "_t", "_window",
+                 "_tat", "_next_compact", "_stats")
+
+    def __init__(self, name: str, limit: float, period: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if limit <= 0 or period <= 0:
+            raise ValueError("limit and period must be positive")
+        self.name = name
+        self.limit = float(limit)
+        self.period = float(period)
+        self.burst = float(burst if burst is not None else limit)
+        self.clock = clock
+        self._t = self.period / self.limit          # فاصل الإصدار لكل طلب
+        self._window = self._t * self.burst          # أقصى تقدّم مسموح لـ TAT عن الآن
+        self._tat: Dict[Hashable, float] = {}
+        self._next_compact = _MIN_COMPACT
+        self._stats = {"allowed": 0, "limited": 0, "evicted": 0}
+
+    def hit(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """يستهلك cost إن أمكن ويرجع 0.0، وإلا يرجع ثواني الانتظار (بلا استهلاك)."""
+        if now is None:
+            now = self.clock()
+        tat = self._tat.get(key, now)
+        if tat < now:
+            tat = now
+        new_tat = tat + self._t * cost
+        wait = new_tat - now - self._window
+        if _over(wait, new_tat):
+            self._stats["limited"] += 1
+            return wait
+        self._tat[key] = new_tat
+        self._stats["allowed"] += 1
+        if len(self._tat) >= self._next_compact:
+            self.compact(now)
+        return 0.0
+
+    def allow(self, key: Hashable, cost: float = 1.0) -> bool:
+        return self.hit(key, cost) == 0.0
+
+    def retry_after(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """مثل hit لكن بلا استهلاك."""
+        if now is None:
+            now = self.clock()
+        tat = max(self._tat.get(key, now), now)
+        new_tat = tat + self._t * cost
+        wait = new_tat - now - self._window
+        return wait if _over(wait, new_tat) else 0.0
+
+    def level(self, key: Hashable, now: Optional[float] = None) -> float:
+        """عدد الطلبات "المستهلكة" حاليًا من الاندفاع (0..burst)."""
+        if now is None:
+            now = self.clock()
+        return max(0.0, self._tat.get(key, now) - now) / self._t
+
+    def seed(self, key: Hashable, tat: float) -> None:
+        """يضبط TAT مباشرة (استعادة حالة محفوظة، مثل آخر بلاغ + المدة)."""
+        self._tat[key] = float(tat)
+
+    def reset(self, key: Hashable) -> None:
+        self._tat.pop(key, None)
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """يحذف المفاتيح الخاملة؛ يرجع عدد المحذوف."""
+        if now is None:
+            now = self.clock()
+        before = len(self._tat)
+        self._tat = {k: v for k, v in self._tat.items() if v > now}
+        evicted = before - len(self._tat)
+        self._stats["evicted"] += evicted
+        self._next_compact = max(_MIN_COMPACT, 2 * len(self._tat))
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats, keys=len(self._tat), limit=self.limit, period=self.period)
+
+
+_LIMITERS: Dict[str, Limiter] = {}
+
+def limiter(name: str, limit: float, period: float, burst: Optional[float] = None, *,
+            clock: Callable[[], float] = time.monotonic,
+            seed: Optional[Callable[[Limiter], None]] = None) -> Limiter:
+    """يرجع المحدِّد المسجّل بهذا الاسم أو ينشئه (seed يُستدعى مرة عند الإنشاء)."""
+    lim = _LIMITERS.get(name)
+    if lim is None:
+        lim = Limiter(name, limit, period, burst, clock)
+        if seed is not None:
+            try:
+                seed(lim)
+            except Exception as e:
+                log.warning(f"[gcra] seeding {name} failed: {e}")
+        _LIMITERS[name] = lim
+    return lim
+
+def limiters(prefix: str = "") -> List[Limiter]:
+    return [lim for n, lim in list(_LIMITERS.items()) if n.startswith(prefix)]
+
+def compact_all() -> int:
+    return sum(lim.compact() for lim in limiters())
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {n: lim.stats() for n, lim in list(_LIMITERS.items())}
+
+async def run_compaction_loop() -> None:
+    """ضغط دوري يطرد مفاتيح المستخدمين الذين غادروا حتى بلا نمو جديد."""
+    import asyncio
+    while True:
+        await asyncio.sleep(COMPACT_SEC)
+        try:
+            n = compact_all()
+            if n:
+                log.debug(f"[gcra] compacted {n} idle key(s)")
+        except Exception as e:
+            log.warning(f"[gcra] compaction failed: {e}")
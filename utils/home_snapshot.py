@@ -0,0 +1,248 @@
+# utils/home_snapshot.py
+from __future__ import annotations
+
+import os, json, time, asyncio, logging, threading
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+# لقطة الشاشة الرئيسية (home_hero.render_home_card) من الذاكرة:
+# - الأجزاء العامة (عدد المستخدمين، البثوث النشطة، الإشعارات النشطة، الإصدار)
+#   محسوبة مسبقًا وتُحدَّث في الخلفية كل HOME_SNAPSHOT_SEC أو فورًا بعد mark_dirty().
+# - الأجزاء الخاصة بالمستخدم (VIP/مروّج/صندوق الإشعارات/إعدادات البطاقة) من
+#   "مشاهد ملفات" تُعاد قراءتها فقط عند تغيّر mtime/الحجم (os.stat بدل json.load).
+# - المورّد عبر utils.suppliers.is_supplier (مخزّن بالفعل حسب mtime).
+
+log = logging.getLogger(__name__)
+
+REFRESH_SEC = max(5, int(os.getenv("HOME_SNAPSHOT_SEC", "30")))
+MIN_GAP_SEC = 1.0   # أقل فاصل بين تحديثين متتاليين عند تتابع mark_dirty
+
+DATA_DIR         = Path("data")
+USERBOX_FILE     = DATA_DIR / "alerts_userbox.json"
+KNOWN_USERS_FILE = DATA_DIR / "known_users.json"
+
+
+class _FileView:
+    """قيمة مشتقة من ملف JSON تُعاد حسابها فقط عند تغيّر (mtime_ns, size, inode)."""
+
+    def __init__(self, path: Callable[[], Any], derive: Callable[[Any], Any], default: Any):
+        self._path = path
+        self._derive = derive
+        self._default = default
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._value = default
+        self._lock = threading.Lock()
+        self._resolved: Any = None
+        self._retry_at = 0.0
+
+    def _resolve(self) -> Any:
+        if self._resolved is None and time.monotonic() >= self._retry_at:
+            try:
+                self._resolved = self._path()
+            except Exception as e:
+                self._retry_at = time.monotonic() + 60
+                log.debug(f"[home_snapshot] source unavailable: {e}")
+        return self._resolved
+
+    def get(self) -> Any:
+        path = self._resolve()
+        if path is None:
+            return self._value
+        try:
+            st = os.stat(path)
+            stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            stamp = None
+        if stamp == self._stamp:
+            return self._value
+        with self._lock:
+            if stamp != self._stamp:
+                try:
+                    raw = None
+                    if stamp is not None:
+                        with open(path, "r", encoding="utf-8") as f:
+                            raw = json.load(f)
+                    self._value = self._derive(raw)
+                except Exception as e:
+                    log.debug(f"[home_snapshot] reload {path} failed: {e}")   # نُبقي القيمة السابقة
+                self._stamp = stamp
+        return self._value
+
+
+# ---------- مشاهد الملفات (لكل مستخدم) ----------
+def _vip_path():
+    from utils.vip_store import VIP_FILE
+    return VIP_FILE
+
+def _derive_vips(raw) -> Dict[str, Dict[str, Any]]:
+    users = (raw or {}).get("users") if isinstance(raw, dict) else None
+    return users if isinstance(users, dict) else {}
+
+def _promoters_path():
+    from handlers.promoter import STORE_FILE
+    return STORE_FILE
+
+def _derive_promoters(raw) -> FrozenSet[str]:
+    from handlers.promoter import _users_map_from_any, _promoter_active
+    return frozenset(uid for uid, u in _users_map_from_any(raw).items() if _promoter_active(u))
+
+def _derive_userbox(raw) -> Dict[str, Any]:
+    return raw if isinstance(raw, dict) else {}
+
+def _cfg_path():
+    from utils.home_card_cfg import CFG_FILE
+    return CFG_FILE
+
+def _derive_cfg(raw) -> Dict[str, Any]:
+    from utils.home_card_cfg import DEFAULT_CFG
+    out = DEFAULT_CFG.copy()
+    if isinstance(raw, dict):
+        out.update(raw)
+    return out
+
+_vips      = _FileView(_vip_path, _derive_vips, {})
+_promoters = _FileView(_promoters_path, _derive_promoters, frozenset())
+_userbox   = _FileView(lambda: USERBOX_FILE, _derive_userbox, {})
+_cfg       = _FileView(_cfg_path, _derive_cfg, {})
+
+
+def card_cfg() -> Dict[str, Any]:
+    """نفس get_cfg() لكن بلا قراءة ملف ما لم يتغيّر (لا تعدّل القاموس المُرجع)."""
+    return _cfg.get()
+
+
+# ---------- الأجزاء العامة ----------
+_global: Dict[str, Any] = {}
+_dirty: Optional[asyncio.Event] = None   # يُنشأ داخل الحلقة
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_tid: Optional[int] = None
+_last_refresh = 0.0
+
+def _count_known_users() -> Optional[int]:
+    try:
+        data = json.loads(KNOWN_USERS_FILE.read_text("utf-8"))
+        if isinstance(data, dict):
+            return len([k for k in data.keys() if str(k).isdigit()])
+        if isinstance(data, list):
+            return len(data)
+    except Exception:
+        pass
+    return None
+
+def _read_files() -> Dict[str, Any]:
+    """قراءات ملفات فقط (آمنة في خيط عامل): المستخدمون، الإشعارات النشطة، الإصدار."""
+    out: Dict[str, Any] = {"users_count": _count_known_users()}
+    try:
+        from utils.alerts_broadcast import _load_active
+        out["alerts"] = _load_active()
+    except Exception:
+        out["alerts"] = []
+    try:
+        from handlers.home_hero import _get_app_version
+        out["app_ver"] = _get_app_version()
+    except Exception:
+        out["app_ver"] = None
+    return out
+
+def _build(files: Dict[str, Any]) -> Dict[str, Any]:
+    """يكمل اللقطة على خيط الحلقة: عدّ البثوث يمرّ بمخزن يكتب (حذف المنتهي)."""
+    global _global, _last_refresh
+    snap: Dict[str, Any] = {"users_count": files.get("users_count"), "app_ver": files.get("app_ver")}
+    try:
+        from utils.promoter_live_store import count_active_lives
+        snap["live_n"] = int(count_active_lives())
+    except Exception:
+        snap["live_n"] = 0
+    try:
+        from utils.alerts_broadcast import _gc_active
+        active = _gc_active(files.get("alerts") or [])
+        snap["alert_ids"] = tuple(a["id"] for a in active if "id" in a)
+        exps = [int(a["expires"]) for a in active if a.get("expires")]
+        snap["alerts_expire_at"] = min(exps) if exps else None
+    except Exception:
+        snap["alert_ids"], snap["alerts_expire_at"] = (), None
+    snap["ts"] = time.time()
+    _global = snap            # استبدال ذرّي
+    _last_refresh = time.monotonic()
+    return snap
+
+def refresh() -> Dict[str, Any]:
+    """يعيد حساب الأجزاء العامة (متزامن، على خيط الحلقة)."""
+    return _build(_read_files())
+
+def global_view() -> Dict[str, Any]:
+    g = _global
+    if not g or (_dirty is None and time.monotonic() - _last_refresh > REFRESH_SEC):
+        g = refresh()    # أول استخدام، أو الحلقة الخلفية غير مشغّلة
+    exp = g.get("alerts_expire_at")
+    if exp and time.time() >= exp:
+        mark_dirty()      # إشعار انتهى: حدّث قريبًا (العرض الحالي يبقى صالحًا تقريبًا)
+    return g
+
+def mark_dirty() -> None:
+    """يُستدعى من الكُتّاب (بث مباشر/إشعارات) لتحديث اللقطة دون انتظار الدورة."""
+    ev, loop = _dirty, _loop
+    if ev is None or loop is None:
+        return
+    if threading.get_ident() == _loop_tid:
+        ev.set()
+    else:   # asyncio.Event ليس آمنًا بين الخيوط
+        try:
+            loop.call_soon_threadsafe(ev.set)
+        except RuntimeError:
+            pass   # الحلقة أُغلقت
+
+async def run_home_snapshot_loop() -> None:
+    global _dirty, _loop, _loop_tid
+    _loop, _loop_tid = asyncio.get_running_loop(), threading.get_ident()
+    _dirty = asyncio.Event()
+    while True:
+        try:
+            # القراءات فقط في الخيط؛ عدّ البثوث والتجميع على الحلقة (لا كتابة من خيط آخر)
+            _build(await asyncio.to_thread(_read_files))
+        except Exception as e:
+            log.warning(f"[home_snapshot] refresh failed: {e}")
+        try:
+            await asyncio.wait_for(_dirty.wait(), timeout=REFRESH_SEC)
+        except asyncio.TimeoutError:
+            pass
+        _dirty.clear()
+        gap = MIN_GAP_SEC - (time.monotonic() - _last_refresh)
+        if gap > 0:
+            await asyncio.sleep(gap)
+
+
+# ---------- الأجزاء الخاصة بالمستخدم ----------
+def user_view(uid: int) -> Dict[str, Any]:
+    key = str(uid)
+    meta = _vips.get().get(key)
+    exp = meta.get("expiry_ts") if isinstance(meta, dict) else None
+    if not isinstance(meta, dict):
+        is_vip = False
+    elif exp is None:
+        is_vip = True
+    else:
+        try:
+            is_vip = int(exp) > int(time.time())
+        except Exception:
+            is_vip = False
+
+    try:
+        from utils.suppliers import is_supplier
+        is_sup = bool(is_supplier(uid))
+    except Exception:
+        is_sup = False
+
+    box = _userbox.get().get(key) or {}
+    hidden = set(box.get("ignored", [])) | set(box.get("deleted", []))
+    seen = set(box.get("seen", []))
+    kept = [i for i in global_view().get("alert_ids", ()) if i not in hidden]
+
+    return {
+        "is_vip": is_vip,
+        "vip_expiry": exp if isinstance(exp, int) else None,
+        "is_supplier": is_sup,
+        "is_promoter": key in _promoters.get(),
+        "alerts_total": len(kept),
+        "alerts_unseen": sum(1 for i in kept if i not in seen),
+    }
@@ -4,10 +4,13 @@ import json, os, tempfile
 from pathlib import Path
 from typing import Any
 
+from utils.metrics import store_op
+
 def load_json(path: Path, default: Any) -> Any:
     if path.exists():
         try:
-            return json.loads(path.read_text(encoding="utf-8"))
+            with store_op(path.stem, "load", path):
+                return json.loads(path.read_text(encoding="utf-8"))
         except Exception:
             return default
     return default
@@ -16,9 +19,10 @@ def save_json(path: Path, data: Any) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     fd, tmpname = tempfile.mkstemp(prefix=path.name, dir=str(path.parent))
     try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        os.replace(tmpname, path)
+        with store_op(path.stem, "save", path):
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmpname, path)
     finally:
         try:
             if os.path.exists(tmpname):
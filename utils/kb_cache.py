@@ -0,0 +1,79 @@
+# utils/kb_cache.py
+from __future__ import annotations
+
+import os, logging
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import lang as _lang
+
+# ذاكرة لوحات الأزرار الثابتة لكل لغة/دور:
+#   @cached_markup("home.main")
+#   def _main_markup(lang, *, is_vip, is_promoter, ...) -> InlineKeyboardMarkup
+# المفتاح = وسائط الدالة + ختم الكتالوجات (lang.catalog_version) + حقبة الإبطال
+# + deps() اختياري (مثل mtime لملف إعدادات). تُرجع نفس الكائن المخزّن — لا تعدّله.
+# invalidate() يفرّغ الكل (تغيّر إعدادات)، وإعادة تحميل اللغات تُبطل تلقائيًا.
+
+log = logging.getLogger(__name__)
+
+ENABLED = os.getenv("KB_CACHE_ENABLED", "1").strip() not in ("0", "false", "False", "")
+
+_epoch = 0
+_caches: Dict[str, "OrderedDict[Hashable, Any]"] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def invalidate(reason: str = "") -> None:
+    """يُبطل كل اللوحات المخزّنة."""
+    global _epoch
+    _epoch += 1
+    for c in _caches.values():
+        c.clear()
+    if reason:
+        log.info(f"[kb_cache] invalidated ({reason})")
+
+
+def cached_markup(name: str, *, deps: Optional[Callable[[], Hashable]] = None, maxsize: int = 256):
+    """ديكوريتر لدالة بناء ترجع InlineKeyboardMarkup من وسائط قابلة للتجزئة."""
+    cache: "OrderedDict[Hashable, Any]" = _caches.setdefault(name, OrderedDict())
+    st = _stats.setdefault(name, {"hits": 0, "misses": 0})
+
+    def deco(fn: Callable[..., Any]):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            try:
+                key = (args, tuple(sorted(kwargs.items())), _lang._CATALOG_VERSION, _epoch,
+                       deps() if deps else None)
+                hit = cache.get(key)
+            except TypeError:      # وسيط غير قابل للتجزئة → بلا ذاكرة
+                return fn(*args, **kwargs)
+            if hit is not None:
+                st["hits"] += 1
+                return hit
+            st["misses"] += 1
+            markup = fn(*args, **kwargs)
+            cache[key] = markup
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+            return markup
+        wrapper.uncached = fn  # type: ignore[attr-defined]
+        return wrapper
+    return deco
+
+
+def file_stamp(path: str) -> Callable[[], Hashable]:
+    """deps جاهز: يتغيّر مع mtime/حجم الملف (تعديل خارجي يُبطل اللوحة)."""
+    def _stamp():
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+    return _stamp
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {n: dict(s, size=len(_caches.get(n) or ())) for n, s in _stats.items()}
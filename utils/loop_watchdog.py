@@ -0,0 +1,186 @@
+# utils/loop_watchdog.py
+from __future__ import annotations
+
+import os, sys, time, asyncio, logging, threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import metrics as _m
+
+# كاشف توقّف حلقة الأحداث:
+# - نبضة داخل الحلقة كل LOOP_TICK_MS تسجّل آخر وقت استيقاظ، وتقيس تأخّرها (lag).
+# - خيط مراقبة يفحص كل LOOP_SAMPLE_MS: إن لم تنبض الحلقة منذ أكثر من
+#   LOOP_STALL_MS نلتقط مكدّس الخيط الرئيسي (sys._current_frames) ونَنسب العيّنة
+#   إلى أعمق إطار من كود المشروع + الإطار الأعمق مطلقًا (json/PIL/...).
+# - التوقّف الطويل يُعيَّن عدة مرات، فعدد العيّنات × LOOP_SAMPLE_MS ≈ زمن الحجب.
+# - report(top) يعرض أكثر المواضع حجبًا (أمر الأدمن /loop_stalls).
+
+log = logging.getLogger(__name__)
+
+ENABLED   = os.getenv("LOOP_WATCHDOG_ENABLED", "1").strip() not in ("0", "false", "False", "")
+TICK      = max(0.005, float(os.getenv("LOOP_TICK_MS", "50")) / 1000.0)
+STALL     = max(0.01, float(os.getenv("LOOP_STALL_MS", "100")) / 1000.0)
+SAMPLE    = max(0.005, float(os.getenv("LOOP_SAMPLE_MS", "20")) / 1000.0)
+_MAX_SITES  = 500
+_STACK_KEEP = 4      # إطارات المشروع المحفوظة لكل موضع (للتقرير)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAG_SECONDS = _m.histogram("bot_loop_lag_seconds", "Event loop wake-up lag")
+STALLS      = _m.counter("bot_loop_stalls_total", "Event loop stalls over LOOP_STALL_MS")
+
+_lock = threading.Lock()
+_samples: "Counter[str]" = Counter()          # أعمق دالة من المشروع → عيّنات
+_leaves: Dict[str, "Counter[str]"] = {}       # الموضع → الإطارات الأعمق (json/PIL/...)
+_stall_hits: "Counter[str]" = Counter()       # عدد التوقّفات التي بدأت في هذا الموضع
+_stacks: Dict[str, List[str]] = {}
+_stats: Dict[str, float] = {"stalls": 0, "samples": 0, "max_lag": 0.0, "dropped_sites": 0}
+
+_beat = 0.0
+_lag_ewma = 0.0
+_loop_tid: Optional[int] = None
+_task: Optional[asyncio.Task] = None
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def _is_project(filename: str) -> bool:
+    return (filename.startswith(_ROOT) and "site-packages" not in filename
+            and filename != __file__)
+
+def _fmt(fs, line: bool = True) -> str:
+    if fs.filename.startswith(_ROOT):
+        path = os.path.relpath(fs.filename, _ROOT)
+    else:
+        path = "/".join(fs.filename.replace("\\", "/").split("/")[-2:])   # json/encoder.py
+    return f"{path}:{fs.lineno} {fs.name}" if line else f"{path} {fs.name}"
+
+def _attribute(frame) -> Tuple[str, str, List[str]]:
+    """الموضع على مستوى الدالة (بلا رقم سطر) كي تتجمّع عيّنات نفس الحلقة الحاجبة."""
+    import traceback
+    stack = traceback.extract_stack(frame, limit=60)      # الأبعد → الأعمق
+    own = [fs for fs in stack if _is_project(fs.filename)]
+    leaf = _fmt(stack[-1], line=False) if stack else "?"
+    site = _fmt(own[-1], line=False) if own else "-"
+    return site, leaf, [_fmt(fs) for fs in own[-_STACK_KEEP:]]
+
+
+def _sample(new_stall: bool) -> None:
+    frames = sys._current_frames()
+    frame = frames.get(_loop_tid) if _loop_tid is not None else None
+    if frame is None:
+        return
+    if frame.f_code.co_filename.endswith("selectors.py"):
+        return            # الحلقة عادت للانتظار في select — ليست محجوبة
+    site, leaf, stack = _attribute(frame)
+    with _lock:
+        if site not in _samples and len(_samples) >= _MAX_SITES:
+            _stats["dropped_sites"] += 1
+            return
+        _samples[site] += 1
+        _stats["samples"] += 1
+        leaves = _leaves.setdefault(site, Counter())
+        if leaf != site and (leaf in leaves or len(leaves) < 16):
+            leaves[leaf] += 1
+        if new_stall:
+            _stall_hits[site] += 1
+        _stacks.setdefault(site, stack)
+
+
+def _watch() -> None:
+    in_stall = False
+    while not _stop.wait(SAMPLE):
+        if not _beat:
+            continue
+        if time.monotonic() - _beat < TICK + STALL:
+            in_stall = False
+            continue
+        try:
+            _sample(not in_stall)
+        except Exception as e:
+            log.debug(f"[loop_watchdog] sample failed: {e}")
+        in_stall = True
+
+
+async def _heartbeat() -> None:
+    global _beat, _lag_ewma
+    while True:
+        t0 = time.monotonic()
+        _beat = t0
+        await asyncio.sleep(TICK)
+        lag = max(0.0, time.monotonic() - t0 - TICK)
+        _lag_ewma += 0.2 * (lag - _lag_ewma)
+        LAG_SECONDS.observe(lag)
+        if lag > _stats["max_lag"]:
+            _stats["max_lag"] = lag
+        if lag >= STALL:
+            _stats["stalls"] += 1
+            STALLS.inc()
+            log.warning(f"[loop_watchdog] event loop blocked for {lag * 1000:.0f}ms")
+
+
+async def start(*_args, **_kwargs) -> None:
+    """startup للـ Dispatcher (coroutine كي تعمل في خيط الحلقة). آمن للتكرار."""
+    global _task, _thread, _loop_tid, _beat
+    if not ENABLED or _task is not None:
+        return
+    _loop_tid = threading.get_ident()
+    _beat = time.monotonic()
+    _stop.clear()
+    _task = asyncio.get_running_loop().create_task(_heartbeat())
+    _thread = threading.Thread(target=_watch, name="loop-watchdog", daemon=True)
+    _thread.start()
+    log.info(f"[loop_watchdog] started (stall>{STALL * 1000:.0f}ms, sample {SAMPLE * 1000:.0f}ms)")
+
+async def stop(*_args, **_kwargs) -> None:
+    global _task, _thread
+    _stop.set()
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _task = None
+    if _thread is not None:
+        _thread.join(timeout=1.0)
+        _thread = None
+
+
+def current_lag() -> float:
+    """تأخّر الحلقة الحالي (ثوانٍ): متوسط متحرّك، أو الزمن منذ آخر نبضة إن كان أكبر."""
+    if not _beat:
+        return 0.0
+    return max(_lag_ewma, time.monotonic() - _beat - TICK)
+
+
+def reset() -> None:
+    with _lock:
+        _samples.clear(); _leaves.clear(); _stall_hits.clear(); _stacks.clear()
+        _stats.update(stalls=0, samples=0, max_lag=0.0, dropped_sites=0)
+
+def stats() -> Dict[str, Any]:
+    return dict(_stats, sites=len(_samples))
+
+def top_sites(n: int = 10) -> List[Dict[str, Any]]:
+    with _lock:
+        items = _samples.most_common(max(1, n))
+        return [{"site": s, "samples": c, "stalls": _stall_hits.get(s, 0),
+                 "blocked_ms": round(c * SAMPLE * 1000), "stack": list(_stacks.get(s, ())),
+                 "leaves": _leaves.get(s, Counter()).most_common(3)}
+                for s, c in items]
+
+def report(top: int = 10) -> str:
+    st = stats()
+    lines = [f"stalls={int(st['stalls'])} samples={int(st['samples'])} "
+             f"max_lag={st['max_lag'] * 1000:.0f}ms threshold={STALL * 1000:.0f}ms"]
+    for i, row in enumerate(top_sites(top), 1):
+        where = row["stack"][-1] if row["stack"] else row["site"]
+        lines.append(f"{i:>2}. ~{row['blocked_ms']}ms ({row['stalls']} stalls) {where}")
+        for leaf, c in row["leaves"]:
+            lines.append(f"      ↳ {leaf} ({c * 100 // max(1, row['samples'])}%)")
+        for fr in reversed(row["stack"][:-1]):
+            lines.append(f"      ← {fr}")
+    if len(lines) == 1:
+        lines.append("no stalls recorded")
+    return "\n".join(lines)
@@ -0,0 +1,198 @@
+# utils/metrics.py
+from __future__ import annotations
+
+import os, time, logging
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# سجل مقاييس داخل العملية بصيغة Prometheus (بلا اعتماديات):
+# - counter(name, help, labels).inc(**labels)
+# - histogram(name, help, labels, buckets).observe(seconds, **labels)
+# - gauge_fn(name, help, fn): قيمة تُقرأ عند التصدير (أعماق الطوابير، إحصاءات الوحدات)
+#   fn ترجع رقمًا أو {tuple(قيم الوسوم): رقم}
+# - render(): نص /metrics، ويخدمه start_metrics_server() على aiohttp محلي
+#   على METRICS_HOST (127.0.0.1) في وضعي polling و webhook (METRICS_PORT=0 يعطّله).
+
+log = logging.getLogger(__name__)
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108") or 0)
+
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS   = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+LabelKey = Tuple[str, ...]
+
+
+def _esc(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: LabelKey, extra: str = "") -> str:
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in list(self._values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {}   # [عدّاد لكل دلو..., +Inf, sum]
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        s = self._series.get(key)
+        if s is None:
+            s = self._series[key] = [0.0] * (len(self.buckets) + 2)
+        s[bisect_left(self.buckets, value)] += 1
+        s[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self) -> List[str]:
+        out: List[str] = []
+        for key, s in list(self._series.items()):
+            acc = 0.0
+            for i, le in enumerate(self.buckets + (float("inf"),)):
+                acc += s[i]
+                le_label = 'le="%s"' % _num(le)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le_label)} {_num(acc)}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(s[-1])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {_num(acc)}")
+        return out
+
+
+class GaugeFn:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Any], labels: Iterable[str] = ()):
+        self.name, self.help, self.fn, self.labelnames = name, help, fn, tuple(labels)
+
+    def samples(self) -> List[str]:
+        try:
+            v = self.fn()
+        except Exception as e:
+            log.debug(f"[metrics] gauge {self.name} failed: {e}")
+            return []
+        if isinstance(v, dict):
+            return [f"{self.name}{_labels(self.labelnames, k if isinstance(k, tuple) else (k,))} {_num(x)}"
+                    for k, x in v.items() if isinstance(x, (int, float))]
+        if isinstance(v, (int, float)):
+            return [f"{self.name} {_num(v)}"]
+        return []
+
+
+_REGISTRY: Dict[str, Any] = {}
+
+def _register(metric):
+    existing = _REGISTRY.get(metric.name)
+    if existing is not None:
+        return existing      # إعادة الاستيراد لا تكرّر المقياس
+    _REGISTRY[metric.name] = metric
+    return metric
+
+def counter(name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+    return _register(Counter(name, help, labels))
+
+def histogram(name: str, help: str, labels: Iterable[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labels, buckets))
+
+def gauge_fn(name: str, help: str, fn: Callable[[], Any], labels: Iterable[str] = ()) -> GaugeFn:
+    g = GaugeFn(name, help, fn, labels)
+    _REGISTRY[name] = g      # الدالة الأحدث تفوز
+    return g
+
+
+def render() -> str:
+    lines: List[str] = []
+    for m in list(_REGISTRY.values()):
+        samples = m.samples()
+        if not samples:
+            continue
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+# ---------- مقاييس مشتركة ----------
+STORE_SECONDS = histogram("bot_store_seconds", "File store load/save duration", ("store", "op"))
+STORE_BYTES   = histogram("bot_store_bytes", "File store load/save size", ("store", "op"), BYTES_BUCKETS)
+
+def observe_store(store: str, op: str, seconds: float, nbytes: Optional[int] = None) -> None:
+    STORE_SECONDS.observe(seconds, store=store, op=op)
+    if nbytes is not None:
+        STORE_BYTES.observe(nbytes, store=store, op=op)
+
+@contextmanager
+def store_op(store: str, op: str, path: Any = None):
+    """with store_op("vip", "save", path): ... — الزمن والحجم (بعد العملية) لمخزن ملفات."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        nbytes = None
+        if path:
+            try:
+                nbytes = os.path.getsize(path)
+            except OSError:
+                pass
+        observe_store(store, op, time.perf_counter() - t0, nbytes)
+
+
+# ---------- الخادم المحلي ----------
+async def metrics_handler(_request):
+    from aiohttp import web
+    return web.Response(body=render().encode("utf-8"),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+_runner = None
+
+async def start_metrics_server() -> None:
+    """خادم /metrics محلي مستقل (الوضعان polling و webhook). METRICS_PORT=0 يعطّله."""
+    global _runner
+    if not METRICS_PORT or _runner is not None:
+        return
+    from aiohttp import web
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    _runner = web.AppRunner(app)
+    await _runner.setup()
+    await web.TCPSite(_runner, METRICS_HOST, METRICS_PORT).start()
+    log.info(f"[metrics] serving http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+async def stop_metrics_server() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -31,6 +31,11 @@ def _save(d: Dict[str, Any]) -> None:
         STORE_FILE.write_text(json.dumps(d, ensure_ascii=False, indent=2), encoding="utf-8")
     except Exception:
         pass
+    try:
+        from utils.home_snapshot import mark_dirty
+        mark_dirty()   # عدّاد البثوث في الشاشة الرئيسية
+    except Exception:
+        pass
 
 def _make_id(d: Dict[str, Any], uid: int) -> str:
     d["seq"] = int(d.get("seq", 0)) + 1
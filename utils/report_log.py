@@ -0,0 +1,310 @@
+# utils/report_log.py
+from __future__ import annotations
+
+import os, json, gzip, shutil, threading, logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# سجل البلاغات كمقاطع JSONL دوّارة (إلحاق فقط) + فهرس مضغوط لكل مستخدم:
+# - كل بلاغ جديد = سطر واحد يُلحق بآخر مقطع (بدل إعادة كتابة الملف كله).
+# - index.log: سطر "uid<TAB>seg<TAB>offset" لكل بلاغ، يُحمّل مرة واحدة في الذاكرة.
+# - آخر N بلاغات لمستخدم/ترقيم الصفحات يقرأ فقط السجلات المطلوبة عبر seek.
+# - ترحيل لمرة واحدة من reports_log.json القديم، وأرشفة المقاطع القديمة (gzip).
+
+log = logging.getLogger(__name__)
+
+DATA_DIR     = Path("data"); DATA_DIR.mkdir(parents=True, exist_ok=True)
+LEGACY_FILE  = DATA_DIR / "reports_log.json"
+LOG_DIR      = DATA_DIR / "reports_log"
+ARCHIVE_DIR  = LOG_DIR / "archive"
+INDEX_FILE   = LOG_DIR / "index.log"
+MIGRATE_MARK = LOG_DIR / "migrate.pending"   # {"seg", "size"}: نقطة البدء قبل الترحيل
+
+SEGMENT_MAX_BYTES = int(os.getenv("REPORT_LOG_SEGMENT_BYTES", str(2 * 1024 * 1024)))
+KEEP_SEGMENTS     = int(os.getenv("REPORT_LOG_KEEP_SEGMENTS", "50"))   # 0 = بدون أرشفة
+
+_LOCK = threading.RLock()
+
+# الفهرس في الذاكرة: ترتيب زمني لكل السجلات + مواقع كل مستخدم
+_entries: List[Tuple[int, int]] = []           # [(seg, offset)] الأقدم أولًا
+_entry_uid: List[int] = []                     # uid لكل مدخل (لتقليم _by_user عند الأرشفة)
+_by_user: Dict[int, List[int]] = {}            # uid -> مؤشرات مطلقة (المؤشر - _base داخل _entries)
+_base = 0                                      # عدد المدخلات المؤرشفة من بداية الفهرس
+_loaded = False
+
+
+# ---------- مسارات المقاطع ----------
+def _seg_path(seg: int) -> Path:
+    return LOG_DIR / f"seg_{seg:06d}.jsonl"
+
+def _segments() -> List[int]:
+    out = []
+    if LOG_DIR.exists():
+        for p in LOG_DIR.glob("seg_*.jsonl"):
+            try:
+                out.append(int(p.stem.split("_", 1)[1]))
+            except Exception:
+                continue
+    return sorted(out)
+
+def _current_segment() -> int:
+    segs = _segments()
+    if not segs:
+        return 1
+    last = segs[-1]
+    try:
+        if _seg_path(last).stat().st_size >= SEGMENT_MAX_BYTES:
+            return last + 1
+    except Exception:
+        pass
+    return last
+
+
+# ---------- الفهرس ----------
+def _uid_of(item: dict) -> int:
+    try:
+        return int(item.get("user_id", 0) or 0)
+    except Exception:
+        return 0
+
+def _index_add(uid: int, seg: int, off: int) -> None:
+    _entries.append((seg, off))
+    _entry_uid.append(uid)
+    _by_user.setdefault(uid, []).append(_base + len(_entries) - 1)
+
+def _index_clear() -> None:
+    global _base
+    _entries.clear(); _entry_uid.clear(); _by_user.clear()
+    _base = 0
+
+def _index_drop_before(first_seg: int) -> None:
+    """يحذف من الفهرس مدخلات المقاطع المؤرشفة (< first_seg) — كلفة O(المحذوف) بلا مسح مقاطع."""
+    global _base
+    cut = 0
+    while cut < len(_entries) and _entries[cut][0] < first_seg:
+        cut += 1
+    if not cut:
+        return
+    limit = _base + cut
+    for uid in set(_entry_uid[:cut]):
+        idxs = _by_user.get(uid)
+        if not idxs:
+            continue
+        k = 0
+        while k < len(idxs) and idxs[k] < limit:
+            k += 1
+        if k == len(idxs):
+            _by_user.pop(uid, None)
+        else:
+            del idxs[:k]
+    del _entries[:cut]
+    del _entry_uid[:cut]
+    _base = limit
+    # index.log من الذاكرة (بلا قراءة المقاطع الباقية)
+    tmp = INDEX_FILE.with_suffix(".tmp")
+    tmp.write_text("".join(f"{u}\t{sg}\t{o}\n" for u, (sg, o) in zip(_entry_uid, _entries)),
+                   encoding="utf-8")
+    tmp.replace(INDEX_FILE)
+
+def _rebuild_index_from_segments() -> None:
+    """يعيد بناء index.log بالمسح الكامل للمقاطع (يُستخدم عند فقدانه/تلفه فقط)."""
+    _index_clear()
+    lines: List[str] = []
+    for seg in _segments():
+        with open(_seg_path(seg), "rb") as f:
+            off = 0
+            for raw in f:
+                try:
+                    uid = _uid_of(json.loads(raw))
+                except Exception:
+                    uid = None
+                if uid is not None:
+                    _index_add(uid, seg, off)
+                    lines.append(f"{uid}\t{seg}\t{off}\n")
+                off += len(raw)
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = INDEX_FILE.with_suffix(".tmp")
+    tmp.write_text("".join(lines), encoding="utf-8")
+    tmp.replace(INDEX_FILE)
+
+def _ensure_loaded() -> None:
+    global _loaded
+    if _loaded:
+        return
+    with _LOCK:
+        if _loaded:
+            return
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        if LEGACY_FILE.exists():
+            migrate_legacy()  # يعيد بناء الفهرس في الذاكرة
+            if not _entries and _segments():
+                _rebuild_index_from_segments()
+        elif INDEX_FILE.exists():
+            try:
+                with open(INDEX_FILE, "r", encoding="utf-8") as f:
+                    for line in f:
+                        parts = line.split("\t")
+                        if len(parts) != 3:
+                            continue
+                        _index_add(int(parts[0]), int(parts[1]), int(parts[2]))
+            except Exception as e:
+                log.warning(f"[report_log] index load failed, rebuilding: {e}")
+                _rebuild_index_from_segments()
+        elif _segments():
+            _rebuild_index_from_segments()
+        _loaded = True
+
+
+# ---------- القراءة ----------
+def _read_many(locs: List[Tuple[int, int]]) -> List[dict]:
+    """يقرأ مجموعة مواقع مع فتح كل مقطع مرة واحدة فقط."""
+    out: List[Optional[dict]] = [None] * len(locs)
+    by_seg: Dict[int, List[int]] = {}
+    for i, (seg, _) in enumerate(locs):
+        by_seg.setdefault(seg, []).append(i)
+    for seg, idxs in by_seg.items():
+        try:
+            with open(_seg_path(seg), "rb") as f:
+                for i in idxs:
+                    f.seek(locs[i][1])
+                    try:
+                        out[i] = json.loads(f.readline())
+                    except Exception:
+                        out[i] = None
+        except Exception:
+            continue
+    return [x for x in out if isinstance(x, dict)]
+
+
+# ---------- الواجهة العامة ----------
+def append(item: dict) -> None:
+    """يُلحق بلاغًا واحدًا بآخر مقطع ويحدّث الفهرس (بدون إعادة كتابة أي ملف)."""
+    _ensure_loaded()
+    line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+    uid = _uid_of(item)
+    rotated = False
+    with _LOCK:
+        seg = _current_segment()
+        rotated = bool(_entries) and seg != _entries[-1][0]
+        path = _seg_path(seg)
+        with open(path, "ab") as f:
+            off = f.tell()
+            f.write(line)
+        with open(INDEX_FILE, "a", encoding="utf-8") as f:
+            f.write(f"{uid}\t{seg}\t{off}\n")
+        _index_add(uid, seg, off)
+    if rotated and KEEP_SEGMENTS > 0:
+        try:
+            apply_retention(KEEP_SEGMENTS)
+        except Exception as e:
+            log.warning(f"[report_log] retention failed: {e}")
+
+def count() -> int:
+    _ensure_loaded()
+    return len(_entries)
+
+def count_for_user(uid: int) -> int:
+    _ensure_loaded()
+    return len(_by_user.get(int(uid), ()))   # مؤشرات المؤرشف تُقلَّم في _index_drop_before
+
+def last_for_user(uid: int, n: int = 1) -> List[dict]:
+    """آخر n بلاغات للمستخدم (الأحدث أولًا)."""
+    _ensure_loaded()
+    with _LOCK:
+        idxs = _by_user.get(int(uid)) or []
+        locs = [_entries[i - _base] for i in reversed(idxs[-max(0, int(n)):])] if n > 0 else []
+    return _read_many(locs)
+
+def last_one(uid: int) -> Optional[dict]:
+    items = last_for_user(uid, 1)
+    return items[0] if items else None
+
+def page(offset: int = 0, limit: int = 20) -> List[dict]:
+    """صفحة من البلاغات (الأحدث أولًا) — تقرأ السجلات المطلوبة فقط."""
+    _ensure_loaded()
+    offset = max(0, int(offset)); limit = max(0, int(limit))
+    with _LOCK:
+        total = len(_entries)
+        hi = total - offset
+        lo = max(0, hi - limit)
+        locs = [_entries[i] for i in range(hi - 1, lo - 1, -1)] if hi > 0 else []
+    return _read_many(locs)
+
+
+# ---------- الترحيل + الأرشفة ----------
+def _truncate_to(seg: int, size: int) -> None:
+    """يعيد المقاطع إلى ما كانت عليه قبل ترحيل انقطع في منتصفه."""
+    for sg in _segments():
+        p = _seg_path(sg)
+        if sg > seg or (sg == seg and size <= 0):
+            p.unlink()
+        elif sg == seg:
+            os.truncate(p, size)
+
+def migrate_legacy() -> int:
+    """
+    ترحيل لمرة واحدة: يستورد reports_log.json (قائمة) إلى المقاطع،
+    ثم يعيد تسميته إلى reports_log.json.migrated. يرجع عدد السجلات المستوردة.
+    آمن لإعادة التشغيل: علامة MIGRATE_MARK تُكتب قبل أي إلحاق، وإن وُجدت عند
+    البدء تُقصّ المقاطع إلى نقطتها أولًا (لا تكرار لبلاغات رُحّلت جزئيًا).
+    """
+    if not LEGACY_FILE.exists():
+        return 0
+    with _LOCK:
+        try:
+            data = json.loads(LEGACY_FILE.read_text(encoding="utf-8"))
+        except Exception as e:
+            log.error(f"[report_log] legacy load error: {e}")
+            return 0
+        if not isinstance(data, list):
+            data = []
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        try:
+            mark = json.loads(MIGRATE_MARK.read_text(encoding="utf-8"))
+            seg, size = int(mark["seg"]), int(mark["size"])
+            _truncate_to(seg, size)
+            log.warning(f"[report_log] resuming interrupted migration from seg {seg}@{size}")
+        except FileNotFoundError:
+            seg = _current_segment()
+            path = _seg_path(seg)
+            size = path.stat().st_size if path.exists() else 0
+            tmp = MIGRATE_MARK.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"seg": seg, "size": size}), encoding="utf-8")
+            tmp.replace(MIGRATE_MARK)
+        path = _seg_path(seg)
+        f = open(path, "ab")
+        try:
+            for item in data:
+                if not isinstance(item, dict):
+                    continue
+                if f.tell() >= SEGMENT_MAX_BYTES:
+                    f.close(); seg += 1; path = _seg_path(seg); f = open(path, "ab")
+                f.write((json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8"))
+        finally:
+            f.close()
+        _rebuild_index_from_segments()
+        LEGACY_FILE.replace(LEGACY_FILE.with_name(LEGACY_FILE.name + ".migrated"))
+        MIGRATE_MARK.unlink()
+        log.info(f"[report_log] migrated {len(data)} legacy reports")
+        return len(data)
+
+def apply_retention(keep_segments: int = KEEP_SEGMENTS) -> int:
+    """
+    يضغط المقاطع الأقدم من آخر keep_segments إلى archive/*.jsonl.gz
+    ويقلّم الفهرس من الذاكرة. يرجع عدد المقاطع المؤرشفة.
+    """
+    _ensure_loaded()
+    with _LOCK:
+        segs = _segments()
+        if keep_segments <= 0 or len(segs) <= keep_segments:
+            return 0
+        old = segs[:-keep_segments]
+        ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        for seg in old:
+            src = _seg_path(seg)
+            dst = ARCHIVE_DIR / (src.name + ".gz")
+            with open(src, "rb") as fi, gzip.open(dst, "wb") as fo:
+                shutil.copyfileobj(fi, fo)
+            src.unlink()
+        _index_drop_before(segs[-keep_segments])
+        return len(old)
@@ -6,6 +6,8 @@ from pathlib import Path
 from typing import Dict, Any, Tuple, List, Optional, Literal
 import datetime as _dt
 
+from utils import gcra
+
 # ===== مسارات التخزين =====
 DATA_DIR = Path("data") / "rewards"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -258,20 +260,24 @@ def send_points(src: int, dst: int, amount: int, note: str = "") -> Tuple[bool,
     return True, "OK"
 
 # ===== Anti-abuse / تبريد =====
+# تبريد في الذاكرة عبر utils.gcra (مفتاح واحد لكل مستخدم/أكشن) بدل قراءة وكتابة
+# users.json مع كل نقرة؛ المفاتيح المنتهية تُضغط تلقائيًا. يُصفَّر عند إعادة التشغيل.
+_COOLDOWN_PREFIX = "rewards.cooldown."
+
+def _cooldown(sec: int) -> gcra.Limiter:
+    sec = int(sec)
+    return gcra.limiter(f"{_COOLDOWN_PREFIX}{sec}s", 1, sec, clock=time.time)
+
 def can_do(uid: int, action: str, cooldown_sec: int = 5) -> bool:
-    u = _get_user(uid)
-    last = int(u.get("last_actions", {}).get(action, 0))
-    if _now() - last < int(cooldown_sec):
-        return False
-    u.setdefault("last_actions", {})[action] = _now()
-    _put_user(uid, u)
-    return True
+    if int(cooldown_sec) <= 0:
+        return True
+    return _cooldown(cooldown_sec).allow((int(uid), str(action)))
 
 def mark_action(uid: int, action: str, when: int | None = None) -> bool:
     """ختم زمن تنفيذ أكشن معيّن بدون فحص كولداون."""
-    u = _get_user(uid)
-    u.setdefault("last_actions", {})[str(action)] = int(when or _now())
-    _put_user(uid, u)
+    key, ts = (int(uid), str(action)), float(when or _now())
+    for lim in gcra.limiters(_COOLDOWN_PREFIX):
+        lim.seed(key, ts + lim.period)
     return True
 
 # ===== Daily claim =====
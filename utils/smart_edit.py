@@ -1,7 +1,111 @@
 # utils/smart_edit.py
+import os
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
 from aiogram.types import Message
 from aiogram.enums import ParseMode
 from aiogram.exceptions import TelegramBadRequest
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.methods import EditMessageText, EditMessageCaption, EditMessageReplyMarkup, EditMessageMedia
+
+# ===== كاش منع التعديلات بلا تغيير =====
+# LRU بالمفتاح (chat_id, message_id) يحفظ بصمة آخر (نص، لوحة) أُرسلت لكل رسالة.
+# يعمل كـ request middleware على جلسة البوت فيغطي كل edit_* في المشروع:
+# إن لم يتغير شيء نرفع "message is not modified" محليًا بلا رحلة إلى Telegram
+# (نفس الخطأ الذي تعالجه المعالجات أصلًا).
+EDIT_CACHE_MAX = int(os.getenv("EDIT_CACHE_MAX", "20000"))
+
+_edit_cache: "OrderedDict[Tuple[str, int], Tuple[str, str]]" = OrderedDict()
+_edit_stats = {"checked": 0, "saved": 0, "not_modified_remote": 0}
+
+
+def _h(*parts) -> str:
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+
+def _markup_hash(markup) -> str:
+    if markup is None:
+        return _h(None)
+    try:
+        return _h(markup.model_dump_json(exclude_none=True))
+    except Exception:
+        return _h(repr(markup))
+
+def _edit_key_and_hashes(method) -> Optional[Tuple[Tuple[str, int], Optional[str], str]]:
+    """يرجع (المفتاح، بصمة المحتوى أو None للوحة فقط، بصمة اللوحة)."""
+    chat_id = getattr(method, "chat_id", None)
+    message_id = getattr(method, "message_id", None)
+    if chat_id is None or message_id is None:
+        return None  # رسائل inline: لا نعرف الحالة
+    key = (str(chat_id), int(message_id))
+    markup_h = _markup_hash(getattr(method, "reply_markup", None))
+    if isinstance(method, EditMessageText):
+        content = _h("text", method.text, str(method.parse_mode), repr(method.entities),
+                     repr(getattr(method, "disable_web_page_preview", None)),
+                     repr(getattr(method, "link_preview_options", None)))
+    elif isinstance(method, EditMessageCaption):
+        content = _h("caption", method.caption, str(method.parse_mode), repr(method.caption_entities))
+    else:
+        content = None
+    return key, content, markup_h
+
+def _remember(key, content: Optional[str], markup_h: str) -> None:
+    if content is None:
+        prev = _edit_cache.get(key)
+        if prev is None:
+            return  # المحتوى غير معروف: لا نحفظ لوحة فقط
+        content = prev[0]
+    _edit_cache[key] = (content, markup_h)
+    _edit_cache.move_to_end(key)
+    while len(_edit_cache) > EDIT_CACHE_MAX:
+        _edit_cache.popitem(last=False)
+
+def edit_cache_stats() -> dict:
+    """عدد التعديلات المفحوصة وعدد استدعاءات API التي وُفّرت."""
+    return dict(_edit_stats, size=len(_edit_cache))
+
+
+class EditDedupeMiddleware(BaseRequestMiddleware):
+    """
+    التسجيل على جلسة البوت:
+        session.middleware(EditDedupeMiddleware())
+    """
+
+    async def __call__(self, make_request, bot, method):
+        if isinstance(method, EditMessageMedia):
+            # الوسائط تستبدل المحتوى والكابشن: البصمة المحفوظة لم تعد صالحة
+            info = _edit_key_and_hashes(method)
+            if info is not None:
+                _edit_cache.pop(info[0], None)
+            return await make_request(bot, method)
+        if not isinstance(method, (EditMessageText, EditMessageCaption, EditMessageReplyMarkup)):
+            return await make_request(bot, method)
+        info = _edit_key_and_hashes(method)
+        if info is None:
+            return await make_request(bot, method)
+        key, content, markup_h = info
+        _edit_stats["checked"] += 1
+        prev = _edit_cache.get(key)
+        if prev is not None and (content is None or prev[0] == content) and prev[1] == markup_h:
+            _edit_cache.move_to_end(key)
+            _edit_stats["saved"] += 1
+            raise TelegramBadRequest(
+                method=method,
+                message="Bad Request: message is not modified: specified new message content "
+                        "and reply markup are exactly the same (local edit cache)",
+            )
+        try:
+            result = await make_request(bot, method)
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e).lower():
+                _edit_stats["not_modified_remote"] += 1
+                _remember(key, content, markup_h)
+            else:
+                _edit_cache.pop(key, None)
+            raise
+        _remember(key, content, markup_h)
+        return result
 
 async def smart_edit(message: Message, text: str, reply_markup=None):
     """
@@ -50,6 +154,9 @@ async def smart_edit(message: Message, text: str, reply_markup=None):
         )
 
     except TelegramBadRequest as e:
+        # لا تغيير: الرسالة تعرض المحتوى المطلوب أصلًا — لا داعي لإرسال جديد
+        if "message is not modified" in str(e).lower():
+            return message
         # fallback عام لأي منع تعديل (لا يوجد نص، لا يمكن تعديل…الخ)
         return await message.answer(
             text,
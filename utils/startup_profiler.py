@@ -0,0 +1,129 @@
+# utils/startup_profiler.py
+from __future__ import annotations
+
+import os, sys, json, time, logging, threading
+from contextlib import contextmanager
+from importlib.abc import Loader, MetaPathFinder
+from importlib.machinery import ExtensionFileLoader, SourceFileLoader, SourcelessFileLoader
+from typing import Dict, List, Optional, Tuple
+
+# مُحلّل زمن الإقلاع:
+# - زمن استيراد كل وحدة (تراكمي + ذاتي بدون الوحدات الفرعية) عبر finder في sys.meta_path.
+#   يعمل فقط عند STARTUP_PROFILE=1 ويجب تثبيته قبل الاستيرادات الثقيلة في bot.py.
+# - زمن كل خطوة إقلاع (get_me, commands, routers, cron, ...) عبر step("name").
+# - report() يطبع الأبطأ، ويُحفظ الملخص في data/startup_profile.json للمقارنة بين النشرات.
+
+log = logging.getLogger(__name__)
+
+ENABLED      = os.getenv("STARTUP_PROFILE", "0").strip() not in ("0", "false", "False", "")
+PROFILE_FILE = os.path.join("data", "startup_profile.json")
+
+_T0 = time.perf_counter()
+_imports: Dict[str, Tuple[float, float]] = {}   # module -> (cumulative, self)
+_steps: List[Tuple[str, float]] = []
+_stack: List[List[float]] = []                  # [start, children_time] لكل استيراد جارٍ
+_LOCK = threading.RLock()
+_finder: Optional["_TimingFinder"] = None
+
+
+class _TimingLoader(Loader):
+    def __init__(self, inner: Loader, name: str):
+        self._inner = inner
+        self._name = name
+
+    def create_module(self, spec):
+        return self._inner.create_module(spec)
+
+    def exec_module(self, module):
+        frame = [time.perf_counter(), 0.0]
+        _stack.append(frame)
+        try:
+            self._inner.exec_module(module)
+        finally:
+            _stack.pop()
+            total = time.perf_counter() - frame[0]
+            if _stack:
+                _stack[-1][1] += total
+            _imports[self._name] = (total, total - frame[1])
+
+    def __getattr__(self, item):
+        return getattr(self._inner, item)
+
+
+class _TimingFinder(MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        if threading.current_thread() is not threading.main_thread():
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                # نلفّ محمّلات الملفات فقط (builtin/frozen سريعة وحسّاسة للهوية)
+                if isinstance(spec.loader, (SourceFileLoader, SourcelessFileLoader, ExtensionFileLoader)):
+                    spec.loader = _TimingLoader(spec.loader, fullname)
+                return spec
+        return None
+
+
+def install_import_profiler() -> bool:
+    """يثبّت مؤقّت الاستيراد إذا كان STARTUP_PROFILE=1. يرجع True إن ثُبّت."""
+    global _finder
+    if not ENABLED or _finder is not None:
+        return False
+    _finder = _TimingFinder()
+    sys.meta_path.insert(0, _finder)
+    return True
+
+
+def uninstall_import_profiler() -> None:
+    global _finder
+    if _finder is not None:
+        try:
+            sys.meta_path.remove(_finder)
+        except ValueError:
+            pass
+        _finder = None
+
+
+@contextmanager
+def step(name: str):
+    """يقيس خطوة إقلاع: with step("get_me"): await bot.get_me()"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _LOCK:
+            _steps.append((name, time.perf_counter() - t0))
+
+
+def report(top: int = 15) -> str:
+    uninstall_import_profiler()
+    lines = [f"[startup] total {time.perf_counter() - _T0:.2f}s since profiler import"]
+    if _steps:
+        lines.append("[startup] steps:")
+        lines += [f"    {dt * 1000:8.1f} ms  {name}" for name, dt in _steps]
+    if _imports:
+        slow = sorted(_imports.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        lines.append(f"[startup] slowest imports (self / cumulative), {len(_imports)} modules:")
+        lines += [f"    {s * 1000:8.1f} / {c * 1000:8.1f} ms  {name}" for name, (c, s) in slow]
+    return "\n".join(lines)
+
+
+def log_report(top: int = 15) -> None:
+    """يسجّل الملخص ويحفظه في PROFILE_FILE (لا يفعل شيئًا بدون STARTUP_PROFILE=1)."""
+    if not ENABLED:
+        return
+    log.info(report(top))
+    try:
+        os.makedirs(os.path.dirname(PROFILE_FILE), exist_ok=True)
+        with open(PROFILE_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "ts": int(time.time()),
+                "total": round(time.perf_counter() - _T0, 4),
+                "steps": [[n, round(dt, 4)] for n, dt in _steps],
+                "imports": {n: [round(c, 4), round(s, 4)] for n, (c, s) in
+                            sorted(_imports.items(), key=lambda kv: kv[1][1], reverse=True)},
+            }, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        log.warning(f"[startup] save profile failed: {e}")
@@ -0,0 +1,329 @@
+# utils/supplier_index.py
+from __future__ import annotations
+
+import os, json, asyncio, logging, threading
+from bisect import insort, bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+# فهرس دليل الموردين المقيم في الذاكرة:
+# - خريطة مرتبة لكل (status, country) بالمفتاح (updated_at, uid) — الأحدث في النهاية.
+# - يُحدَّث عند كل حفظ/اعتماد/إخفاء/حذف لبطاقة مورد (upsert/remove) تحت قفل.
+#   الحفظ إلحاقي: سطر واحد للبطاقة في supplier_index.log (الأخير يفوز)، ويُضغط
+#   إلى لقطة supplier_index.json الذرّية حين يكبر السجل. public_suppliers.json
+#   يُعاد كتابته فقط إن تأثّرت بطاقة منشورة.
+# - الاستعلام بالصفحات يكلّف O(حجم الصفحة)، ولا يُمسح مجلد الموردين إلا في
+#   فحص الاتساق الخلفي (run_reconcile_loop) أو عند غياب ملف الفهرس.
+
+log = logging.getLogger(__name__)
+
+DATA_DIR   = "data"
+SUP_DIR    = os.path.join(DATA_DIR, "suppliers")
+INDEX_FILE = os.path.join(DATA_DIR, "supplier_index.json")
+JOURNAL    = os.path.join(DATA_DIR, "supplier_index.log")   # أسطر {"u": uid, "d": بطاقة|null}
+PUB_FILE   = os.path.join(DATA_DIR, "public_suppliers.json")
+
+RECONCILE_INTERVAL = int(os.getenv("SUPPLIER_INDEX_RECONCILE_SEC", "1800"))
+
+STATUSES = ("published", "draft", "pending", "approved", "hidden")
+
+# الحقول المنشورة في الدليل العام (نفس شكل public_suppliers.json السابق)
+_PUBLIC_FIELDS = ("user_id", "username", "name", "country", "languages",
+                  "contact", "whatsapp", "channel", "bio")
+
+_LOCK = threading.RLock()
+_cards: Dict[int, Dict[str, Any]] = {}                        # uid -> بطاقة
+_buckets: Dict[Tuple[str, str], List[Tuple[str, int]]] = {}   # (status, country) -> [(updated_at, uid)]
+_loaded = False
+_journal_n = 0                                                 # أسطر السجل منذ آخر لقطة
+
+
+# ---------- أدوات ----------
+def _atomic_write(path: str, data: Any) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def _country_key(country: Optional[str]) -> str:
+    return (country or "").strip().casefold()
+
+def _statuses_of(d: dict) -> List[str]:
+    st = str(d.get("status") or "draft")
+    out = [st]
+    if st == "approved" and d.get("visible"):
+        out.append("published")
+    return out
+
+def _sort_key(d: dict) -> Tuple[str, int]:
+    return (str(d.get("updated_at") or ""), int(d.get("user_id") or 0))
+
+def _normalize(d: dict, uid: int) -> dict:
+    """نفس شكل البطاقة سواء جاءت من القرص أو من upsert (كي لا يرى الفحص فروقًا وهمية)."""
+    d = dict(d)
+    d.setdefault("languages", "")
+    d.setdefault("whatsapp", "")
+    d["user_id"] = int(uid)
+    return d
+
+def _public_item(d: dict) -> dict:
+    it = {k: d.get(k, "" if k in ("languages", "whatsapp") else None) for k in _PUBLIC_FIELDS}
+    it["verified"] = True
+    it["updated_at"] = d.get("updated_at")
+    return it
+
+
+# ---------- إدارة الحاويات ----------
+def _bucket_add(d: dict) -> None:
+    key = _sort_key(d)
+    ck = _country_key(d.get("country"))
+    for st in _statuses_of(d):
+        insort(_buckets.setdefault((st, ""), []), key)
+        if ck:
+            insort(_buckets.setdefault((st, ck), []), key)
+
+def _bucket_remove(d: dict) -> None:
+    key = _sort_key(d)
+    ck = _country_key(d.get("country"))
+    for st in _statuses_of(d):
+        for bk in ((st, ""), (st, ck)) if ck else ((st, ""),):
+            arr = _buckets.get(bk)
+            if not arr:
+                continue
+            i = bisect_left(arr, key)
+            if i < len(arr) and arr[i] == key:
+                arr.pop(i)
+            if not arr:
+                _buckets.pop(bk, None)
+
+def _reset(cards: Dict[int, Dict[str, Any]]) -> None:
+    _cards.clear(); _buckets.clear()
+    for uid, d in cards.items():
+        _cards[uid] = d
+        _bucket_add(d)
+
+
+# ---------- مسح القرص (فقط للبناء الأول وفحص الاتساق) ----------
+def _read_card(name: str) -> Optional[Dict[str, Any]]:
+    up = os.path.join(SUP_DIR, str(name), "pub.json")
+    if not os.path.isfile(up):
+        return None
+    try:
+        with open(up, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        if not isinstance(d, dict):
+            return None
+        return _normalize(d, int(d.get("user_id") or name))
+    except Exception:
+        return None
+
+def _scan_disk() -> Dict[int, Dict[str, Any]]:
+    out: Dict[int, Dict[str, Any]] = {}
+    try:
+        names = os.listdir(SUP_DIR)
+    except Exception:
+        return out
+    for name in names:
+        d = _read_card(name)
+        if d is not None:
+            out[d["user_id"]] = d
+    return out
+
+def _persist() -> None:
+    """لقطة كاملة ذرّية + تفريغ السجل (عند البناء/الضغط/الفحص فقط)."""
+    global _journal_n
+    try:
+        _atomic_write(INDEX_FILE, {str(k): v for k, v in _cards.items()})
+        with open(JOURNAL, "w", encoding="utf-8"):
+            pass
+        _journal_n = 0
+    except Exception as e:
+        log.warning(f"[supplier_index] save index failed: {e}")
+
+def _journal(uid: int, d: Optional[dict]) -> None:
+    """سطر واحد لكل تغيير؛ يُضغط إلى لقطة حين يتجاوز السجل حجم الفهرس."""
+    global _journal_n
+    try:
+        os.makedirs(os.path.dirname(JOURNAL), exist_ok=True)
+        with open(JOURNAL, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"u": int(uid), "d": d}, ensure_ascii=False) + "\n")
+        _journal_n += 1
+    except Exception as e:
+        log.warning(f"[supplier_index] journal append failed: {e}")
+        _persist()
+        return
+    if _journal_n > max(256, len(_cards)):
+        _persist()
+
+def _replay(cards: Dict[int, Dict[str, Any]]) -> int:
+    n = 0
+    try:
+        with open(JOURNAL, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                    uid = int(rec["u"])
+                except Exception:
+                    continue   # سطر أخير مقطوع بعد انقطاع
+                n += 1
+                if isinstance(rec.get("d"), dict):
+                    cards[uid] = rec["d"]
+                else:
+                    cards.pop(uid, None)
+    except FileNotFoundError:
+        pass
+    return n
+
+def write_public_file() -> None:
+    """يكتب public_suppliers.json من الفهرس (الأحدث أولًا) دون فتح أي pub.json."""
+    with _LOCK:
+        _ensure_loaded()
+        items = [_public_item(_cards[uid]) for _, uid in reversed(_buckets.get(("published", ""), []))]
+    try:
+        _atomic_write(PUB_FILE, items)
+    except Exception as e:
+        log.warning(f"[supplier_index] save public file failed: {e}")
+
+def _ensure_loaded() -> None:
+    global _loaded
+    if _loaded:
+        return
+    with _LOCK:
+        if _loaded:
+            return
+        global _journal_n
+        cards: Dict[int, Dict[str, Any]] = {}
+        try:
+            with open(INDEX_FILE, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if isinstance(raw, dict):
+                cards = {int(k): v for k, v in raw.items() if isinstance(v, dict)}
+            _journal_n = _replay(cards)
+            _reset(cards)
+        except FileNotFoundError:
+            _reset(_scan_disk())
+            _persist()
+        except Exception as e:
+            log.warning(f"[supplier_index] index load failed, rescanning: {e}")
+            _reset(_scan_disk())
+            _persist()
+        _loaded = True
+
+
+# ---------- التحديث (يُستدعى عند حفظ/حذف البطاقة) ----------
+def upsert(card: dict) -> None:
+    """يحدّث بطاقة واحدة في الفهرس بشكل ذرّي، ويعيد كتابة الدليل العام إن تأثّر."""
+    try:
+        uid = int(card.get("user_id") or 0)
+    except Exception:
+        return
+    if not uid:
+        return
+    with _LOCK:
+        _ensure_loaded()
+        old = _cards.get(uid)
+        was_pub = bool(old) and "published" in _statuses_of(old)
+        if old:
+            _bucket_remove(old)
+        d = _normalize(card, uid)
+        _cards[uid] = d
+        _bucket_add(d)
+        _journal(uid, d)
+        if was_pub or "published" in _statuses_of(d):
+            write_public_file()
+
+def remove(uid: int) -> None:
+    with _LOCK:
+        _ensure_loaded()
+        old = _cards.pop(int(uid), None)
+        if not old:
+            return
+        _bucket_remove(old)
+        _journal(int(uid), None)
+        if "published" in _statuses_of(old):
+            write_public_file()
+
+
+# ---------- الاستعلام ----------
+def get(uid: int) -> Optional[dict]:
+    _ensure_loaded()
+    d = _cards.get(int(uid))
+    return dict(d) if d else None
+
+def get_public(uid: int) -> Optional[dict]:
+    """بطاقة منشورة فقط بصيغة الدليل العام."""
+    _ensure_loaded()
+    d = _cards.get(int(uid))
+    if d and "published" in _statuses_of(d):
+        return _public_item(d)
+    return None
+
+def count(status: str, country: Optional[str] = None) -> int:
+    _ensure_loaded()
+    return len(_buckets.get((status, _country_key(country)), ()))
+
+def page(status: str, page: int, per_page: int, country: Optional[str] = None) -> Tuple[List[dict], int]:
+    """
+    صفحة مرتبة (الأحدث أولًا) لحالة/دولة معيّنة.
+    يرجع (العناصر, الإجمالي). status="published" يرجع شكل الدليل العام.
+    """
+    _ensure_loaded()
+    with _LOCK:
+        arr = _buckets.get((status, _country_key(country)), [])
+        total = len(arr)
+        start = max(0, (int(page) - 1) * int(per_page))
+        hi = total - start
+        lo = max(0, hi - int(per_page))
+        uids = [arr[i][1] for i in range(hi - 1, lo - 1, -1)] if hi > 0 else []
+        if status == "published":
+            items = [_public_item(_cards[u]) for u in uids]
+        else:
+            items = [dict(_cards[u]) for u in uids]
+    return items, total
+
+
+# ---------- فحص الاتساق الخلفي ----------
+def reconcile() -> int:
+    """يقارن الفهرس بالقرص ويصحّح الفروقات. يرجع عدد البطاقات المصحّحة."""
+    disk = _scan_disk()   # بلا قفل (قد يطول)؛ كل فرق يُعاد فحصه تحت القفل
+    with _LOCK:
+        _ensure_loaded()
+        suspects = [u for u in set(disk) | set(_cards) if disk.get(u) != _cards.get(u)]
+    fixes = 0
+    pub_changed = False
+    for uid in suspects:
+        with _LOCK:
+            cur = _read_card(str(uid))   # قراءة حديثة: upsert لاحق للمسح يبقى الفائز
+            old = _cards.get(uid)
+            if cur == old:
+                continue
+            fixes += 1
+            if old:
+                _bucket_remove(old)
+                pub_changed |= "published" in _statuses_of(old)
+            if cur is None:
+                _cards.pop(uid, None)
+            else:
+                _cards[uid] = cur
+                _bucket_add(cur)
+                pub_changed |= "published" in _statuses_of(cur)
+    if fixes:
+        with _LOCK:
+            _persist()
+        if pub_changed:
+            write_public_file()
+    if fixes:
+        log.info(f"[supplier_index] reconciled {fixes} card(s) from disk")
+    return fixes
+
+async def run_reconcile_loop(interval: int = RECONCILE_INTERVAL):
+    """
+    شغّلها من البوت:
+        asyncio.create_task(run_reconcile_loop())
+    """
+    while True:
+        try:
+            await asyncio.to_thread(reconcile)
+        except Exception as e:
+            log.warning(f"[supplier_index] reconcile failed: {e}")
+        await asyncio.sleep(max(60, int(interval)))
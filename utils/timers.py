@@ -0,0 +1,300 @@
+# utils/timers.py
+from __future__ import annotations
+
+import os, json, time, heapq, asyncio, logging, itertools, threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# خدمة مؤقّتات دائمة بدل asyncio.create_task + asyncio.sleep:
+# - كومة (heap) واحدة بمواعيد التنفيذ + حلقة واحدة تقود كل المؤقّتات.
+# - كل مؤقّت له مفتاح (key) فريد: الجدولة بنفس المفتاح تستبدل القديم، والإلغاء بالمفتاح.
+# - إجراءات مسمّاة: register_action("name", handler) و handler(bot, payload).
+# - دفتر JSONL (إلحاق فقط) يسجّل add/done/cancel؛ عند الإقلاع يُعاد تشغيله
+#   فتُنفَّذ المؤقّتات المتأخرة فورًا (at-least-once: done يُكتب بعد نجاح الإجراء).
+# - إجراء غير مسجّل بعد (وحدة فشل استيرادها أو تُسجَّل متأخرة): يبقى المؤقّت معلّقًا
+#   ويُعاد بمهلة متزايدة حتى NO_HANDLER_MAX_DELAY، ويُنفَّذ فور register_action.
+
+log = logging.getLogger(__name__)
+
+DATA_DIR     = Path("data"); DATA_DIR.mkdir(parents=True, exist_ok=True)
+JOURNAL_FILE = DATA_DIR / "timers.jsonl"
+
+MAX_CONCURRENCY   = int(os.getenv("TIMERS_MAX_CONCURRENCY", "32"))
+COMPACT_MIN_LINES = int(os.getenv("TIMERS_COMPACT_MIN_LINES", "5000"))
+NO_HANDLER_MAX_DELAY = float(os.getenv("TIMERS_NO_HANDLER_MAX_DELAY", "300"))
+
+ActionHandler = Callable[[Any, Dict[str, Any]], Awaitable[Any]]
+
+
+class _Timer:
+    __slots__ = ("key", "action", "due", "payload", "seq", "tries")
+
+    def __init__(self, key: str, action: str, due: float, payload: Dict[str, Any], seq: int):
+        self.key = key
+        self.action = action
+        self.due = due
+        self.payload = payload
+        self.seq = seq
+        self.tries = 0       # محاولات بلا إجراء مسجّل
+
+
+_LOCK = threading.RLock()
+_actions: Dict[str, ActionHandler] = {}
+_timers: Dict[str, _Timer] = {}                 # key -> المؤقّت الحالي
+_heap: List[Tuple[float, int, str]] = []        # (due, seq, key) — حذف كسول عبر seq
+_seq = itertools.count(1)
+_key_seq = itertools.count(1)
+
+_journal = None                                 # ملف الدفتر المفتوح للإلحاق
+_journal_lines = 0
+_loaded = False
+
+_bot: Any = None
+_loop_task: Optional[asyncio.Task] = None
+_loop_ref: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
+_running: set[asyncio.Task] = set()
+_firing: Dict[str, _Timer] = {}                 # قيد التنفيذ (لم يُكتب done بعد)
+_stats = {"scheduled": 0, "fired": 0, "failed": 0, "cancelled": 0, "max_lateness": 0.0}
+
+
+# ---------- الدفتر ----------
+def _jwrite(rec: Dict[str, Any]) -> None:
+    global _journal, _journal_lines
+    try:
+        if _journal is None:
+            _journal = open(JOURNAL_FILE, "a", encoding="utf-8")
+        _journal.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        _journal.flush()
+        _journal_lines += 1
+    except Exception as e:
+        log.warning(f"[timers] journal write failed: {e}")
+
+def _compact_locked() -> None:
+    """يعيد كتابة الدفتر بالمؤقّتات المعلّقة فقط."""
+    global _journal, _journal_lines
+    tmp = JOURNAL_FILE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for tm in itertools.chain(_firing.values(), _timers.values()):
+            f.write(json.dumps({"op": "add", "key": tm.key, "action": tm.action,
+                                "due": tm.due, "payload": tm.payload},
+                               ensure_ascii=False, separators=(",", ":")) + "\n")
+    if _journal is not None:
+        try:
+            _journal.close()
+        except Exception:
+            pass
+        _journal = None
+    tmp.replace(JOURNAL_FILE)
+    _journal_lines = len(_timers) + len(_firing)
+
+def _maybe_compact_locked() -> None:
+    if _journal_lines >= COMPACT_MIN_LINES and _journal_lines > 4 * max(1, len(_timers)):
+        try:
+            _compact_locked()
+        except Exception as e:
+            log.warning(f"[timers] compaction failed: {e}")
+
+def _ensure_loaded() -> None:
+    global _loaded
+    if _loaded:
+        return
+    with _LOCK:
+        if _loaded:
+            return
+        pending: Dict[str, Dict[str, Any]] = {}
+        if JOURNAL_FILE.exists():
+            with open(JOURNAL_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except Exception:
+                        continue  # سطر أخير مقطوع بعد انهيار
+                    if rec.get("op") == "add":
+                        pending[rec["key"]] = rec
+                    else:
+                        pending.pop(rec.get("key"), None)
+        for key, rec in pending.items():
+            _push_locked(key, str(rec.get("action")), float(rec.get("due") or 0), rec.get("payload") or {})
+        _compact_locked()
+        _loaded = True
+        if pending:
+            log.info(f"[timers] restored {len(pending)} pending timer(s) from journal")
+
+
+# ---------- الكومة ----------
+def _push_locked(key: str, action: str, due: float, payload: Dict[str, Any]) -> _Timer:
+    tm = _Timer(key, action, due, payload, next(_seq))
+    _timers[key] = tm
+    heapq.heappush(_heap, (due, tm.seq, key))
+    return tm
+
+def _wake() -> None:
+    """يوقظ الحلقة عندما يصبح المؤقّت الجديد هو الأقرب (آمن من خيوط أخرى)."""
+    if _wakeup is None or _loop_ref is None:
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is _loop_ref:
+        _wakeup.set()
+    else:
+        _loop_ref.call_soon_threadsafe(_wakeup.set)
+
+
+# ---------- الواجهة العامة ----------
+def register_action(name: str, handler: ActionHandler) -> None:
+    """يسجّل إجراءً مسمّى: async def handler(bot, payload: dict)."""
+    _actions[name] = handler
+    # مؤقّتات انتظرت هذا الإجراء: تُنفَّذ الآن بدل انتظار مهلة إعادة المحاولة
+    with _LOCK:
+        waiting = [tm for tm in _timers.values() if tm.action == name and tm.tries]
+        for tm in waiting:
+            _push_locked(tm.key, tm.action, time.time(), tm.payload)
+    if waiting:
+        _wake()
+
+def schedule(action: str, delay: float, payload: Optional[Dict[str, Any]] = None,
+             *, key: Optional[str] = None) -> str:
+    """
+    يجدول إجراءً بعد delay ثانية ويرجع مفتاحه.
+    الجدولة بمفتاح موجود تستبدل المؤقّت السابق (إعادة ضبط).
+    """
+    return schedule_at(action, time.time() + max(0.0, float(delay)), payload, key=key)
+
+def schedule_at(action: str, due_ts: float, payload: Optional[Dict[str, Any]] = None,
+                *, key: Optional[str] = None) -> str:
+    _ensure_loaded()
+    key = key or f"{action}:{int(time.time())}:{next(_key_seq)}"
+    payload = dict(payload or {})
+    with _LOCK:
+        tm = _push_locked(key, action, float(due_ts), payload)
+        _jwrite({"op": "add", "key": key, "action": action, "due": tm.due, "payload": payload})
+        _stats["scheduled"] += 1
+        is_head = bool(_heap) and _heap[0][1] == tm.seq
+    if is_head:
+        _wake()
+    return key
+
+def cancel(key: str) -> bool:
+    """يلغي مؤقّتًا بالمفتاح. يرجع True إن كان معلّقًا."""
+    _ensure_loaded()
+    with _LOCK:
+        tm = _timers.pop(key, None)
+        if tm is None:
+            return False
+        _jwrite({"op": "cancel", "key": key})
+        _stats["cancelled"] += 1
+        if len(_heap) > 2 * len(_timers) + 1024:
+            # مدخلات ملغاة كثيرة في الكومة → إعادة بنائها من المعلّق فقط
+            _heap[:] = [(t.due, t.seq, t.key) for t in _timers.values()]
+            heapq.heapify(_heap)
+        _maybe_compact_locked()
+    return True
+
+def is_pending(key: str) -> bool:
+    _ensure_loaded()
+    return key in _timers
+
+def pending_count() -> int:
+    _ensure_loaded()
+    return len(_timers)
+
+def stats() -> Dict[str, Any]:
+    return dict(_stats, pending=len(_timers), heap=len(_heap), running=len(_running),
+                actions=sorted(_actions))
+
+
+# ---------- الحلقة ----------
+def _pop_due_locked(now: float, limit: int) -> List[_Timer]:
+    out: List[_Timer] = []
+    while _heap and _heap[0][0] <= now and len(out) < limit:
+        _, seq, key = heapq.heappop(_heap)
+        tm = _timers.get(key)
+        if tm is None or tm.seq != seq:
+            continue  # أُلغي أو استُبدل
+        _timers.pop(key, None)
+        out.append(tm)
+    return out
+
+def _next_delay_locked(now: float) -> Optional[float]:
+    while _heap:
+        due, seq, key = _heap[0]
+        tm = _timers.get(key)
+        if tm is None or tm.seq != seq:
+            heapq.heappop(_heap)
+            continue
+        return max(0.0, due - now)
+    return None
+
+async def _fire(tm: _Timer) -> None:
+    lateness = max(0.0, time.time() - tm.due)
+    if lateness > _stats["max_lateness"]:
+        _stats["max_lateness"] = lateness
+    handler = _actions.get(tm.action)
+    if handler is None:
+        # لا نكتب done: المؤقّت يبقى معلّقًا (في الدفتر وفي الذاكرة) ويُعاد لاحقًا
+        delay = min(NO_HANDLER_MAX_DELAY, 5.0 * 2 ** min(tm.tries, 16))
+        log.warning(f"[timers] no handler for action '{tm.action}' (key={tm.key}), retry in {delay:.0f}s")
+        with _LOCK:
+            if _firing.get(tm.key) is tm:
+                _firing.pop(tm.key, None)
+            if tm.key not in _timers:  # لم يُعَد جدولته/يُلغَ بنفس المفتاح أثناء ذلك
+                _push_locked(tm.key, tm.action, time.time() + delay, tm.payload).tries = tm.tries + 1
+        return
+    try:
+        await handler(_bot, tm.payload)
+        _stats["fired"] += 1
+    except asyncio.CancelledError:
+        raise  # لا نكتب done → يُعاد التنفيذ بعد الإقلاع
+    except Exception as e:
+        _stats["failed"] += 1
+        log.warning(f"[timers] action '{tm.action}' failed (key={tm.key}): {e}")
+    with _LOCK:
+        if _firing.get(tm.key) is tm:
+            _firing.pop(tm.key, None)
+        if tm.key not in _timers:  # لم يُعَد جدولته بنفس المفتاح أثناء التنفيذ
+            _jwrite({"op": "done", "key": tm.key})
+        _maybe_compact_locked()
+
+def _on_task_done(task: asyncio.Task) -> None:
+    _running.discard(task)
+    if _wakeup is not None:
+        _wakeup.set()  # خانة تنفيذ تحرّرت
+
+async def _timers_loop() -> None:
+    assert _wakeup is not None
+    while True:
+        _wakeup.clear()
+        now = time.time()
+        slots = max(1, MAX_CONCURRENCY) - len(_running)
+        with _LOCK:
+            due = _pop_due_locked(now, slots) if slots > 0 else []
+            for tm in due:
+                _firing[tm.key] = tm
+            delay = _next_delay_locked(now)
+        for tm in due:
+            task = asyncio.create_task(_fire(tm))
+            _running.add(task)
+            task.add_done_callback(_on_task_done)
+        if len(_running) >= MAX_CONCURRENCY:
+            delay = None  # ننتظر تحرّر خانة (_on_task_done يوقظنا)
+        elif due:
+            await asyncio.sleep(0)
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+async def init_timers(bot) -> None:
+    """Call this once at startup (dp.startup)."""
+    global _bot, _loop_task, _loop_ref, _wakeup
+    _ensure_loaded()
+    _bot = bot
+    if _loop_task is None or _loop_task.done():
+        _loop_ref = asyncio.get_running_loop()
+        _wakeup = asyncio.Event()
+        _loop_task = asyncio.create_task(_timers_loop())
+        log.info(f"[timers] loop started ({len(_timers)} pending)")
@@ -1,13 +1,18 @@
 # 📁 utils/updates.py
 from __future__ import annotations
 
-import json, os
+import json, os, time, atexit, threading
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any, Iterable
 
 UPDATE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "update.json")
+# المُبلَّغون لكل نسخة إعلان: ملف أسطر (uid لكل سطر) يُلحق به على دفعات
+NOTIFIED_FILE_TPL = os.path.join(os.path.dirname(__file__), "..", "data", "update_notified_v{version}.log")
 os.makedirs(os.path.dirname(UPDATE_FILE), exist_ok=True)
 
+NOTIFIED_FLUSH_BATCH = int(os.getenv("UPDATE_NOTIFIED_FLUSH_BATCH", "200"))
+NOTIFIED_FLUSH_SEC   = float(os.getenv("UPDATE_NOTIFIED_FLUSH_SEC", "5"))
+
 ALLOWED_LANGS = ("en", "ar")
 DEFAULT_LANG = "en"
 
@@ -33,24 +38,118 @@ def _now_utc() -> datetime:
 
 def _coerce_user_ids(xs: Iterable[Any]) -> list[int]:
     out: list[int] = []
+    seen: set[int] = set()
     for x in xs or []:
         try:
             v = int(x)
-            if v not in out:
-                out.append(v)
         except Exception:
             continue
+        if v not in seen:
+            seen.add(v)
+            out.append(v)
     return out
 
 def _empty_state() -> dict:
     return {
         "active": False,
         "message": {"en": "", "ar": ""},
-        "notified_users": [],
+        "version": 1,           # يزيد عند كل إعلان جديد → مجموعة مُبلَّغين جديدة
         "active_until": None,   # ISO8601 string or None
         "duration_days": None   # int days or None
     }
 
+# ============ Notified set (in-memory, batched persistence) ============
+# المجموعة تعيش في الذاكرة لنسخة الإعلان الحالية فقط. الإضافة O(1)،
+# والحفظ إلحاق دفعات إلى ملف النسخة، والتصفير = رفع رقم النسخة (O(1)).
+
+_N_LOCK = threading.Lock()
+_notified: set[int] = set()
+_notified_version: Optional[int] = None
+_pending: list[int] = []
+_last_flush = 0.0
+
+def _notified_path(version: int) -> str:
+    return NOTIFIED_FILE_TPL.format(version=int(version))
+
+def _read_notified_file(version: int) -> set[int]:
+    out: set[int] = set()
+    try:
+        with open(_notified_path(version), "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        out.add(int(line))
+                    except Exception:
+                        continue
+    except FileNotFoundError:
+        pass
+    return out
+
+def _flush_locked() -> None:
+    global _last_flush
+    _last_flush = time.monotonic()
+    if not _pending or _notified_version is None:
+        return
+    buf = "".join(f"{u}\n" for u in _pending)
+    _pending.clear()
+    try:
+        with open(_notified_path(_notified_version), "a", encoding="utf-8") as f:
+            f.write(buf)
+    except Exception:
+        pass
+
+def flush_notified() -> None:
+    """يكتب الدفعة المعلّقة من المُبلَّغين إلى القرص."""
+    with _N_LOCK:
+        _flush_locked()
+
+atexit.register(flush_notified)
+
+def _bind_version(version: int) -> None:
+    """يربط المجموعة في الذاكرة بنسخة الإعلان (يقرأ الملف مرة واحدة فقط)."""
+    global _notified, _notified_version
+    if _notified_version == version:
+        return
+    with _N_LOCK:
+        if _notified_version == version:
+            return
+        _flush_locked()
+        _notified = _read_notified_file(version)
+        _notified_version = version
+
+def _start_new_version(data: dict) -> None:
+    """نسخة إعلان جديدة: مجموعة فارغة + حذف ملف النسخة السابقة."""
+    global _notified, _notified_version
+    old = int(data.get("version") or 1)
+    new = old + 1
+    data["version"] = new
+    with _N_LOCK:
+        _pending.clear()
+        _notified = set()
+        _notified_version = new
+    for v in (old, new):
+        try:
+            os.remove(_notified_path(v))
+        except Exception:
+            pass
+
+def _migrate_legacy_notified(data: dict) -> None:
+    """ترحيل قائمة notified_users القديمة داخل update.json إلى ملف النسخة."""
+    legacy = data.pop("notified_users", None)
+    if not legacy:
+        return
+    ids = _coerce_user_ids(legacy)
+    version = int(data.get("version") or 1)
+    with _N_LOCK:
+        try:
+            with open(_notified_path(version), "a", encoding="utf-8") as f:
+                f.write("".join(f"{u}\n" for u in ids))
+        except Exception:
+            pass
+        if _notified_version == version:
+            _notified.update(ids)
+
 def load_update_info() -> dict:
     data = _safe_load(UPDATE_FILE, None)
     if not data:
@@ -58,6 +157,10 @@ def load_update_info() -> dict:
         _safe_save(UPDATE_FILE, data)
         return data
 
+    if "notified_users" in data:
+        _migrate_legacy_notified(data)
+        _safe_save(UPDATE_FILE, data)
+
     # ضمان الحقول + تنظيفها
     msgs = data.get("message") or {}
     if not isinstance(msgs, dict):
@@ -66,7 +169,10 @@ def load_update_info() -> dict:
         "en": str(msgs.get("en") or ""),
         "ar": str(msgs.get("ar") or ""),
     }
-    data["notified_users"] = _coerce_user_ids(data.get("notified_users") or [])
+    try:
+        data["version"]    = max(1, int(data.get("version") or 1))
+    except Exception:
+        data["version"]    = 1
     data["active_until"]   = data.get("active_until", None)
     data["duration_days"]  = data.get("duration_days", None)
     data["active"]         = bool(data.get("active", False))
@@ -78,9 +184,18 @@ def load_update_info() -> dict:
 
     return data
 
-def save_update_info(data: dict):
-    # تنظيف سريع قبل الحفظ
-    data["notified_users"] = _coerce_user_ids(data.get("notified_users") or [])
+def save_update_info(data: dict, *, new_version: bool = False):
+    """
+    يحفظ حالة الإعلان. new_version=True يعني نشر إعلان جديد:
+    تُصفَّر مجموعة المُبلَّغين فورًا (O(1)) بدل إعادة كتابة قائمة ضخمة.
+    """
+    # توافق: notified_users=[] من نداءات قديمة = نسخة جديدة
+    legacy = data.pop("notified_users", None)
+    if new_version or legacy == []:
+        _start_new_version(data)
+    elif legacy:
+        data["notified_users"] = legacy
+        _migrate_legacy_notified(data)
     # تأكد من حصر الرسائل في EN/AR
     msgs = data.get("message") or {}
     data["message"] = {"en": str(msgs.get("en") or ""), "ar": str(msgs.get("ar") or "")}
@@ -124,8 +239,7 @@ def set_messages(en: str = "", ar: str = ""):
     data = load_update_info()
     data["message"] = {"en": en or "", "ar": ar or ""}
     # إعادة الإرسال للجميع عند تغيير النص
-    data["notified_users"] = []
-    save_update_info(data)
+    save_update_info(data, new_version=True)
 
 def set_message_for(lang: str, text: str):
     """تحديث رسالة لغة واحدة فقط + تفريغ إشعارات المستخدمين."""
@@ -136,8 +250,7 @@ def set_message_for(lang: str, text: str):
     msgs = data.get("message", {})
     msgs[lang] = text or ""
     data["message"] = msgs
-    data["notified_users"] = []
-    save_update_info(data)
+    save_update_info(data, new_version=True)
 
 def set_active(active: bool):
     data = load_update_info()
@@ -167,26 +280,39 @@ def set_active_until(dt: Optional[datetime]):
 
 def reset_updates():
     """إيقاف الإعلان ومسح الإشعارات والنصوص."""
-    save_update_info(_empty_state())
+    data = _empty_state()
+    data["version"] = int(load_update_info().get("version") or 1)
+    save_update_info(data, new_version=True)
 
 # ----- إشعارات المستخدمين -----
 
+def _current_version() -> int:
+    if _notified_version is not None:
+        return _notified_version
+    return int(load_update_info().get("version") or 1)
+
 def was_user_notified(user_id: int) -> bool:
-    data = load_update_info()
-    notified = set(int(x) for x in (data.get("notified_users") or []))
-    return int(user_id) in notified
+    _bind_version(_current_version())
+    return int(user_id) in _notified
 
 def mark_user_notified(user_id: int):
-    data = load_update_info()
-    s = set(int(x) for x in (data.get("notified_users") or []))
-    s.add(int(user_id))
-    data["notified_users"] = list(s)
-    save_update_info(data)
+    _bind_version(_current_version())
+    uid = int(user_id)
+    with _N_LOCK:
+        if uid in _notified:
+            return
+        _notified.add(uid)
+        _pending.append(uid)
+        if len(_pending) >= NOTIFIED_FLUSH_BATCH or time.monotonic() - _last_flush >= NOTIFIED_FLUSH_SEC:
+            _flush_locked()
+
+def notified_count() -> int:
+    _bind_version(_current_version())
+    return len(_notified)
 
 def clear_notified():
     data = load_update_info()
-    data["notified_users"] = []
-    save_update_info(data)
+    save_update_info(data, new_version=True)
 
 # ----- قراءة النص -----
 
@@ -255,7 +381,7 @@ def get_state() -> Dict[str, Any]:
         "active": bool(data.get("active", False)),
         "active_until": data.get("active_until"),
         "duration_days": data.get("duration_days"),
-        "notified_count": len(data.get("notified_users") or []),
+        "notified_count": notified_count(),
         "messages": data.get("message") or {},
     }
 
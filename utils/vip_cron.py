@@ -5,6 +5,7 @@ from typing import Dict, Optional, Tuple
 
 from utils.vip_store import list_vips, _now_ts, purge_expired
 from lang import t, get_user_lang
+from utils.api_scheduler import bulk_priority
 
 logger = logging.getLogger(__name__)
 
@@ -191,8 +192,9 @@ async def _process_reminders(bot):
             st["last_expiry_ts"] = exp
 
 async def _tick(bot):
-    await _expire_notify_and_remove(bot)
-    await _process_reminders(bot)
+    with bulk_priority():  # تذكيرات جماعية: لا تزاحم الردود التفاعلية
+        await _expire_notify_and_remove(bot)
+        await _process_reminders(bot)
 
 async def run_vip_cron(bot):
     """
@@ -0,0 +1,138 @@
+# utils/vip_status_ticker.py
+from __future__ import annotations
+
+import os, time, asyncio, logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from utils.vip_store import list_vips
+from utils.api_scheduler import bulk_priority
+
+# مُجدول واحد مشترك لشاشات "حالة VIP الحية" بدل مهمة asyncio لكل مستخدم:
+# - سجل بالشاشات النشطة (key -> view) يضيفها/يزيلها المعالج.
+# - كل دورة (TICK_SEC) تقرأ vip_users.json مرة واحدة وتحسب كل النصوص منها.
+# - التعديلات موزّعة على مدة الدورة وبحد أقصى EDITS_PER_SEC (أولوية جماعية).
+# - الشاشة تُزال تلقائيًا عند فشل التعديل، أو انتهاء MAX_SECONDS، أو نص نهائي.
+
+log = logging.getLogger(__name__)
+
+TICK_SEC      = max(1, int(os.getenv("VIP_STATUS_REFRESH_SEC", "5")))
+MAX_SECONDS   = max(1, int(os.getenv("VIP_STATUS_MAX_MIN", "120"))) * 60
+EDITS_PER_SEC = max(1.0, float(os.getenv("VIP_STATUS_EDITS_PER_SEC", "20")))
+
+# render(meta, now) -> (text, reply_markup, final)
+#   meta: سجل المشترك من اللقطة (None إن لم يعد VIP)، final=True: آخر تعديل ثم إزالة.
+RenderFn = Callable[[Optional[Dict[str, Any]], int], Tuple[str, Any, bool]]
+
+
+class _View:
+    __slots__ = ("uid", "chat_id", "message_id", "render", "on_drop", "started")
+
+    def __init__(self, uid: int, chat_id: int, message_id: int, render: RenderFn,
+                 on_drop: Optional[Callable[[], None]] = None):
+        self.uid = uid
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.render = render
+        self.on_drop = on_drop
+        self.started = time.time()
+
+
+_views: Dict[str, _View] = {}
+_bot: Any = None
+_task: Optional[asyncio.Task] = None
+_stats = {"ticks": 0, "edits": 0, "dropped": 0}
+
+
+def register(key: str, bot, uid: int, chat_id: int, message_id: int, render: RenderFn,
+             on_drop: Optional[Callable[[], None]] = None) -> None:
+    """يضيف/يستبدل شاشة حالة حية (key مثل "tools:<uid>").
+    on_drop يُستدعى حين يُسقط المُجدول الشاشة بنفسه (انتهاء، فشل، نص نهائي)."""
+    global _bot, _task
+    _views[key] = _View(uid, chat_id, message_id, render, on_drop)
+    _bot = bot
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_loop())
+
+def unregister(key: str) -> Optional[int]:
+    """يزيل الشاشة ويرجع message_id الخاص بها (إن وجد)."""
+    v = _views.pop(key, None)
+    return v.message_id if v else None
+
+def _drop(key: str, v: _View) -> None:
+    """إسقاط من داخل المُجدول: يزيل الشاشة ويبلّغ صاحبها."""
+    if _views.get(key) is not v:
+        return
+    _views.pop(key, None)
+    if v.on_drop is not None:
+        try:
+            v.on_drop()
+        except Exception as e:
+            log.warning(f"[vip_ticker] on_drop failed for {key}: {e}")
+
+def is_active(key: str, message_id: Optional[int] = None) -> bool:
+    v = _views.get(key)
+    return v is not None and (message_id is None or v.message_id == message_id)
+
+def stats() -> Dict[str, int]:
+    return dict(_stats, active=len(_views))
+
+
+async def _edit(v: _View, text: str, markup) -> bool:
+    """يرجع False إذا يجب إسقاط الشاشة."""
+    try:
+        await _bot.edit_message_text(text, chat_id=v.chat_id, message_id=v.message_id,
+                                     reply_markup=markup, parse_mode=ParseMode.HTML)
+        _stats["edits"] += 1
+        return True
+    except TelegramBadRequest as e:
+        return "message is not modified" in str(e).lower()
+    except TelegramRetryAfter:
+        return True  # المجدول تعامل معه؛ نحاول الدورة القادمة
+    except Exception:
+        return False
+
+async def _tick() -> None:
+    items = list(_views.items())
+    if not items:
+        return
+    try:
+        users = (list_vips() or {}).get("users") or {}   # لقطة واحدة لكل الشاشات
+    except Exception as e:
+        log.warning(f"[vip_ticker] snapshot failed: {e}")
+        return
+    now = int(time.time())
+    spacing = max(1.0 / EDITS_PER_SEC, TICK_SEC / len(items) * 0.8)
+    with bulk_priority():
+        for i, (key, v) in enumerate(items):
+            if _views.get(key) is not v:
+                continue  # أُزيلت أو استُبدلت أثناء الدورة
+            if now - v.started >= MAX_SECONDS:
+                _drop(key, v)
+                continue
+            try:
+                text, markup, final = v.render(users.get(str(v.uid)), now)
+            except Exception as e:
+                log.warning(f"[vip_ticker] render failed for {key}: {e}")
+                _drop(key, v)
+                continue
+            ok = await _edit(v, text, markup)
+            if (not ok or final) and _views.get(key) is v:
+                _drop(key, v)
+                if not ok:
+                    _stats["dropped"] += 1
+            if i < len(items) - 1:
+                await asyncio.sleep(spacing)
+
+async def _loop() -> None:
+    t0 = time.monotonic()
+    while _views:
+        await asyncio.sleep(max(0.0, TICK_SEC - (time.monotonic() - t0)))
+        t0 = time.monotonic()
+        try:
+            await _tick()
+            _stats["ticks"] += 1
+        except Exception as e:
+            log.warning(f"[vip_ticker] tick failed: {e}")
@@ -4,6 +4,8 @@ from __future__ import annotations
 import json, os, tempfile, time
 from typing import Dict, Any, Optional, List
 
+from utils.metrics import store_op
+
 # ================= paths =================
 DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data"))
 VIP_FILE = os.path.join(DATA_DIR, "vip_users.json")
@@ -16,8 +18,9 @@ def _ensure_dir():
 
 def _safe_read(path: str) -> Any:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with store_op(os.path.splitext(os.path.basename(path))[0], "load", path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
     except Exception:
         return None
 
@@ -25,9 +28,10 @@ def _safe_write(path: str, obj: Any):
     _ensure_dir()
     fd, tmp = tempfile.mkstemp(prefix="vip_", suffix=".json", dir=DATA_DIR)
     try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(obj, f, ensure_ascii=False, indent=2)
-        os.replace(tmp, path)
+        with store_op(os.path.splitext(os.path.basename(path))[0], "save", path):
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(obj, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
     finally:
         try:
             if os.path.exists(tmp):
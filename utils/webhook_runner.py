@@ -0,0 +1,140 @@
+# utils/webhook_runner.py
+from __future__ import annotations
+
+import os, asyncio, logging, secrets
+from typing import List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import setup_application
+
+# وضع webhook بديل عن long polling (BOT_MODE=webhook):
+# - خادم aiohttp محلي يستقبل التحديثات على WEBHOOK_PATH ويضعها في طابور محدود.
+# - عدد ثابت من العمّال (WEBHOOK_WORKERS) يمرّر التحديثات إلى dp.feed_update.
+# - عند امتلاء الطابور ننتظر حتى WEBHOOK_ENQUEUE_TIMEOUT ثم نرد 503،
+#   فيعيد Telegram الإرسال لاحقًا (ضغط عكسي بدل مهام بلا حدود).
+# - لا نحذف التحديثات المعلّقة عند الإقلاع (drop_pending_updates=False).
+# - بدون WEBHOOK_URL لا يُستدعى set_webhook — مفيد للتجربة المحلية بإرسال
+#   Update JSON مسجّل إلى الخادم (bench/post_updates.py).
+
+log = logging.getLogger(__name__)
+
+WEBHOOK_URL     = (os.getenv("WEBHOOK_URL") or "").rstrip("/")
+WEBHOOK_PATH    = os.getenv("WEBHOOK_PATH", "/tg/webhook")
+WEBHOOK_HOST    = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT    = int(os.getenv("WEBHOOK_PORT") or os.getenv("PORT") or "8080")
+WEBHOOK_SECRET  = os.getenv("WEBHOOK_SECRET") or ""
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+QUEUE_MAX       = int(os.getenv("WEBHOOK_QUEUE_MAX", "1000"))
+ENQUEUE_TIMEOUT = float(os.getenv("WEBHOOK_ENQUEUE_TIMEOUT", "2"))
+DRAIN_TIMEOUT   = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "10"))
+
+_SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class _Ingest:
+    """طابور محدود + عمّال يغذّون Dispatcher."""
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int, maxsize: int):
+        self.dp = dp
+        self.bot = bot
+        self.queue: asyncio.Queue[Update] = asyncio.Queue(maxsize=max(1, maxsize))
+        self.n_workers = max(1, workers)
+        self.tasks: List[asyncio.Task] = []
+        self.stats = {"accepted": 0, "rejected": 0, "processed": 0, "failed": 0}
+
+    async def start(self, *_args, **_kwargs) -> None:
+        self.tasks = [asyncio.create_task(self._worker(i)) for i in range(self.n_workers)]
+        log.info(f"[webhook] {self.n_workers} worker(s), queue max {self.queue.maxsize}")
+
+    async def stop(self, *_args, **_kwargs) -> None:
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning(f"[webhook] drain timeout, {self.queue.qsize()} update(s) left "
+                        "(Telegram will not resend them)")
+        for t in self.tasks:
+            t.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def _worker(self, idx: int) -> None:
+        while True:
+            update = await self.queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self.stats["processed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                log.warning(f"[webhook] worker {idx} failed on update {update.update_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if WEBHOOK_SECRET and not secrets.compare_digest(
+            request.headers.get(_SECRET_HEADER, ""), WEBHOOK_SECRET
+        ):
+            return web.Response(status=401)
+        try:
+            raw = await request.json()
+            update = Update.model_validate(raw, context={"bot": self.bot})
+        except Exception as e:
+            log.warning(f"[webhook] bad update payload: {e}")
+            return web.Response(status=400)
+        try:
+            await asyncio.wait_for(self.queue.put(update), timeout=ENQUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            # الطابور ممتلئ: Telegram سيعيد المحاولة لاحقًا
+            self.stats["rejected"] += 1
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        self.stats["accepted"] += 1
+        return web.Response(status=200)
+
+    async def health(self, _request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats, queued=self.queue.qsize(),
+                                      queue_max=self.queue.maxsize, workers=len(self.tasks)))
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, allowed_updates: Optional[List[str]] = None) -> None:
+    """يشغّل خادم webhook حتى الإيقاف. يُستدعى من bot.main بدل dp.start_polling."""
+    ingest = _Ingest(dp, bot, WEBHOOK_WORKERS, QUEUE_MAX)
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, ingest.handle)
+    app.router.add_get("/healthz", ingest.health)
+    # /metrics يبقى على خادم METRICS_HOST:METRICS_PORT المحلي (bot.py)، لا على الخادم العام
+    from utils import metrics as _metrics
+    _metrics.gauge_fn("bot_webhook_queue", "Webhook ingest queue", lambda: {
+        "queued": ingest.queue.qsize(), "queue_max": ingest.queue.maxsize,
+        "rejected": ingest.stats["rejected"], "failed": ingest.stats["failed"],
+    }, ("key",))
+    # startup/shutdown الخاصة بالـ Dispatcher (مع bot وبقية workflow_data)
+    setup_application(app, dp, bot=bot)
+    app.on_startup.append(ingest.start)
+    app.on_shutdown.insert(0, ingest.stop)   # نفرّغ الطابور قبل shutdown الخاص بالـ Dispatcher
+
+    if WEBHOOK_URL:
+        await bot.set_webhook(
+            url=f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            allowed_updates=allowed_updates,
+            secret_token=WEBHOOK_SECRET or None,
+            drop_pending_updates=False,
+        )
+        log.info(f"[webhook] set_webhook → {WEBHOOK_URL}{WEBHOOK_PATH}")
+    else:
+        log.warning("[webhook] WEBHOOK_URL not set — serving locally without set_webhook")
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    log.info(f"[webhook] listening on http://{WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        try:
+            await bot.session.close()
+        except Exception:
+            pass